@@ -4,11 +4,17 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import folium
-from streamlit_folium import folium_static
+from folium.plugins import FastMarkerCluster
+import streamlit.components.v1 as components
 import numpy as np
 from datetime import datetime, timedelta
 import json
 import time
+from contextlib import contextmanager
+
+from backend.utils.geo import StationArrays
+from frontend.client import BackendClient, BackendError
+from frontend.live_feed import LiveStations
 
 # Page configuration
 st.set_page_config(
@@ -20,6 +26,12 @@ st.set_page_config(
 
 # Backend API base URL
 BACKEND_URL = "http://localhost:8000"
+# How often live mode checks for applied deltas
+LIVE_POLL_SECONDS = 5
+# Built maps, figures and tables are reused for this long per city and data version
+RENDER_CACHE_TTL = 60
+# "Auto" marker mode clusters once a view has more stations than this
+CLUSTER_THRESHOLD = 500
 
 # Initialize session state
 if 'user_location' not in st.session_state:
@@ -27,137 +39,215 @@ if 'user_location' not in st.session_state:
 if 'selected_city' not in st.session_state:
     st.session_state.selected_city = "Mumbai"
 
-def get_stations_data(city):
+@st.cache_resource
+def get_backend_client():
+    """One pooled keep-alive client shared by every session"""
+    return BackendClient(BACKEND_URL)
+
+
+def request_stations(city):
+    """Start fetching a city's (data version, stations) on the client pool; returns a future.
+    Responses are reused for a few seconds, so reruns don't hit the network."""
+    client = get_backend_client()
+    return client.submit(client.get, "stations", "/api/stations", {"city": city}, cache=True, with_version=True)
+
+
+def request_recommendations(city, user_lat, user_lon):
+    """Start fetching recommendations on the client pool; returns a future"""
+    client = get_backend_client()
+    params = {"city": city, "lat": user_lat, "lon": user_lon}
+    return client.submit(client.get, "recommendations", "/api/recommendations", params)
+
+
+def get_stations_data(city, pending=None):
+    """(data version, stations) for a city; pass a future from request_stations to collect a concurrent fetch"""
     try:
-        response = requests.get(f"{BACKEND_URL}/api/stations?city={city}", timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            st.error(f"Failed to fetch stations data: {response.status_code}")
-            return []
+        return (pending or request_stations(city)).result()
+    except BackendError as e:
+        st.error(f"Failed to fetch stations data: {e.status_code}")
+        return None, []
     except requests.exceptions.RequestException as e:
         st.error(f"Error connecting to backend: {str(e)}")
-        return []
+        return None, []
 
 
-def get_route_optimization(start_lat, start_lon, end_lat, end_lon):
-    """Get optimized route using A* algorithm"""
+def get_route_optimization(city, start_lat, start_lon, end_lat, end_lon, battery_level=None, vehicle_type=None):
+    """Get optimized route using A* algorithm, with charging stops when a battery level is given"""
     try:
         payload = {
+            "city": city,
             "start_lat": start_lat,
             "start_lon": start_lon,
             "end_lat": end_lat,
-            "end_lon": end_lon
+            "end_lon": end_lon,
+            "battery_level": battery_level,
+            "vehicle_type": vehicle_type
         }
-        response = requests.post(f"{BACKEND_URL}/api/route", json=payload, timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            st.error(f"Route optimization failed: {response.status_code}")
-            return None
+        return get_backend_client().post("route", "/api/route", payload)
+    except BackendError as e:
+        st.error(f"Route optimization failed: {e.status_code}")
+        return None
     except requests.exceptions.RequestException as e:
         st.error(f"Error getting route: {str(e)}")
         return None
 
-def get_utilization_prediction(station_id):
+def get_utilization_prediction(station_id, city):
     """Get utilization prediction for a station"""
     try:
-        response = requests.get(f"{BACKEND_URL}/api/predict/{station_id}", timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            st.error(f"Prediction failed: {response.status_code}")
-            return None
+        return get_backend_client().get("predict", f"/api/predict/{station_id}", {"city": city})
+    except BackendError as e:
+        st.error(f"Prediction failed: {e.status_code}")
+        return None
     except requests.exceptions.RequestException as e:
         st.error(f"Error getting prediction: {str(e)}")
         return None
 
+def get_recorded_occupancy(station_id, city):
+    """Hourly utilization the backend has recorded for a station over the last day"""
+    try:
+        return get_backend_client().get(
+            "occupancy", f"/api/occupancy/{station_id}", {"city": city, "resolution": "1h", "points": 24}
+        )
+    except (BackendError, requests.exceptions.RequestException):
+        return None
+
+
+
+def wait_label(station):
+    """Estimated wait line for a recommendation card"""
+    wait = station.get('estimated_wait_minutes')
+    if wait is None:
+        return "⏳ Wait unknown"
+    if wait < 1:
+        return "⏳ No wait expected"
+    return f"⏳ ~{wait:.0f} min wait"
 
 
-def get_smart_recommendations(city, user_lat, user_lon):
+def get_smart_recommendations(city, user_lat, user_lon, pending=None):
     try:
-        response = requests.get(
-            f"{BACKEND_URL}/api/recommendations",
-            params={"city": city, "lat": user_lat, "lon": user_lon},
-            timeout=10
-        )
-        if response.status_code == 200:
-            return response.json()
-        else:
-            st.warning(f"Recommendation fetch failed: {response.status_code}")
-            return None
+        return (pending or request_recommendations(city, user_lat, user_lon)).result()
+    except BackendError as e:
+        st.warning(f"Recommendation fetch failed: {e.status_code}")
+        return None
     except Exception as e:
         st.warning(f"Error getting recommendations: {str(e)}")
         return None
 
-def create_map(stations_data, center_lat=28.6139, center_lon=77.2090):
-    """Create folium map with charging stations"""
-    m = folium.Map(location=[center_lat, center_lon], zoom_start=11)
-    
-    for station in stations_data:
-        # Color based on availability
-        if station['available_slots'] > 5:
-            color = 'green'
-        elif station['available_slots'] > 0:
-            color = 'orange'
-        else:
-            color = 'red'
-        
-        popup_html = f"""
+def station_color(available_slots):
+    # Color based on availability
+    if available_slots > 5:
+        return 'green'
+    elif available_slots > 0:
+        return 'orange'
+    return 'red'
+
+
+def station_popup(station):
+    return f"""
         <b>{station['name']}</b><br>
         Available: {station['available_slots']}/{station['total_slots']}<br>
         Type: {station['type']}<br>
         Address: {station['address']}<br>
         Cost: ₹{station['cost_per_hour']}/hour
         """
-        
+
+
+# Markers are drawn in the browser from a plain data array, one circle per station
+FAST_CLUSTER_CALLBACK = """
+function (row) {
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]),
+        {radius: 7, color: row[2], fillColor: row[2], fillOpacity: 0.8});
+    marker.bindPopup(row[3]);
+    return marker;
+}
+"""
+
+
+def create_map(stations_data, center_lat=28.6139, center_lon=77.2090, clustered=False):
+    """Create folium map with charging stations"""
+    m = folium.Map(location=[center_lat, center_lon], zoom_start=11)
+
+    if clustered:
+        rows = [[s['lat'], s['lon'], station_color(s['available_slots']), station_popup(s)] for s in stations_data]
+        FastMarkerCluster(rows, callback=FAST_CLUSTER_CALLBACK).add_to(m)
+        return m
+
+    for station in stations_data:
         folium.Marker(
             [station['lat'], station['lon']],
-            popup=popup_html,
-            icon=folium.Icon(color=color, icon='bolt')
+            popup=station_popup(station),
+            icon=folium.Icon(color=station_color(station['available_slots']), icon='bolt')
         ).add_to(m)
     
     return m
-from math import radians, cos, sin, sqrt, atan2
 
-def haversine(lat1, lon1, lat2, lon2):
-    # Radius of Earth in km
-    R = 6371.0
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1 - a))
-    return R * c
 
-def get_recommendations(stations, user_lat, user_lon):
-    def distance(station):
-        return haversine(user_lat, user_lon, station['lat'], station['lon'])
+# The cached builders below are keyed by city, data version and view settings;
+# the station list itself is passed unhashed (leading underscore)
+
+@st.cache_data(ttl=RENDER_CACHE_TTL, max_entries=32, show_spinner=False)
+def nearby_station_rows(city, data_version, user_location, _all_stations):
+    if user_location is None:
+        return list(range(len(_all_stations)))
+    return StationArrays.from_stations(_all_stations).within(user_location[0], user_location[1], 10).tolist()
+
+
+@st.cache_data(ttl=RENDER_CACHE_TTL, max_entries=32, show_spinner=False)
+def render_map_html(city, data_version, user_location, clustered, center, _stations_data):
+    """Map HTML, so reruns that don't change the data skip folium entirely"""
+    return create_map(_stations_data, center[0], center[1], clustered)._repr_html_()
+
+
+@st.cache_data(ttl=RENDER_CACHE_TTL, max_entries=32, show_spinner=False)
+def analytics_figures(city, data_version, user_location, _stations_data):
+    type_counts = {}
+    for station in _stations_data:
+        station_type = station['type']
+        type_counts[station_type] = type_counts.get(station_type, 0) + 1
+
+    types_fig = px.bar(
+        x=list(type_counts.keys()),
+        y=list(type_counts.values()),
+        title="Station Types Distribution",
+        labels={'x': 'Station Type', 'y': 'Count'}
+    )
+    costs_fig = px.histogram(
+        x=[s['cost_per_hour'] for s in _stations_data],
+        title="Cost Distribution (₹/hour)",
+        labels={'x': 'Cost per Hour', 'y': 'Number of Stations'}
+    )
+    return types_fig, costs_fig
 
-    def queue_time(station):
-        return (station['total_slots'] - station['available_slots']) / station['total_slots'] if station['total_slots'] > 0 else float('inf')
 
-    def cost(station):
-        return station['cost_per_hour']
+@st.cache_data(ttl=RENDER_CACHE_TTL, max_entries=32, show_spinner=False)
+def station_tables(city, data_version, user_location, _stations_data):
+    """(coordinates table, battery swapping table) built from one DataFrame"""
+    df = pd.DataFrame(_stations_data)
+    swapping = df[df['supports_swapping'].fillna(False).astype(bool)] if 'supports_swapping' in df else df.iloc[0:0]
+    return df[['name', 'lat', 'lon', 'city']], swapping
 
-    def charging_speed(station):
-        return 1 if station['type'].lower() == 'fast' else 2  # fast < normal
 
-    sorted_by_distance = sorted(stations, key=distance)
-    sorted_by_queue = sorted(stations, key=queue_time)
-    sorted_by_cost = sorted(stations, key=cost)
-    sorted_by_speed = sorted(stations, key=charging_speed)
+@contextmanager
+def timed(timings, stage):
+    """Add the block's milliseconds to timings[stage]"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + (time.perf_counter() - started) * 1000
 
-    return {
-        "Nearest": sorted_by_distance[0],
-        "Lowest Queue Time": sorted_by_queue[0],
-        "Lowest Cost": sorted_by_cost[0],
-        "Fastest Charging": sorted_by_speed[0]
-    }
 
+@st.fragment(run_every=LIVE_POLL_SECONDS)
+def watch_live_feed(feed, rendered_version):
+    """Rerun the page only when the live feed has applied new deltas"""
+    if feed.version != rendered_version:
+        st.rerun()
 
 
 def main():
+    render_started = time.perf_counter()
+    # Milliseconds spent drawing each part of the page
+    render_timings = {}
     st.title("🔋 EV Charging Optimization Platform")
     st.markdown("*AI-powered charging station finder and route optimization*")
     
@@ -184,23 +274,50 @@ def main():
     # Vehicle type
     vehicle_type = st.sidebar.selectbox("Vehicle Type", ["Car", "Bike", "Auto", "Bus"])
     
-    # Fetch stations data
-    with st.spinner("Loading charging stations..."):
-      all_stations = get_stations_data(selected_city)
-
-    if st.session_state.user_location:
-            user_lat, user_lon = st.session_state.user_location
-            stations_data = [
-            s for s in all_stations
-            if haversine(user_lat, user_lon, s['lat'], s['lon']) <= 10
-        ]
+    # Marker clustering keeps large cities responsive in the browser
+    marker_mode = st.sidebar.selectbox("Map markers", ["Auto", "Individual", "Clustered"])
+    
+    # Live mode keeps the station list current from the backend's delta stream
+    live_updates = st.sidebar.checkbox("Live availability updates")
+    live_version = None
+    pending_recos = None
+    if live_updates:
+        feed = st.session_state.get('live_feed')
+        if feed is None or feed.city != selected_city:
+            if feed is not None:
+                feed.stop()
+            try:
+                feed = LiveStations(BACKEND_URL, selected_city).start()
+            except requests.exceptions.RequestException as e:
+                st.error(f"Error connecting to backend: {str(e)}")
+                st.stop()
+            st.session_state.live_feed = feed
+        live_version, all_stations = feed.snapshot()
+        data_version = live_version
     else:
-        stations_data = all_stations
+        if st.session_state.get('live_feed') is not None:
+            st.session_state.live_feed.stop()
+            st.session_state.live_feed = None
+
+        # Fetch stations data, with recommendations in parallel when we know the location
+        with st.spinner("Loading charging stations..."):
+            pending_stations = request_stations(selected_city)
+            if st.session_state.user_location:
+                pending_recos = request_recommendations(selected_city, *st.session_state.user_location)
+            data_version, all_stations = get_stations_data(selected_city, pending_stations)
+
+    user_location = st.session_state.user_location
+    if user_location:
+        user_location = tuple(user_location)
+    nearby = nearby_station_rows(selected_city, data_version, user_location, all_stations)
+    stations_data = [all_stations[i] for i in nearby] if user_location else all_stations
+    view = (selected_city, data_version, user_location)
 
     # ✅ Add coordinate table here
     if stations_data:
+        coordinates_df, swapping_df = station_tables(*view, stations_data)
         st.subheader("📌 Station Coordinates from Backend")
-        st.dataframe(pd.DataFrame(stations_data)[['name', 'lat', 'lon', 'city']])
+        st.dataframe(coordinates_df)
 
 
     
@@ -210,7 +327,7 @@ def main():
     # 💡 Smart Recommendations Section
     recos=None
     if st.session_state.user_location:
-        recos = get_smart_recommendations(selected_city, *st.session_state.user_location)
+        recos = get_smart_recommendations(selected_city, *st.session_state.user_location, pending=pending_recos)
     if recos:
         st.subheader("💡 Smart Station Recommendations")
         rec_cols = st.columns(4)
@@ -222,6 +339,7 @@ def main():
             st.write(f"📍 {s['address']}")
             st.write(f"🔌 {s['available_slots']} / {s['total_slots']} slots")
             st.write(f"💰 ₹{s['cost_per_hour']} / hr")
+            st.write(wait_label(s))
 
         with rec_cols[1]:
             st.markdown("### 💸 Cheapest")
@@ -230,6 +348,7 @@ def main():
             st.write(f"📍 {s['address']}")
             st.write(f"💰 ₹{s['cost_per_hour']} / hr")
             st.write(f"🔌 {s['available_slots']} slots")
+            st.write(wait_label(s))
 
         with rec_cols[2]:
             st.markdown("### ⚡ Fast Charging")
@@ -238,12 +357,14 @@ def main():
             st.write(f"📍 {s['address']}")
             st.write(f"⚡ {s['type']}")
             st.write(f"💰 ₹{s['cost_per_hour']} / hr")
+            st.write(wait_label(s))
 
         with rec_cols[3]:
             st.markdown("### 🕒 Lowest Queue")
             s = recos["least_queue"]
             st.success(s["name"])
             st.write(f"📍 {s['address']}")
+            st.write(wait_label(s))
             st.write(f"🔌 {s['available_slots']} available")
             st.write(f"💰 ₹{s['cost_per_hour']} / hr")
 
@@ -272,8 +393,10 @@ def main():
 
 
             #st.session_state.selected_city = selected_city
-            map_obj = create_map(stations_data, center_lat, center_lon)
-            folium_static(map_obj, width=800, height=500)
+            clustered = marker_mode == "Clustered" or (marker_mode == "Auto" and len(stations_data) > CLUSTER_THRESHOLD)
+            with timed(render_timings, "map"):
+                map_html = render_map_html(*view, clustered, (center_lat, center_lon), stations_data)
+                components.html(map_html, width=800, height=500)
             #st.session_state.user_location = city_coords[selected_city]
     
     with col2:
@@ -330,22 +453,36 @@ def main():
                 if st.session_state.user_location:
                     with st.spinner("Calculating optimal route..."):
                         route_data = get_route_optimization(
+                            selected_city,
                             st.session_state.user_location[0], st.session_state.user_location[1],
-                            selected_station['lat'], selected_station['lon']
+                            selected_station['lat'], selected_station['lon'],
+                            battery_level, vehicle_type
                         )
                         if route_data:
                             st.success(f"Distance: {route_data['distance']:.2f} km")
                             st.success(f"Estimated Time: {route_data['time']:.1f} minutes")
                             st.success(f"Energy Cost: {route_data['energy_cost']:.2f} kWh")
+                            for stop in route_data.get('charging_stops', []):
+                                st.info(
+                                    f"🔌 Charge at {stop['station']['name']}: "
+                                    f"{stop['arrival_battery']:.0f}% → {stop['departure_battery']:.0f}% "
+                                    f"({stop['charge_time']:.0f} min)"
+                                )
+                            if 'arrival_battery' in route_data:
+                                st.write(f"🔋 Battery on arrival: {route_data['arrival_battery']:.0f}%")
                 else:
                     st.warning("Please set your location first!")
         
         with col3:
             if st.button("📈 View Predictions"):
                 with st.spinner("Loading utilization predictions..."):
-                    prediction_data = get_utilization_prediction(selected_station['id'])
+                    prediction_data = get_utilization_prediction(selected_station['id'], selected_city)
                     if prediction_data:
                         st.success("Predictions loaded!")
+                        if prediction_data.get('source') == 'synthetic':
+                            st.warning("No occupancy has been recorded for this station yet, so this forecast is based on a generic daily profile.")
+                        elif prediction_data.get('source') == 'partial':
+                            st.info(f"Forecast based on {prediction_data['recorded_hours']} recorded hours; the rest is a generic daily profile.")
                         # Display prediction chart
                         timestamps = prediction_data['timestamps']
                         utilization = prediction_data['utilization']
@@ -363,50 +500,43 @@ def main():
                             yaxis_title='Utilization %'
                         )
                         st.plotly_chart(fig, use_container_width=True)
+
+                    recorded = get_recorded_occupancy(selected_station['id'], selected_city)
+                    if recorded and any(u is not None for u in recorded['utilization']):
+                        fig = go.Figure()
+                        fig.add_trace(go.Scatter(
+                            x=[datetime.fromtimestamp(t) for t in recorded['timestamps']],
+                            y=recorded['utilization'],
+                            mode='lines+markers',
+                            name='Recorded Utilization'
+                        ))
+                        fig.update_layout(
+                            title='Recorded Utilization (last 24 hours)',
+                            xaxis_title='Time',
+                            yaxis_title='Utilization %'
+                        )
+                        st.plotly_chart(fig, use_container_width=True)
     
     # Analytics section
     st.subheader("📊 Analytics Dashboard")
     
     col1, col2 = st.columns(2)
+    with timed(render_timings, "charts"):
+        types_fig, costs_fig = analytics_figures(*view, stations_data)
     
     with col1:
         # Station type distribution
-        if stations_data:
-            type_counts = {}
-            for station in stations_data:
-                station_type = station['type']
-                type_counts[station_type] = type_counts.get(station_type, 0) + 1
-            
-            fig = px.bar(
-                x=list(type_counts.keys()),
-                y=list(type_counts.values()),
-                title="Station Types Distribution",
-                labels={'x': 'Station Type', 'y': 'Count'}
-            )
-            st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(types_fig, use_container_width=True)
     
     with col2:
         # Cost analysis
-        if stations_data:
-            costs = [s['cost_per_hour'] for s in stations_data]
-            fig = px.histogram(
-                x=costs,
-                title="Cost Distribution (₹/hour)",
-                labels={'x': 'Cost per Hour', 'y': 'Number of Stations'}
-            )
-            st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(costs_fig, use_container_width=True)
     
     # Battery swapping network
     st.subheader("🔄 Battery Swapping Network")
     
-    # Filter stations that support battery swapping
-    swapping_stations = [s for s in stations_data if s.get('supports_swapping', False)]
-    
-    if swapping_stations:
-        st.write(f"Found {len(swapping_stations)} battery swapping stations")
-        
-        # Create DataFrame for swapping stations
-        swapping_df = pd.DataFrame(swapping_stations)
+    if len(swapping_df):
+        st.write(f"Found {len(swapping_df)} battery swapping stations")
         st.dataframe(swapping_df[['name', 'address', 'available_slots', 'total_slots', 'cost_per_hour']])
     else:
         st.info("No battery swapping stations available in the selected city currently.")
@@ -415,10 +545,23 @@ def main():
     st.markdown("---")
     st.markdown("*Powered by AI algorithms - A* pathfinding and LSTM predictions*")
     
-    # Auto-refresh option
-    if st.checkbox("Auto-refresh (30 seconds)"):
-        time.sleep(30)
-        st.rerun()
+    with st.expander("⏱️ Backend and render timings"):
+        timings = get_backend_client().timings_since(render_started)
+        if timings:
+            df = pd.DataFrame(timings)
+            # Whatever the backend didn't spend itself went to the network
+            df['network_ms'] = df['ms'] - df['server_ms'].fillna(df['ms'])
+            df['stages'] = df['stages'].map(lambda stages: ", ".join(f"{k} {v:.1f}" for k, v in stages.items()))
+            st.dataframe(df[['name', 'path', 'status', 'ms', 'server_ms', 'network_ms', 'stages']])
+            st.caption(f"Total time waiting on the backend: {sum(t['ms'] for t in timings):.0f} ms")
+        else:
+            st.write("No backend calls during this render.")
+        rendering = ", ".join(f"{stage} {ms:.0f} ms" for stage, ms in render_timings.items())
+        st.caption(f"Rendering: {rendering or 'nothing drawn'}; whole page {(time.perf_counter() - render_started) * 1000:.0f} ms")
+
+    if live_updates:
+        st.caption(f"🟢 Live updates on (data version {live_version})")
+        watch_live_feed(st.session_state.live_feed, live_version)
 
 if __name__ == "__main__":
     main()
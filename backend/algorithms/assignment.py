@@ -0,0 +1,145 @@
+"""Capacity-aware assignment of a fleet of vehicles to charging stations.
+
+Each vehicle may go to one of its nearest stations with free slots that its
+battery can reach, and a station takes at most as many vehicles as it has
+available slots. The total cost (minutes travelling, waiting and charging,
+or km driven) is minimised exactly as a min-cost bipartite matching of
+vehicles to individual slots, solved by shortest augmenting paths.
+"""
+import numpy as np
+
+from backend.algorithms.ev_routing import RESERVE_FRACTION, STATION_POWER_KW, VEHICLE_PROFILES
+from backend.algorithms.routing import route_matrix
+
+# Nearest stations with free slots each vehicle is allowed to use
+ASSIGN_CANDIDATES = 16
+# Extra nearest stations fetched per candidate, since full stations are skipped
+CANDIDATE_OVERSAMPLE = 4
+# Without road routing: road km per straight-line km, and average speed
+DETOUR_FACTOR = 1.3
+CITY_SPEED_KMH = 25.0
+# Largest vehicles x stations matrix routed over the road graph; beyond it
+# travel is estimated from straight-line distance
+ROAD_MATRIX_CELLS = 250_000
+# Vehicles charge up to this fraction of the battery (where charging tapers)
+CHARGE_TARGET_FRACTION = 0.8
+# Solve time grows with the (vehicle, slot) pairs in the matching: about
+# 0.1 s for this many, up to 0.5 s when vehicles crowd the same stations.
+# Larger fleets get fewer candidate stations each to stay under it
+MAX_ASSIGNMENT_EDGES = 300_000
+
+
+def min_cost_assignment(bidder_ptr, edge_station, edge_cost, capacity, reserve_cost):
+    """Cheapest assignment of bidders to stations with `capacity` slots each.
+
+    Bidder i may take station edge_station[k] at edge_cost[k], k in
+    bidder_ptr[i]:bidder_ptr[i + 1], or stay unassigned at reserve_cost[i].
+    Every slot becomes its own column and every bidder gets a private
+    "unassigned" column, so a full matching always exists. Returns the
+    station per bidder, -1 if unassigned.
+    """
+    # Imported here, like scikit-learn in the spatial index: slow to import
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+
+    n = len(bidder_ptr) - 1
+    slot_start = np.concatenate(([0], np.cumsum(capacity)))
+    slots = int(slot_start[-1])
+    bidder = np.repeat(np.arange(n), np.diff(bidder_ptr))
+
+    # One entry per (edge, slot of its station)
+    copies = capacity[edge_station]
+    edge = np.repeat(np.arange(len(edge_station)), copies)
+    slot = slot_start[edge_station][edge] + np.arange(len(edge)) - np.repeat(np.cumsum(copies) - copies, copies)
+    rows = np.concatenate((bidder[edge], np.arange(n)))
+    columns = np.concatenate((slot, slots + np.arange(n)))
+    # Shifted to be positive: zeros would read as missing entries
+    costs = np.concatenate((edge_cost[edge], reserve_cost))
+    costs = costs - min(float(costs.min(initial=0.0)), 0.0) + 1.0
+    matrix = csr_matrix((costs, (rows, columns)), shape=(n, slots + n))
+
+    _, matched = min_weight_full_bipartite_matching(matrix)
+    station_of_column = np.concatenate((np.repeat(np.arange(len(capacity)), capacity), np.full(n, -1)))
+    return station_of_column[matched]
+
+
+def assign_fleet(stations, lats, lons, battery_pct, vehicle_types, waits, roads=None, objective="time"):
+    """Assign vehicles to a city's stations (CityStations).
+
+    `waits` is the expected wait in minutes per station. `objective` is
+    "time" (travel + wait + charging minutes) or "distance" (km). Returns a
+    dict of per-vehicle arrays (station row, -1 if unassigned; km; travel,
+    wait and charge minutes; cost) plus "candidates" (stations considered
+    per vehicle) and "travel" ("road" or "straight_line").
+    """
+    n = len(lats)
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    capacity = np.maximum(stations.available, 0).astype(np.int64)
+
+    # Nearest stations with free slots
+    rows, km = stations.index.nearest_k_many(lats, lons, ASSIGN_CANDIDATES * CANDIDATE_OVERSAMPLE)
+    usable = capacity[rows] > 0
+    rank = np.cumsum(usable, axis=1) - 1
+    usable &= rank < ASSIGN_CANDIDATES
+    vehicle = np.nonzero(usable)[0]
+    rows, km, rank = rows[usable], km[usable], rank[usable]
+
+    candidates = np.unique(rows)
+    travel = "straight_line"
+    if roads is not None and n * len(candidates) <= ROAD_MATRIX_CELLS:
+        travel = "road"
+        destinations = np.column_stack((stations.lats[candidates], stations.lons[candidates]))
+        road_km, road_minutes, _ = route_matrix(roads, np.column_stack((lats, lons)), destinations)
+        column = np.searchsorted(candidates, rows)
+        km, minutes = road_km[vehicle, column], road_minutes[vehicle, column]
+    else:
+        km = km * DETOUR_FACTOR
+        minutes = km / CITY_SPEED_KMH * 60.0
+
+    # Energy: reachable with the battery's reserve left, then charged to the target
+    profiles = [VEHICLE_PROFILES.get(name, VEHICLE_PROFILES["Car"]) for name in vehicle_types]
+    battery_kwh = np.array([p["battery_kwh"] for p in profiles])
+    kwh_per_km = np.array([p["kwh_per_km"] for p in profiles])
+    max_charge_kw = np.array([p["max_charge_kw"] for p in profiles])
+    charge_kwh = np.clip(np.asarray(battery_pct, dtype=np.float64), 0, 100) / 100.0 * battery_kwh
+    arrival_kwh = charge_kwh[vehicle] - km * kwh_per_km[vehicle]
+    reachable = np.isfinite(km) & (arrival_kwh >= battery_kwh[vehicle] * RESERVE_FRACTION)
+    type_power = np.array([STATION_POWER_KW.get(name, STATION_POWER_KW["Normal"]) for name in stations.types])
+    power = np.minimum(type_power[stations.type_codes[rows]], max_charge_kw[vehicle])
+    needed = np.maximum(battery_kwh[vehicle] * CHARGE_TARGET_FRACTION - arrival_kwh, 0)
+    charge = needed / power * 60.0
+    wait = waits[rows]
+    cost = km if objective == "distance" else minutes + wait + charge
+
+    # Fewer candidates per vehicle until the matching is small enough to
+    # solve within the latency budget
+    limit = ASSIGN_CANDIDATES
+    while True:
+        keep = reachable & (rank < limit)
+        # Stations renumbered to those in play; none needs more slots than it has bidders
+        candidates, local, bidders = np.unique(rows[keep], return_inverse=True, return_counts=True)
+        slots = np.minimum(capacity[candidates], bidders)
+        if slots[local].sum() <= MAX_ASSIGNMENT_EDGES or limit == 1:
+            break
+        limit = limit * 3 // 4
+
+    vehicle, rows, km, minutes, wait, charge, cost = (
+        a[keep] for a in (vehicle, rows, km, minutes, wait, charge, cost)
+    )
+    bidder_ptr = np.concatenate(([0], np.cumsum(np.bincount(vehicle, minlength=n))))
+    # Staying unassigned costs more than any assignment
+    reserve = np.full(n, 2.0 * float(cost.max(initial=0.0)) + 1.0)
+    chosen = min_cost_assignment(bidder_ptr, local, cost, slots, reserve)
+
+    # The chosen edge of each assigned vehicle
+    picked = np.flatnonzero(local == chosen[vehicle])
+    result = {"row": np.full(n, -1)}
+    for name in ("km", "minutes", "wait", "charge", "cost"):
+        result[name] = np.full(n, np.nan)
+    result["row"][vehicle[picked]] = rows[picked]
+    for name, values in (("km", km), ("minutes", minutes), ("wait", wait), ("charge", charge), ("cost", cost)):
+        result[name][vehicle[picked]] = values[picked]
+    result["candidates"] = limit
+    result["travel"] = travel
+    return result
@@ -0,0 +1,103 @@
+import heapq
+import time
+
+import numpy as np
+
+from backend.utils.geo import haversine
+
+# Sources per SciPy Dijkstra call in many_to_many; each needs a minutes and a
+# predecessor row as long as the graph
+SOURCE_BATCH = 32
+
+
+class SearchBudgetExceeded(Exception):
+    """A search gave up at its deadline or expansion limit"""
+
+
+def astar(graph, source, target):
+    """Fastest path between two graph nodes.
+
+    Edge cost is travel time; the heuristic is straight-line distance times
+    the graph's lowest minutes-per-km, which never overestimates. Returns
+    (node path, time in minutes, distance in km), or None if unreachable.
+    """
+    indptr, indices, times, lengths = graph.as_lists()
+    lats, lons = graph.lats, graph.lons
+    target_lat, target_lon = lats[target], lons[target]
+    minutes_per_km = graph.minutes_per_km
+
+    heuristic = {}
+
+    def h(node):
+        value = heuristic.get(node)
+        if value is None:
+            value = haversine(lats[node], lons[node], target_lat, target_lon) * minutes_per_km
+            heuristic[node] = value
+        return value
+
+    best = {source: 0.0}
+    distance = {source: 0.0}
+    parent = {source: -1}
+    closed = set()
+    heap = [(h(source), 0.0, source)]
+
+    while heap:
+        _, cost, node = heapq.heappop(heap)
+        if node in closed:
+            continue
+        if node == target:
+            path = []
+            while node != -1:
+                path.append(node)
+                node = parent[node]
+            path.reverse()
+            return path, cost, distance[target]
+        closed.add(node)
+
+        for e in range(indptr[node], indptr[node + 1]):
+            nxt = indices[e]
+            if nxt in closed:
+                continue
+            new_cost = cost + times[e]
+            if new_cost < best.get(nxt, float("inf")):
+                best[nxt] = new_cost
+                distance[nxt] = distance[node] + lengths[e]
+                parent[nxt] = node
+                heapq.heappush(heap, (new_cost + h(nxt), new_cost, nxt))
+
+    return None
+
+
+def many_to_many(graph, sources, targets, deadline=None):
+    """(minutes, km) arrays of shape (len(sources), len(targets)) along the
+    fastest path from each source to each target node, inf where unreachable.
+
+    SciPy's Dijkstra runs from SOURCE_BATCH sources at a time; the km of
+    each path are summed by walking its predecessor chain back from the
+    target, one edge per step for every pair at once. Raises
+    SearchBudgetExceeded if time.monotonic() passes `deadline` between batches.
+    """
+    from scipy.sparse.csgraph import dijkstra
+
+    matrix, keys, edge_km = graph.sparse()
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    minutes = np.empty((len(sources), len(targets)))
+    km = np.zeros((len(sources), len(targets)))
+    for start in range(0, len(sources), SOURCE_BATCH):
+        if deadline is not None and time.monotonic() > deadline:
+            raise SearchBudgetExceeded
+        batch = sources[start:start + SOURCE_BATCH]
+        times, predecessors = dijkstra(matrix, indices=batch, return_predecessors=True)
+        minutes[start:start + len(batch)] = times[:, targets]
+
+        rows, columns = np.divmod(np.arange(len(batch) * len(targets)), len(targets))
+        nodes = targets[columns]
+        while len(rows):
+            previous = predecessors[rows, nodes].astype(np.int64)
+            walking = previous >= 0
+            rows, columns, nodes, previous = rows[walking], columns[walking], nodes[walking], previous[walking]
+            km[start + rows, columns] += edge_km[np.searchsorted(keys, previous * graph.size + nodes)]
+            nodes = previous
+    km[np.isinf(minutes)] = np.inf
+    return minutes, km
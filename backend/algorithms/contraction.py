@@ -0,0 +1,308 @@
+import heapq
+
+import numpy as np
+
+# Witness searches stop after settling this many nodes; a cut-off search
+# only costs an unnecessary shortcut, never a wrong answer
+WITNESS_SETTLE_LIMIT = 60
+
+INF = float("inf")
+
+_FIELDS = ("indptr", "indices", "times", "lengths", "middles")
+
+
+def _to_csr(size, edges):
+    """edges: list of (node, other, time, length, middle) -> CSR arrays keyed by node"""
+    edges.sort(key=lambda e: e[0])
+    columns = list(zip(*edges)) if edges else [(), (), (), (), ()]
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(np.asarray(columns[0], dtype=np.int64), minlength=size), out=indptr[1:])
+    return {
+        "indptr": indptr,
+        "indices": np.asarray(columns[1], dtype=np.int64),
+        "times": np.asarray(columns[2], dtype=np.float64),
+        "lengths": np.asarray(columns[3], dtype=np.float64),
+        "middles": np.asarray(columns[4], dtype=np.int64),
+    }
+
+
+class ContractionHierarchy:
+    """Contraction hierarchy over a RoadGraph for fast point-to-point queries.
+
+    `up` holds edges towards higher-ranked nodes (forward search) and `down`
+    holds, at each node, the higher-ranked nodes with an edge into it
+    (backward search). Shortcuts record the contracted middle node so paths
+    can be unpacked back to road edges.
+    """
+
+    def __init__(self, size, up, down):
+        self.size = size
+        self.up = up
+        self.down = down
+        self._lists = None
+        self._middles = None
+
+    @classmethod
+    def build(cls, graph):
+        n = graph.size
+        out = [dict() for _ in range(n)]
+        inn = [dict() for _ in range(n)]
+        indptr, indices, times, lengths = graph.as_lists()
+        for u in range(n):
+            for e in range(indptr[u], indptr[u + 1]):
+                v = indices[e]
+                if v != u and (v not in out[u] or times[e] < out[u][v][0]):
+                    out[u][v] = inn[v][u] = (times[e], lengths[e], -1)
+
+        deleted_neighbors = [0] * n
+
+        def shortcuts_for(v):
+            needed = []
+            for u, (t_in, l_in, _) in inn[v].items():
+                targets = {w: (t_in + t_out, l_in + l_out) for w, (t_out, l_out, _) in out[v].items() if w != u}
+                if not targets:
+                    continue
+                limit = max(t for t, _ in targets.values())
+                witness = _witness_search(out, u, v, limit, set(targets))
+                for w, (t, l) in targets.items():
+                    if witness.get(w, INF) > t:
+                        needed.append((u, w, t, l))
+            return needed
+
+        def priority(v):
+            shortcuts = shortcuts_for(v)
+            edge_difference = len(shortcuts) - len(inn[v]) - len(out[v])
+            return 2 * edge_difference + deleted_neighbors[v] + level[v], shortcuts
+
+        level = [0] * n
+        heap = [(priority(v)[0], v) for v in range(n)]
+        heapq.heapify(heap)
+        up_edges = []
+        down_edges = []
+
+        while heap:
+            _, v = heapq.heappop(heap)
+            # Lazy update: re-evaluate and defer if it is no longer the cheapest
+            current, shortcuts = priority(v)
+            if heap and current > heap[0][0]:
+                heapq.heappush(heap, (current, v))
+                continue
+
+            for w, (t, l, m) in out[v].items():
+                up_edges.append((v, w, t, l, m))
+            for u, (t, l, m) in inn[v].items():
+                down_edges.append((v, u, t, l, m))
+
+            for u, w, t, l in shortcuts:
+                if w not in out[u] or t < out[u][w][0]:
+                    out[u][w] = inn[w][u] = (t, l, v)
+
+            neighbors = set(inn[v]) | set(out[v])
+            for u in inn[v]:
+                del out[u][v]
+            for w in out[v]:
+                del inn[w][v]
+            out[v] = {}
+            inn[v] = {}
+            for u in neighbors:
+                deleted_neighbors[u] += 1
+                level[u] = max(level[u], level[v] + 1)
+
+        return cls(n, _to_csr(n, up_edges), _to_csr(n, down_edges))
+
+    def save(self, path):
+        arrays = {f"up_{k}": v for k, v in self.up.items()}
+        arrays.update({f"down_{k}": v for k, v in self.down.items()})
+        np.savez_compressed(path, size=self.size, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            up = {k: data[f"up_{k}"] for k in _FIELDS}
+            down = {k: data[f"down_{k}"] for k in _FIELDS}
+            return cls(int(data["size"]), up, down)
+
+    def prepare(self):
+        """Build the query-time adjacency lists now instead of on first query"""
+        self._adjacency()
+
+    def _adjacency(self):
+        """Per-node lists of (other, time, length) for the up and down graphs,
+        built on first query; iterating these beats indexing CSR arrays"""
+        if self._lists is None:
+            lists = []
+            middles = {}
+            for side, forward in ((self.up, True), (self.down, False)):
+                indptr = side["indptr"].tolist()
+                edges = list(zip(side["indices"].tolist(), side["times"].tolist(), side["lengths"].tolist()))
+                lists.append([edges[indptr[v]:indptr[v + 1]] for v in range(self.size)])
+                nodes = np.repeat(np.arange(self.size), np.diff(side["indptr"]))
+                for node, other, middle in zip(nodes.tolist(), side["indices"].tolist(), side["middles"].tolist()):
+                    if middle >= 0:
+                        middles[(node, other) if forward else (other, node)] = middle
+            self._lists = tuple(lists)
+            self._middles = middles
+        return self._lists
+
+    def query(self, source, target):
+        """Same contract as astar(): (node path, minutes, km) or None"""
+        if source == target:
+            return [source], 0.0, 0.0
+        adjacency = self._adjacency()
+        dist = ({source: 0.0}, {target: 0.0})
+        parent = ({source: (-1, 0.0)}, {target: (-1, 0.0)})
+        settled = (set(), set())
+        heaps = ([(0.0, source)], [(0.0, target)])
+        best, meet = INF, -1
+
+        while True:
+            forward = heaps[0][0][0] if heaps[0] and heaps[0][0][0] < best else None
+            backward = heaps[1][0][0] if heaps[1] and heaps[1][0][0] < best else None
+            if forward is None and backward is None:
+                break
+            side = 0 if backward is None or (forward is not None and forward <= backward) else 1
+            cost, node = heapq.heappop(heaps[side])
+            if node in settled[side]:
+                continue
+            settled[side].add(node)
+
+            mine = dist[side]
+            other = dist[1 - side].get(node)
+            if other is not None and cost + other < best:
+                best, meet = cost + other, node
+
+            # Stall-on-demand: if a higher node already reached in this search
+            # offers a shorter way in, nothing settled from here can be optimal
+            stalled = False
+            for prev, time, _ in adjacency[1 - side][node]:
+                if mine.get(prev, INF) + time < cost:
+                    stalled = True
+                    break
+            if stalled:
+                continue
+
+            parents, heap = parent[side], heaps[side]
+            for nxt, time, length in adjacency[side][node]:
+                new_cost = cost + time
+                if new_cost < mine.get(nxt, INF):
+                    mine[nxt] = new_cost
+                    parents[nxt] = (node, length)
+                    heapq.heappush(heap, (new_cost, nxt))
+
+        if meet < 0:
+            return None
+
+        # Hierarchy path: source .. meet .. target
+        hops = []
+        distance = 0.0
+        node = meet
+        while parent[0][node][0] != -1:
+            prev, length = parent[0][node]
+            hops.append((prev, node))
+            distance += length
+            node = prev
+        hops.reverse()
+        node = meet
+        while parent[1][node][0] != -1:
+            nxt, length = parent[1][node]
+            hops.append((node, nxt))
+            distance += length
+            node = nxt
+
+        path = [source]
+        for hop in hops:
+            path.extend(self._unpack(*hop))
+        return path, best, distance
+
+    def _upward_search(self, side, start):
+        """Full upward search from start: {node: (minutes, km)} for every
+        settled, non-stalled node. side 0 searches forward, 1 backward."""
+        adjacency = self._adjacency()
+        dist = {start: 0.0}
+        length = {start: 0.0}
+        result = {}
+        heap = [(0.0, start)]
+        while heap:
+            cost, node = heapq.heappop(heap)
+            if node in result or cost > dist[node]:
+                continue
+            stalled = False
+            for prev, time, _ in adjacency[1 - side][node]:
+                if dist.get(prev, INF) + time < cost:
+                    stalled = True
+                    break
+            # Stalled nodes can't be on a shortest path through this side
+            result[node] = None if stalled else (cost, length[node])
+            if stalled:
+                continue
+            for nxt, time, edge_length in adjacency[side][node]:
+                new_cost = cost + time
+                if new_cost < dist.get(nxt, INF):
+                    dist[nxt] = new_cost
+                    length[nxt] = length[node] + edge_length
+                    heapq.heappush(heap, (new_cost, nxt))
+        return {node: value for node, value in result.items() if value is not None}
+
+    def many_to_many(self, sources, targets):
+        """Minutes and km between every source and target node.
+
+        Bucket-based: one backward search per target leaves (target, cost)
+        entries at the nodes it settles, then one forward search per source
+        scans those buckets. Unreachable pairs stay at inf.
+        """
+        times = np.full((len(sources), len(targets)), INF)
+        lengths = np.full((len(sources), len(targets)), INF)
+        buckets = {}
+        for j, target in enumerate(targets):
+            for node, (cost, length) in self._upward_search(1, target).items():
+                buckets.setdefault(node, []).append((j, cost, length))
+
+        for i, source in enumerate(sources):
+            row_times = [INF] * len(targets)
+            row_lengths = [INF] * len(targets)
+            for node, (cost, length) in self._upward_search(0, source).items():
+                for j, back_cost, back_length in buckets.get(node, ()):
+                    if cost + back_cost < row_times[j]:
+                        row_times[j] = cost + back_cost
+                        row_lengths[j] = length + back_length
+            times[i] = row_times
+            lengths[i] = row_lengths
+        return times, lengths
+
+    def _unpack(self, a, b):
+        """Road nodes after `a` along the hierarchy edge a -> b"""
+        nodes = []
+        stack = [(a, b)]
+        while stack:
+            a, b = stack.pop()
+            middle = self._middles.get((a, b))
+            if middle is None:
+                nodes.append(b)
+            else:
+                stack.append((middle, b))
+                stack.append((a, middle))
+        return nodes
+
+
+def _witness_search(out, source, skip, limit, targets):
+    """Bounded Dijkstra from source that avoids `skip`, stopping once every
+    target is settled"""
+    dist = {source: 0.0}
+    heap = [(0.0, source)]
+    settled = 0
+    while heap and targets and settled < WITNESS_SETTLE_LIMIT:
+        cost, node = heapq.heappop(heap)
+        if cost > limit:
+            break
+        if cost > dist[node]:
+            continue
+        settled += 1
+        targets.discard(node)
+        for nxt, (t, _, _) in out[node].items():
+            if nxt == skip:
+                continue
+            new_cost = cost + t
+            if new_cost <= limit and new_cost < dist.get(nxt, INF):
+                dist[nxt] = new_cost
+                heapq.heappush(heap, (new_cost, nxt))
+    return dist
@@ -0,0 +1,178 @@
+import heapq
+import os
+from math import ceil
+from time import monotonic
+
+import numpy as np
+
+from backend.algorithms.astar import SearchBudgetExceeded
+from backend.algorithms.routing import plan_route, route_matrix
+from backend.utils.geo import haversine_many
+
+# battery_kwh, kwh_per_km, max_charge_kw per vehicle type offered in the app
+VEHICLE_PROFILES = {
+    "Car": {"battery_kwh": 40.0, "kwh_per_km": 0.15, "max_charge_kw": 50.0},
+    "Bike": {"battery_kwh": 3.0, "kwh_per_km": 0.03, "max_charge_kw": 3.0},
+    "Auto": {"battery_kwh": 8.0, "kwh_per_km": 0.06, "max_charge_kw": 7.4},
+    "Bus": {"battery_kwh": 250.0, "kwh_per_km": 1.2, "max_charge_kw": 150.0},
+}
+STATION_POWER_KW = {"Fast": 50.0, "Normal": 7.4}
+
+SOC_BUCKETS = 20
+RESERVE_FRACTION = 0.05
+# Charging slows down above this state of charge
+TAPER_FRACTION = 0.8
+TAPER_FACTOR = 0.5
+
+# Stations further off the straight line than this are not considered
+CORRIDOR_FACTOR = 1.3
+CORRIDOR_SLACK_KM = 10.0
+MAX_CANDIDATES = 150
+MAX_EXPANSIONS = 50_000
+# Seconds a plan may take for its travel matrix and label search
+EV_ROUTE_BUDGET_SECONDS = float(os.environ.get("EV_ROUTE_BUDGET_SECONDS", 5))
+
+
+def charge_minutes(soc_from, soc_to, capacity, power_kw):
+    """Minutes to charge between two levels (kWh), slower above the taper point"""
+    taper = capacity * TAPER_FRACTION
+    fast = max(0.0, min(soc_to, taper) - soc_from)
+    slow = max(0.0, soc_to - max(soc_from, taper))
+    return (fast + slow / TAPER_FACTOR) / power_kw * 60.0
+
+
+def corridor_candidates(stations, start, end):
+    """(city stations, row) pairs worth considering as stops between start and end"""
+    direct = haversine_many(start[0], start[1], end[0], end[1])
+    limit = direct * CORRIDOR_FACTOR + CORRIDOR_SLACK_KM
+    found = []
+    for city in stations:
+        detour = (haversine_many(start[0], start[1], city.lats, city.lons)
+                  + haversine_many(end[0], end[1], city.lats, city.lons))
+        rows = np.flatnonzero((detour <= limit) & (city.available > 0))
+        found.extend((detour[row], city, int(row)) for row in rows)
+    found.sort(key=lambda item: item[0])
+    return [(city, row) for _, city, row in found[:MAX_CANDIDATES]]
+
+
+def plan_ev_route(roads, stations, start, end, battery_pct, vehicle_type, budget_seconds=EV_ROUTE_BUDGET_SECONDS):
+    """Fastest feasible route from start to end including charging stops.
+
+    Candidate stations along the corridor become overlay nodes with road
+    travel costs from one route_matrix call. A label-setting A* over
+    (node, state-of-charge bucket) then keeps, per node, only labels not
+    beaten on both time and charge. At a station the only charging
+    choices are "just enough for the next hop" and "full", which keeps the
+    branching factor linear in the candidates.
+    Returns None if no feasible plan exists, and raises SearchBudgetExceeded
+    if finding out takes more than budget_seconds or MAX_EXPANSIONS.
+    """
+    deadline = monotonic() + budget_seconds
+    profile = VEHICLE_PROFILES.get(vehicle_type, VEHICLE_PROFILES["Car"])
+    capacity = profile["battery_kwh"]
+    reserve = capacity * RESERVE_FRACTION
+
+    candidates = corridor_candidates(stations, start, end)
+    points = [start] + [(city.lats[row], city.lons[row]) for city, row in candidates] + [end]
+    powers = [0.0] + [
+        min(profile["max_charge_kw"], STATION_POWER_KW.get(city.types[city.type_codes[row]], STATION_POWER_KW["Normal"]))
+        for city, row in candidates
+    ] + [0.0]
+    target = len(points) - 1
+
+    distance, minutes, _ = route_matrix(roads, points, points, deadline)
+    energy = distance * profile["kwh_per_km"]
+    times = minutes.tolist()
+    usable = (energy <= capacity - reserve).tolist()
+    energy = energy.tolist()
+    remaining = [row[target] for row in times]
+
+    bucket_size = capacity / SOC_BUCKETS
+    soc = min(max(battery_pct, 0.0), 100.0) / 100.0 * capacity
+    # Labels: (time, node, soc, previous label id, charged to)
+    labels = [(0.0, 0, soc, -1, soc)]
+    best = {(0, int(soc // bucket_size)): 0.0}
+    frontier = {}
+    heap = [(remaining[0], 0.0, 0)]
+    expansions = 0
+    done = None
+
+    def dominated(node, time, soc):
+        for other_soc, other_time in frontier.get(node, ()):
+            if other_soc >= soc and other_time <= time:
+                return True
+        return False
+
+    def push(time, node, soc, previous, charged_to):
+        state = (node, int(soc // bucket_size))
+        if time >= best.get(state, float("inf")) or dominated(node, time, soc):
+            return
+        best[state] = time
+        frontier.setdefault(node, []).append((soc, time))
+        labels.append((time, node, soc, previous, charged_to))
+        heapq.heappush(heap, (time + remaining[node], time, len(labels) - 1))
+
+    while heap:
+        if expansions >= MAX_EXPANSIONS or (expansions % 1000 == 0 and monotonic() > deadline):
+            raise SearchBudgetExceeded
+        _, time, label_id = heapq.heappop(heap)
+        _, node, soc, _, _ = labels[label_id]
+        if time > best[(node, int(soc // bucket_size))]:
+            continue
+        if node == target:
+            done = label_id
+            break
+        expansions += 1
+
+        # Drive on as is, or charge just enough (rounded up to the next
+        # bucket) for the hop, or charge to full before it
+        can_charge = powers[node] > 0 and soc < capacity
+        full_time = time + charge_minutes(soc, capacity, capacity, powers[node]) if can_charge else 0.0
+        for nxt in range(1, len(points)):
+            if nxt == node or not usable[node][nxt]:
+                continue
+            hop = energy[node][nxt]
+            if soc - hop >= reserve:
+                push(time + times[node][nxt], nxt, soc - hop, label_id, soc)
+            elif can_charge:
+                level = min(ceil((hop + reserve) / bucket_size) * bucket_size, capacity)
+                charged = time + charge_minutes(soc, level, capacity, powers[node])
+                push(charged + times[node][nxt], nxt, level - hop, label_id, level)
+            if can_charge:
+                push(full_time + times[node][nxt], nxt, capacity - hop, label_id, capacity)
+
+    if done is None:
+        return None
+
+    # Walk the labels back to list the stops
+    chain = []
+    label_id = done
+    while label_id != -1:
+        chain.append(labels[label_id])
+        label_id = labels[label_id][3]
+    chain.reverse()
+
+    legs = []
+    stops = []
+    for (_, node, soc, _, _), (_, nxt, _, _, charged_to) in zip(chain, chain[1:]):
+        if charged_to > soc:
+            city, row = candidates[node - 1]
+            stops.append({
+                "station": city.station(row),
+                "arrival_battery": soc / capacity * 100.0,
+                "departure_battery": charged_to / capacity * 100.0,
+                "charge_time": charge_minutes(soc, charged_to, capacity, powers[node])
+            })
+        legs.append(plan_route(roads, *points[node], *points[nxt]))
+
+    total_distance = sum(leg["distance"] for leg in legs)
+    # Consecutive legs share their joining point
+    path = legs[0]["path"] + [point for leg in legs[1:] for point in leg["path"][1:]]
+    return {
+        "distance": total_distance,
+        "time": chain[-1][0],
+        "energy_cost": total_distance * profile["kwh_per_km"],
+        "path": path,
+        "charging_stops": stops,
+        "arrival_battery": chain[-1][2] / capacity * 100.0
+    }
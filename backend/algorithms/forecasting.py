@@ -0,0 +1,117 @@
+import os
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from backend.utils.cache import TTLCache
+from backend.utils.preprocessing import utilization_history
+
+FORECAST_CACHE_TTL = float(os.environ.get("FORECAST_CACHE_TTL", 15 * 60))
+FORECAST_CACHE_BYTES = int(os.environ.get("FORECAST_CACHE_BYTES", 64 * 1024 * 1024))
+
+
+def forecast_origin(now):
+    """Forecasts are made per full hour; a new hour makes older ones stale"""
+    return now.replace(minute=0, second=0, microsecond=0)
+
+
+class ForecastService:
+    """Forecaster with a cache keyed by (station_id, hours, model version).
+
+    Entries also remember the hour they were made for, so they go stale when
+    the hour turns over even before their TTL. When a station's live
+    occupancy changes, `refresh` recomputes just that station's entries;
+    `refresh_later` does the same on a background thread, merging updates
+    that arrive while it is busy. `history(stations, now, rows)` builds the
+    model input.
+    """
+
+    def __init__(self, forecaster, cache=None, history=utilization_history):
+        self.forecaster = forecaster
+        self.history = history
+        self.cache = cache if cache is not None else TTLCache(FORECAST_CACHE_TTL, FORECAST_CACHE_BYTES)
+        # station_id -> hours values it has been cached for
+        self._cached_hours = {}
+        # city -> (stations, station ids) waiting for the refresh thread
+        self._pending = {}
+        self._pending_changed = threading.Condition()
+        self._worker = None
+
+    @property
+    def horizon(self):
+        return self.forecaster.horizon
+
+    def _key(self, station_id, hours):
+        return station_id, hours, self.forecaster.version
+
+    def _lookup(self, station_id, hours, origin):
+        entry = self.cache.get(self._key(station_id, hours))
+        if entry is not None and entry[0] == origin:
+            return entry[1]
+        return None
+
+    def _store(self, station_id, hours, origin, forecast):
+        self.cache.put(self._key(station_id, hours), (origin, forecast))
+        self._cached_hours.setdefault(station_id, set()).add(hours)
+
+    def predict(self, stations, rows, hours, now):
+        """(len(rows), hours) forecasts; only cache misses go through the model, as one batch"""
+        origin = forecast_origin(now)
+        ids = stations.ids[rows].tolist()
+        result = np.empty((len(ids), hours))
+        missing = []
+        for i, station_id in enumerate(ids):
+            cached = self._lookup(station_id, hours, origin)
+            if cached is None:
+                missing.append(i)
+            else:
+                result[i] = cached
+        if missing:
+            fresh = self.forecaster.predict(self.history(stations, now, rows[missing]))[:, :hours]
+            result[missing] = fresh
+            for i, forecast in zip(missing, fresh):
+                self._store(ids[i], hours, origin, forecast.copy())
+        return result
+
+    def refresh(self, stations, station_ids, now):
+        """Recompute cached entries for stations whose occupancy just changed"""
+        ids = [i for i in station_ids if i in self._cached_hours]
+        if not ids:
+            return
+        origin = forecast_origin(now)
+        rows = np.array([stations.row_by_id[i] for i in ids])
+        fresh = self.forecaster.predict(self.history(stations, now, rows))
+        for station_id, forecast in zip(ids, fresh):
+            for hours in list(self._cached_hours[station_id]):
+                if self._key(station_id, hours) in self.cache:
+                    self._store(station_id, hours, origin, forecast[:hours].copy())
+                else:
+                    self._cached_hours[station_id].discard(hours)
+
+    def refresh_later(self, stations, station_ids):
+        """Queue `refresh` for the background thread, so callers holding a lock
+        (the station store's update lock) don't wait on the model"""
+        ids = {i for i in station_ids if i in self._cached_hours}
+        if not ids:
+            return
+        with self._pending_changed:
+            queued = self._pending.get(stations.city, (None, set()))[1]
+            self._pending[stations.city] = (stations, queued | ids)
+            # Started on first use, so each forked worker gets its own
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._refresh_pending, name="forecast-refresh", daemon=True)
+                self._worker.start()
+            self._pending_changed.notify()
+
+    def _refresh_pending(self):
+        while True:
+            with self._pending_changed:
+                while not self._pending:
+                    self._pending_changed.wait()
+                pending, self._pending = self._pending, {}
+            for stations, ids in pending.values():
+                self.refresh(stations, ids, datetime.now())
+
+    def stats(self):
+        return dict(self.cache.stats(), model_version=self.forecaster.version)
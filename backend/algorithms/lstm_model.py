@@ -0,0 +1,134 @@
+"""LSTM utilization forecaster.
+
+Train with `python -m backend.algorithms.lstm_model`, which fits the model on
+synthetic station histories and writes it, with its scaler, to MODEL_DIR.
+TensorFlow is imported only when a model is built or loaded, so importing
+this module (and the API that uses it) stays cheap.
+"""
+import json
+import os
+
+import numpy as np
+
+SEQUENCE_LENGTH = 24
+FORECAST_HORIZON = 24
+
+MODEL_DIR = os.environ.get("MODEL_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "models"))
+MODEL_PATH = os.path.join(MODEL_DIR, "utilization_lstm.keras")
+SCALER_PATH = os.path.join(MODEL_DIR, "utilization_scaler.json")
+
+
+def synthetic_utilization(n_stations, hours, seed=0):
+    """Hourly utilization % with morning and evening peaks that vary per station"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(hours)[None, :]
+    hour = t % 24
+    base = rng.uniform(15, 40, (n_stations, 1))
+    morning = rng.uniform(10, 35, (n_stations, 1)) * np.exp(-((hour - rng.normal(9, 1, (n_stations, 1))) ** 2) / 6)
+    evening = rng.uniform(15, 45, (n_stations, 1)) * np.exp(-((hour - rng.normal(18, 1, (n_stations, 1))) ** 2) / 8)
+    weekend = np.where((t // 24) % 7 >= 5, rng.uniform(0.7, 1.1, (n_stations, 1)), 1.0)
+    noise = rng.normal(0, 4, (n_stations, hours))
+    return np.clip((base + morning + evening) * weekend + noise, 0, 100)
+
+
+def make_sequences(series, sequence_length=SEQUENCE_LENGTH, horizon=FORECAST_HORIZON):
+    """Sliding windows over (stations, hours) -> X (samples, sequence_length, 1), y (samples, horizon)"""
+    window = sequence_length + horizon
+    windows = np.lib.stride_tricks.sliding_window_view(series, window, axis=1).reshape(-1, window)
+    return windows[:, :sequence_length, None], windows[:, sequence_length:]
+
+
+def build_model(sequence_length=SEQUENCE_LENGTH, horizon=FORECAST_HORIZON):
+    import tensorflow as tf
+
+    model = tf.keras.Sequential([
+        tf.keras.Input(shape=(sequence_length, 1)),
+        tf.keras.layers.LSTM(32),
+        tf.keras.layers.Dense(horizon),
+    ])
+    model.compile(optimizer="adam", loss="mse")
+    return model
+
+
+def train(n_stations=200, days=28, epochs=5, model_path=MODEL_PATH, scaler_path=SCALER_PATH):
+    from sklearn.preprocessing import MinMaxScaler
+
+    series = synthetic_utilization(n_stations, days * 24)
+    scaler = MinMaxScaler().fit(series.reshape(-1, 1))
+    scaled = scaler.transform(series.reshape(-1, 1)).reshape(series.shape)
+    x, y = make_sequences(scaled)
+
+    model = build_model()
+    model.fit(x, y, epochs=epochs, batch_size=256, validation_split=0.1, verbose=2)
+
+    os.makedirs(os.path.dirname(model_path), exist_ok=True)
+    model.save(model_path)
+    # Only min and scale are needed at inference, so store those instead of the scaler object
+    with open(scaler_path, "w") as f:
+        json.dump({"data_min": float(scaler.data_min_[0]), "scale": float(scaler.scale_[0])}, f)
+    return model
+
+
+class LSTMForecaster:
+    """Loaded model plus its scaler, predicting every station in one forward pass"""
+
+    def __init__(self, model, data_min, scale, version):
+        import tensorflow as tf
+
+        self.model = model
+        self.data_min = data_min
+        self.scale = scale
+        self.version = version
+        self.horizon = model.output_shape[-1]
+        # Traced once for any batch size, which skips eager dispatch on every call
+        self._forward = tf.function(
+            lambda x: model(x, training=False),
+            input_signature=[tf.TensorSpec([None, model.input_shape[1], 1], tf.float32)],
+        )
+
+    @classmethod
+    def load(cls, model_path=MODEL_PATH, scaler_path=SCALER_PATH):
+        import tensorflow as tf
+
+        with open(scaler_path) as f:
+            scaler = json.load(f)
+        model = tf.keras.models.load_model(model_path)
+        version = f"lstm-{int(os.path.getmtime(model_path))}"
+        return cls(model, scaler["data_min"], scaler["scale"], version)
+
+    def predict(self, histories):
+        """(stations, SEQUENCE_LENGTH) utilization % -> (stations, horizon) utilization %"""
+        histories = np.asarray(histories, dtype=np.float32)
+        if len(histories) == 0:
+            return np.empty((0, self.horizon))
+        x = ((histories - self.data_min) * self.scale)[..., None]
+        y = self._forward(x).numpy().astype(np.float64)
+        return np.clip(y / self.scale + self.data_min, 0, 100)
+
+
+class SeasonalNaiveForecaster:
+    """Fallback when no trained model is available: repeat the last day"""
+
+    version = "seasonal-naive"
+    horizon = FORECAST_HORIZON
+
+    def predict(self, histories):
+        # Hour h ahead is the same hour yesterday, i.e. the last 24 hours in order
+        histories = np.asarray(histories, dtype=np.float64).reshape(len(histories), -1)
+        return histories[:, -24:][:, :self.horizon]
+
+
+def load_forecaster():
+    """The trained LSTM if one has been saved, otherwise the seasonal-naive fallback"""
+    # Checked first so a deployment without a model never pays for importing TensorFlow
+    if not (os.path.exists(MODEL_PATH) and os.path.exists(SCALER_PATH)):
+        return SeasonalNaiveForecaster()
+    try:
+        return LSTMForecaster.load()
+    except (ImportError, OSError, ValueError):
+        return SeasonalNaiveForecaster()
+
+
+if __name__ == "__main__":
+    train()
+    print(f"Saved model to {MODEL_PATH}")
@@ -0,0 +1,110 @@
+"""Expected wait at a station, modelled as an M/M/c queue.
+
+Every slot is a server. The arrival rate and mean charging time are
+estimated per station from the last day of occupancy: utilization gives
+the mean number of busy slots, and where sessions were recorded, Little's
+law (busy slots = arrival rate x charging time) gives the charging time.
+Stations without enough recorded sessions use their type's typical
+charging time. Estimates are cached per city and refreshed every few
+minutes; applying them to live availability is a single array pass.
+"""
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+# Typical session length by station type, for stations without recorded sessions
+CHARGE_MINUTES = {"Fast": 45.0, "Normal": 120.0}
+DEFAULT_CHARGE_MINUTES = 90.0
+MIN_CHARGE_MINUTES = 5.0
+MAX_CHARGE_MINUTES = 8 * 60.0
+# Recorded sessions needed before they override the typical charging time
+MIN_RECORDED_SESSIONS = 5
+# Reported for saturated stations (arrivals outpace charging) and capped at
+MAX_WAIT_MINUTES = 4 * 60.0
+QUEUE_PARAMETERS_TTL = float(os.environ.get("QUEUE_PARAMETERS_TTL", 5 * 60))
+
+
+def erlang_c(servers, load):
+    """Probability an arrival has to wait in M/M/c, with `load` = arrival
+    rate x service time. Only meaningful where load < servers."""
+    servers = np.asarray(servers)
+    load = np.asarray(load, dtype=np.float64)
+    # Erlang B by its recurrence, one step per server count, then C from B
+    blocking = np.ones_like(load)
+    for k in range(1, int(servers.max(initial=0)) + 1):
+        step = load * blocking / (k + load * blocking)
+        blocking = np.where(k <= servers, step, blocking)
+    utilization = load / np.maximum(servers, 1)
+    return blocking / (1.0 - utilization * (1.0 - blocking))
+
+
+def estimate_parameters(busy, default_minutes, sessions=None, hours=None):
+    """(arrivals per minute, mean charging minutes) per station.
+
+    `busy` is the mean number of busy slots; `sessions` and `hours` the
+    recorded session starts and the hours they were recorded over.
+    """
+    service = np.array(default_minutes, dtype=np.float64)
+    if sessions is not None:
+        recorded = sessions >= MIN_RECORDED_SESSIONS
+        rate = sessions[recorded] / (hours[recorded] * 60.0)
+        service[recorded] = np.clip(busy[recorded] / rate, MIN_CHARGE_MINUTES, MAX_CHARGE_MINUTES)
+    return busy / service, service
+
+
+def queue_waits(servers, arrival_rate, service_minutes):
+    """(expected wait, expected wait when every slot is taken) in minutes.
+
+    The first is the M/M/c mean, Erlang C x 1 / (c mu - lambda); the second
+    drops the Erlang C factor, since an arrival at a full station waits for
+    sure.
+    """
+    servers = np.asarray(servers, dtype=np.float64)
+    load = arrival_rate * service_minutes
+    stable = (servers > 0) & (load < servers)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        full = np.where(stable, service_minutes / (servers - load), MAX_WAIT_MINUTES)
+        waiting = np.where(stable, erlang_c(servers, load), 1.0)
+    full = np.minimum(full, MAX_WAIT_MINUTES)
+    return waiting * full, full
+
+
+class WaitEstimator:
+    """Expected wait in minutes for every station of a city.
+
+    Queue parameters come from `occupancy` (an OccupancyStore: recorded
+    occupancy, falling back to the daily profile) and are cached per city
+    for QUEUE_PARAMETERS_TTL seconds or until the city is reloaded.
+    """
+
+    def __init__(self, occupancy, clock=time.time):
+        self.occupancy = occupancy
+        self._clock = clock
+        # city -> (CityStations, computed at, wait, wait when full)
+        self._waits = {}
+
+    def _estimate(self, stations, now):
+        rows = np.arange(len(stations))
+        history = self.occupancy.history(stations, datetime.fromtimestamp(now), rows)
+        busy = history.mean(axis=1) / 100.0 * stations.total
+        type_minutes = np.array([CHARGE_MINUTES.get(name, DEFAULT_CHARGE_MINUTES) for name in stations.types])
+        sessions = hours = None
+        recorded = self.occupancy.get(stations.city)
+        if recorded is not None and recorded.stations is stations:
+            sessions, hours = recorded.arrivals(now, history.shape[1])
+        arrival_rate, service_minutes = estimate_parameters(
+            busy, type_minutes[stations.type_codes], sessions, hours
+        )
+        return queue_waits(stations.total, arrival_rate, service_minutes)
+
+    def waits(self, stations):
+        """Expected wait per station given its live available slots"""
+        now = self._clock()
+        cached = self._waits.get(stations.city)
+        if cached is None or cached[0] is not stations or now - cached[1] > QUEUE_PARAMETERS_TTL:
+            cached = (stations, now, *self._estimate(stations, now))
+            self._waits[stations.city] = cached
+        _, _, wait, full_wait = cached
+        return np.where(stations.available > 0, wait, full_wait)
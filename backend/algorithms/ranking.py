@@ -0,0 +1,86 @@
+"""Station ranking with user weights, and the Pareto front of the trade-offs.
+
+Objectives are distance (km, lower is better), cost per hour (lower),
+available slots (higher) and speed (1 for fast stations, higher), plus an
+optional expected wait in minutes (lower). The weighted score generalises
+backend.utils.geo.station_score, which the default weights reproduce.
+"""
+import numpy as np
+
+from backend.utils.geo import AVAILABILITY_WEIGHT, COST_WEIGHT, DISTANCE_WEIGHT, FAST_TYPE_WEIGHT, smallest_k
+
+DEFAULT_WEIGHTS = {
+    "distance": DISTANCE_WEIGHT,
+    "cost": COST_WEIGHT,
+    "availability": AVAILABILITY_WEIGHT,
+    "speed": -FAST_TYPE_WEIGHT,
+    "wait": 0.0,
+}
+
+
+def weighted_scores(weights, distance, cost, available, speed, wait):
+    """Score per station, lower is better"""
+    return (weights["distance"] * distance + weights["cost"] * cost - weights["availability"] * available
+            - weights["speed"] * speed + weights["wait"] * wait)
+
+
+def pareto_front(distance, cost_code, available, speed):
+    """Positions of the points no other point beats on every objective.
+
+    `cost_code` is any integer code ordered like cost, `available` and
+    `speed` are whole numbers. Among points equal on all three only the
+    nearest can be on the front, so one pass keeps those. The rest are
+    checked against a grid indexed by the ranks of those three values
+    that holds, per cell, the least distance of any point at least as
+    cheap, free and fast: linear in the points and the grid size (distinct
+    costs x distinct slot counts x speeds), not quadratic. Points tied on
+    everything are all kept.
+    """
+    if not len(distance):
+        return np.empty(0, dtype=np.intp)
+    available = available.astype(np.int64)
+    speed = speed.astype(np.int64)
+    group = (cost_code.astype(np.int64) * (available.max() + 1) + available) * 2 + speed
+    nearest = np.full(group.max() + 1, np.inf)
+    np.minimum.at(nearest, group, distance)
+    candidates = np.flatnonzero(distance <= nearest[group])
+
+    d = distance[candidates]
+    c = np.unique(cost_code[candidates], return_inverse=True)[1]
+    a = np.unique(available[candidates], return_inverse=True)[1]
+    s = np.unique(speed[candidates], return_inverse=True)[1]
+    # Cell [c + 1, a, s] ends up with the least distance of any point with
+    # cost rank <= c, availability rank >= a and speed rank >= s; the
+    # padding row and columns stay inf
+    grid = np.full((c.max() + 2, a.max() + 2, s.max() + 2), np.inf)
+    np.minimum.at(grid, (c + 1, a, s), d)
+    np.minimum.accumulate(grid, axis=0, out=grid)
+    grid[:, ::-1] = np.minimum.accumulate(grid[:, ::-1], axis=1)
+    grid[:, :, ::-1] = np.minimum.accumulate(grid[:, :, ::-1], axis=2)
+    # Every other combination at least as good differs from this point's
+    # in one objective at least; those three cells cover them all
+    beaten = np.minimum(np.minimum(grid[c, a, s], grid[c + 1, a + 1, s]), grid[c + 1, a, s + 1])
+    return candidates[~(beaten <= d)]
+
+
+def rank_stations(stations, lat, lon, k, weights=None, waits=None, rows=None):
+    """(top k rows by weighted score, best first; their scores;
+    Pareto-optimal rows, nearest first) for a CityStations.
+
+    `rows` limits both to a filtered subset, all stations by default.
+    """
+    weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+    arrays = stations.arrays
+    rows = np.arange(len(stations)) if rows is None else np.asarray(rows, dtype=np.intp)
+    distance = arrays.distances(lat, lon, rows)
+    cost = arrays.costs[rows]
+    available = arrays.available[rows]
+    speed = (arrays.type_weights[rows] != 0).astype(np.float64)
+    wait = np.zeros(len(rows)) if waits is None else waits[rows]
+
+    scores = weighted_scores(weights, distance, cost, available, speed, wait)
+    positions = np.arange(len(rows))
+    top = smallest_k(scores, positions, k)
+    front = pareto_front(distance, stations.cost_codes[rows], available, speed)
+    front = front[np.lexsort((front, distance[front]))]
+    return rows[top], scores[top], rows[front]
@@ -0,0 +1,150 @@
+import numpy as np
+
+from backend.algorithms.spatial_index import StationIndex
+from backend.utils.geo import haversine_many
+
+# Used for edges without a usable speed value
+DEFAULT_SPEED_KMH = 30.0
+
+
+class RoadGraph:
+    """Directed road graph in CSR form.
+
+    Node i has outgoing edges indices[indptr[i]:indptr[i + 1]], with
+    parallel arrays for edge length (km) and travel time (minutes).
+    """
+
+    def __init__(self, lats, lons, sources, targets, lengths_km, speeds_kmh):
+        self.lats = np.ascontiguousarray(lats, dtype=np.float64)
+        self.lons = np.ascontiguousarray(lons, dtype=np.float64)
+        self.size = len(self.lats)
+
+        sources = np.asarray(sources, dtype=np.int64)
+        order = np.argsort(sources, kind="stable")
+        speeds = np.asarray(speeds_kmh, dtype=np.float64)
+        speeds = np.where(speeds > 0, speeds, DEFAULT_SPEED_KMH)
+
+        self.indptr = np.zeros(self.size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=self.size), out=self.indptr[1:])
+        self.indices = np.asarray(targets, dtype=np.int64)[order]
+        self.lengths = np.asarray(lengths_km, dtype=np.float64)[order]
+        self.times = self.lengths / speeds[order] * 60.0
+
+        # Fewest minutes any edge spends per km of straight-line progress.
+        # Straight-line distance times this never overestimates the remaining
+        # travel time, even where recorded edge lengths undercut the haversine
+        tails = np.repeat(np.arange(self.size), np.diff(self.indptr))
+        straight = haversine_many(self.lats[tails], self.lons[tails], self.lats[self.indices], self.lons[self.indices])
+        moving = straight > 0
+        self.minutes_per_km = float((self.times[moving] / straight[moving]).min()) if moving.any() else 0.0
+
+        self._node_index = None
+        self._lists = None
+        self._sparse = None
+
+    @classmethod
+    def from_csv(cls, nodes_path, edges_path):
+        """Load an OSM-style export.
+
+        nodes csv: id,lat,lon
+        edges csv: source,target,length_m,speed_kmh,oneway
+        """
+        nodes = np.loadtxt(nodes_path, delimiter=",", skiprows=1, ndmin=2)
+        edges = np.loadtxt(edges_path, delimiter=",", skiprows=1, ndmin=2)
+
+        node_ids = nodes[:, 0].astype(np.int64)
+        order = np.argsort(node_ids)
+        node_ids = node_ids[order]
+        sources = np.searchsorted(node_ids, edges[:, 0].astype(np.int64))
+        targets = np.searchsorted(node_ids, edges[:, 1].astype(np.int64))
+        lengths = edges[:, 2] / 1000.0
+        speeds = edges[:, 3]
+
+        # Two-way roads become one edge in each direction
+        two_way = edges[:, 4] == 0
+        return cls(
+            nodes[order, 1],
+            nodes[order, 2],
+            np.concatenate((sources, targets[two_way])),
+            np.concatenate((targets, sources[two_way])),
+            np.concatenate((lengths, lengths[two_way])),
+            np.concatenate((speeds, speeds[two_way])),
+        )
+
+    @classmethod
+    def grid(cls, center_lat, center_lon, rows, cols, spacing_km=0.5, seed=0):
+        """Synthetic city: a rows x cols street grid with jittered speeds"""
+        rng = np.random.default_rng(seed)
+        dlat = spacing_km / 111.0
+        dlon = spacing_km / (111.0 * np.cos(np.radians(center_lat)))
+        r, c = np.divmod(np.arange(rows * cols), cols)
+        lats = center_lat + (r - rows / 2) * dlat
+        lons = center_lon + (c - cols / 2) * dlon
+
+        node = np.arange(rows * cols).reshape(rows, cols)
+        horizontal = np.column_stack((node[:, :-1].ravel(), node[:, 1:].ravel()))
+        vertical = np.column_stack((node[:-1, :].ravel(), node[1:, :].ravel()))
+        pairs = np.vstack((horizontal, vertical))
+        speeds = rng.choice([20.0, 30.0, 40.0, 60.0], len(pairs), p=[0.3, 0.4, 0.2, 0.1])
+        lengths = haversine_many(lats[pairs[:, 0]], lons[pairs[:, 0]], lats[pairs[:, 1]], lons[pairs[:, 1]])
+        return cls(
+            lats,
+            lons,
+            np.concatenate((pairs[:, 0], pairs[:, 1])),
+            np.concatenate((pairs[:, 1], pairs[:, 0])),
+            np.concatenate((lengths, lengths)),
+            np.concatenate((speeds, speeds)),
+        )
+
+    @property
+    def edge_count(self):
+        return len(self.indices)
+
+    def nearest_node(self, lat, lon):
+        """Snap a coordinate to the closest graph node"""
+        nodes, distances = self.nearest_nodes([lat], [lon])
+        return int(nodes[0]), float(distances[0])
+
+    def nearest_nodes(self, lats, lons):
+        """Snap many coordinates at once: (node ids, distances in km)"""
+        self.prepare()
+        return self._node_index.nearest_many(lats, lons)
+
+    def prepare(self):
+        """Build the lazily created snapping index, list adjacency and sparse matrix now"""
+        if self._node_index is None:
+            self._node_index = StationIndex(self.lats, self.lons)
+        self.as_lists()
+        self.sparse()
+
+    def as_lists(self):
+        """Plain-list copy of the CSR arrays; element access is much faster
+        than NumPy scalar indexing inside the Python search loops."""
+        if self._lists is None:
+            self._lists = (
+                self.indptr.tolist(),
+                self.indices.tolist(),
+                self.times.tolist(),
+                self.lengths.tolist(),
+            )
+        return self._lists
+
+    def sparse(self):
+        """(SciPy CSR matrix of edge minutes, sorted edge keys, km per key)
+        for scipy.sparse.csgraph.
+
+        Of parallel edges only the fastest is kept, so the matrix has one
+        entry per key. Edge u -> v has key u * size + v.
+        """
+        if self._sparse is None:
+            from scipy.sparse import csr_matrix
+
+            tails = np.repeat(np.arange(self.size), np.diff(self.indptr))
+            keys = tails * self.size + self.indices
+            order = np.lexsort((self.times, keys))
+            keys, times, lengths = keys[order], self.times[order], self.lengths[order]
+            fastest = np.append(True, keys[1:] != keys[:-1])
+            keys, times, lengths = keys[fastest], times[fastest], lengths[fastest]
+            matrix = csr_matrix((times, (keys // self.size, keys % self.size)), shape=(self.size, self.size))
+            self._sparse = (matrix, keys, lengths)
+        return self._sparse
@@ -0,0 +1,70 @@
+import numpy as np
+
+from backend.algorithms.astar import astar, many_to_many
+
+# Speed assumed for the legs between the requested points and the nearest road nodes
+ACCESS_SPEED_KMH = 20.0
+ENERGY_KWH_PER_KM = 0.2
+
+
+def find_path(roads, source, target):
+    """Node path between two graph nodes, through the hierarchy when one is loaded"""
+    if roads.hierarchy is not None:
+        return roads.hierarchy.query(source, target)
+    return astar(roads.graph, source, target)
+
+
+def plan_route(roads, start_lat, start_lon, end_lat, end_lon):
+    """Route between two coordinates, or None if the road graph can't connect them"""
+    graph = roads.graph
+    source, start_gap = graph.nearest_node(start_lat, start_lon)
+    target, end_gap = graph.nearest_node(end_lat, end_lon)
+
+    found = find_path(roads, source, target)
+    if found is None:
+        return None
+    path, minutes, distance = found
+
+    access = start_gap + end_gap
+    distance += access
+    minutes += access / ACCESS_SPEED_KMH * 60.0
+
+    lats = graph.lats[path].tolist()
+    lons = graph.lons[path].tolist()
+    geometry = [[start_lat, start_lon]] + [list(p) for p in zip(lats, lons)] + [[end_lat, end_lon]]
+    return {
+        "distance": distance,
+        "time": minutes,
+        "energy_cost": distance * ENERGY_KWH_PER_KM,
+        "path": geometry
+    }
+
+
+def route_matrix(roads, origins, destinations, deadline=None):
+    """Travel matrices from every origin to every destination ((lat, lon) pairs).
+
+    Points are snapped to road nodes and each distinct node pair is searched
+    once: a bucket many-to-many over the hierarchy when one is loaded,
+    otherwise SciPy's Dijkstra from every origin node. Returns (km, minutes, kWh)
+    arrays of shape (len(origins), len(destinations)), inf where unreachable.
+    Without a hierarchy, SearchBudgetExceeded is raised past `deadline`.
+    """
+    graph = roads.graph
+    origins = np.asarray(origins, dtype=np.float64).reshape(-1, 2)
+    destinations = np.asarray(destinations, dtype=np.float64).reshape(-1, 2)
+    origin_nodes, origin_gaps = graph.nearest_nodes(origins[:, 0], origins[:, 1])
+    target_nodes, target_gaps = graph.nearest_nodes(destinations[:, 0], destinations[:, 1])
+
+    sources, source_of = np.unique(origin_nodes, return_inverse=True)
+    targets, target_of = np.unique(target_nodes, return_inverse=True)
+    sources, targets = sources.tolist(), targets.tolist()
+
+    if roads.hierarchy is not None:
+        times, lengths = roads.hierarchy.many_to_many(sources, targets)
+    else:
+        times, lengths = many_to_many(graph, sources, targets, deadline)
+
+    access = origin_gaps[:, None] + target_gaps[None, :]
+    distance = lengths[np.ix_(source_of, target_of)] + access
+    minutes = times[np.ix_(source_of, target_of)] + access / ACCESS_SPEED_KMH * 60.0
+    return distance, minutes, distance * ENERGY_KWH_PER_KM
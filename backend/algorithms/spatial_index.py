@@ -0,0 +1,69 @@
+import numpy as np
+
+from backend.utils.geo import EARTH_RADIUS_KM
+
+
+def to_unit_xyz(lats, lons):
+    """Project lat/lon degrees onto 3D points on the unit sphere"""
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lon = np.radians(np.asarray(lons, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+
+def km_to_chord(distance_km):
+    # Straight-line distance through the unit sphere for a great-circle distance
+    angle = min(distance_km / EARTH_RADIUS_KM, np.pi)
+    return 2.0 * np.sin(angle / 2.0)
+
+
+def chord_to_km(chord):
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2.0, 0.0, 1.0))
+
+
+class StationIndex:
+    """k-d tree over station coordinates on the unit sphere.
+
+    Chord length is monotonic in great-circle distance, so euclidean
+    nearest-k and radius queries on the projected points give the same
+    ordering as haversine on lat/lon.
+    """
+
+    def __init__(self, lats, lons):
+        # Imported here: scikit-learn adds about a second to process start
+        from sklearn.neighbors import KDTree
+
+        self.size = len(lats)
+        self.tree = KDTree(to_unit_xyz(lats, lons)) if self.size else None
+
+    def nearest(self, lat, lon, k=1):
+        """Return (indices, distances in km) of the k closest stations"""
+        k = min(k, self.size)
+        if k == 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        chords, indices = self.tree.query(to_unit_xyz([lat], [lon]), k=k)
+        return indices[0], chord_to_km(chords[0])
+
+    def nearest_many(self, lats, lons):
+        """Closest station for each of many points: (indices, distances in km)"""
+        if self.size == 0 or len(lats) == 0:
+            return np.empty(len(lats), dtype=np.intp), np.full(len(lats), np.inf)
+        chords, indices = self.tree.query(to_unit_xyz(lats, lons), k=1)
+        return indices[:, 0], chord_to_km(chords[:, 0])
+
+    def nearest_k_many(self, lats, lons, k):
+        """k closest stations for each of many points: (indices, km), both (points, k), nearest first"""
+        k = min(k, self.size)
+        if k == 0 or len(lats) == 0:
+            return np.empty((len(lats), k), dtype=np.intp), np.empty((len(lats), k))
+        chords, indices = self.tree.query(to_unit_xyz(lats, lons), k=k)
+        return indices, chord_to_km(chords)
+
+    def within(self, lat, lon, radius_km):
+        """Return indices of stations within radius_km, in station order"""
+        if self.size == 0:
+            return np.empty(0, dtype=np.intp)
+        indices = self.tree.query_radius(to_unit_xyz([lat], [lon]), r=km_to_chord(radius_km))[0]
+        indices.sort()
+        return indices
+
@@ -0,0 +1,155 @@
+import numpy as np
+
+# Stations are keyed by their Web Mercator tile at this zoom; a tile at any
+# lower zoom is then one contiguous run of the sorted keys
+KEY_ZOOM = 24
+# Crowded tiles are aggregated on a 2^bits x 2^bits grid (8 x 8 = 64 cells)
+CLUSTER_CELL_BITS = 3
+MAX_TILE_ZOOM = KEY_ZOOM - CLUSTER_CELL_BITS
+# Tiles holding more stations than this are clustered at every zoom, so no
+# tile lists more; at MAX_TILE_ZOOM a cell is still one KEY_ZOOM tile
+MAX_TILE_STATIONS = 256
+
+MAX_MERCATOR_LAT = 85.05112878
+
+# Packed little-endian records for the binary encoding
+STATION_RECORD = np.dtype([
+    ("id", "<i8"), ("lat", "<f4"), ("lon", "<f4"), ("cost", "<f4"),
+    ("available", "<u2"), ("total", "<u2"), ("type", "u1"),
+])
+CLUSTER_RECORD = np.dtype([
+    ("lat", "<f4"), ("lon", "<f4"), ("count", "<u4"), ("available", "<u4"), ("total", "<u4"),
+])
+
+
+def mercator(lats, lons):
+    """Web Mercator position in [0, 1) x [0, 1), y growing southwards"""
+    lats = np.radians(np.clip(np.asarray(lats, dtype=np.float64), -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT))
+    x = (np.asarray(lons, dtype=np.float64) + 180.0) / 360.0
+    y = (1.0 - np.arcsinh(np.tan(lats)) / np.pi) / 2.0
+    return x, y
+
+
+def _spread_bits(v):
+    """Insert a zero bit above each of the low 32 bits"""
+    v = v.astype(np.uint64) & np.uint64(0xFFFFFFFF)
+    for shift, mask in ((16, 0x0000FFFF0000FFFF), (8, 0x00FF00FF00FF00FF), (4, 0x0F0F0F0F0F0F0F0F),
+                        (2, 0x3333333333333333), (1, 0x5555555555555555)):
+        v = (v | (v << np.uint64(shift))) & np.uint64(mask)
+    return v
+
+
+def tile_keys(lats, lons):
+    """Morton (quadkey-ordered) key of each point's KEY_ZOOM tile"""
+    x, y = mercator(lats, lons)
+    side = 1 << KEY_ZOOM
+    tx = np.clip((x * side).astype(np.int64), 0, side - 1)
+    ty = np.clip((y * side).astype(np.int64), 0, side - 1)
+    return (_spread_bits(tx) | (_spread_bits(ty) << np.uint64(1))).astype(np.int64)
+
+
+def tile_key_range(z, x, y):
+    """[low, high) of the keys inside tile z/x/y"""
+    prefix = int(_spread_bits(np.array([x]))[0] | (_spread_bits(np.array([y]))[0] << np.uint64(1)))
+    shift = 2 * (KEY_ZOOM - z)
+    return prefix << shift, (prefix + 1) << shift
+
+
+class StationTiles:
+    """Stations of one city sorted by tile key.
+
+    Any slippy-map tile is a contiguous slice of `order`, found with two
+    binary searches. Clusters are read off prefix sums over that order, so
+    a low-zoom tile costs one search per grid cell however many stations
+    it covers.
+    """
+
+    def __init__(self, lats, lons, total):
+        keys = tile_keys(lats, lons)
+        self.order = np.argsort(keys, kind="stable")
+        self.keys = keys[self.order]
+        self._lat_sums = _prefix_sums(np.asarray(lats, dtype=np.float64)[self.order])
+        self._lon_sums = _prefix_sums(np.asarray(lons, dtype=np.float64)[self.order])
+        self._total_sums = _prefix_sums(np.asarray(total, dtype=np.int64)[self.order])
+        # (version, sums): live availability is re-summed once per data version
+        self._available_sums = (None, None)
+
+    def __getstate__(self):
+        # Availability sums belong to one data version; rebuild after restore
+        state = dict(self.__dict__)
+        state["_available_sums"] = (None, None)
+        return state
+
+    def rows(self, z, x, y):
+        """Station rows inside tile z/x/y, in key order"""
+        low, high = tile_key_range(z, x, y)
+        start, stop = np.searchsorted(self.keys, [low, high])
+        return self.order[start:stop]
+
+    def tile(self, stations, z, x, y):
+        """("stations", rows) for tiles of at most MAX_TILE_STATIONS,
+        ("clusters", columns) for the rest"""
+        low, high = tile_key_range(z, x, y)
+        start, stop = np.searchsorted(self.keys, [low, high])
+        if stop - start <= MAX_TILE_STATIONS:
+            return "stations", self.order[start:stop]
+
+        # Each grid cell is the next equal-width run of keys inside the tile
+        cell_width = 1 << (2 * (KEY_ZOOM - z - CLUSTER_CELL_BITS))
+        edges = np.searchsorted(self.keys, low + cell_width * np.arange(4 ** CLUSTER_CELL_BITS + 1))
+        occupied = edges[1:] > edges[:-1]
+        first, last = edges[:-1][occupied], edges[1:][occupied]
+        counts = last - first
+        available = self._available(stations)
+        return "clusters", {
+            "lat": (self._lat_sums[last] - self._lat_sums[first]) / counts,
+            "lon": (self._lon_sums[last] - self._lon_sums[first]) / counts,
+            "count": counts,
+            "available_slots": available[last] - available[first],
+            "total_slots": self._total_sums[last] - self._total_sums[first],
+        }
+
+    def _available(self, stations):
+        version, sums = self._available_sums
+        if version != stations.version:
+            version = stations.version
+            sums = _prefix_sums(stations.available[self.order].astype(np.int64))
+            self._available_sums = (version, sums)
+        return sums
+
+
+def _prefix_sums(values):
+    sums = np.zeros(len(values) + 1, dtype=values.dtype)
+    np.cumsum(values, out=sums[1:])
+    return sums
+
+
+def station_columns(stations, rows):
+    """Compact per-station columns for a detailed tile; names and addresses
+    are left out and can be fetched per station"""
+    return {
+        "id": stations.ids[rows],
+        "lat": stations.lats[rows],
+        "lon": stations.lons[rows],
+        "cost_per_hour": stations.costs[rows],
+        "available_slots": stations.available[rows].astype(np.int64),
+        "total_slots": stations.total[rows],
+        "type": stations.type_codes[rows],
+    }
+
+
+def pack_columns(kind, columns):
+    """Columns as packed STATION_RECORD / CLUSTER_RECORD bytes"""
+    if kind == "stations":
+        records = np.empty(len(columns["id"]), dtype=STATION_RECORD)
+        records["id"] = columns["id"]
+        records["cost"] = columns["cost_per_hour"]
+        records["type"] = columns["type"]
+    else:
+        records = np.empty(len(columns["count"]), dtype=CLUSTER_RECORD)
+        records["count"] = columns["count"]
+    records["lat"] = columns["lat"]
+    records["lon"] = columns["lon"]
+    records["available"] = columns["available_slots"]
+    records["total"] = columns["total_slots"]
+    return records.tobytes()
@@ -0,0 +1,147 @@
+import time
+from threading import Condition, Lock
+
+import numpy as np
+
+from backend.utils.shared_memory import shared_copy
+
+# Station changes kept per city for clients catching up after a reconnect
+FEED_HISTORY = 100_000
+# How often waiting streams check for updates logged by other worker processes
+FEED_POLL_SECONDS = 0.25
+
+
+class FeedLog:
+    """Ring of (version, row, available slots) changes for one CityStations.
+
+    Entries are appended in version order under the store's update lock;
+    after `share` the ring lives in shared memory, so every forked worker
+    reads the changes any of them logged. Readers don't lock: they check
+    afterwards that nothing they needed was overwritten meanwhile.
+    """
+
+    def __init__(self, stations, capacity):
+        self.stations = stations
+        self.versions = np.zeros(capacity, dtype=np.int64)
+        self.rows = np.zeros(capacity, dtype=np.int32)
+        self.slots = np.zeros(capacity, dtype=np.int32)
+        # [entries ever written, newest version fully logged, newest version
+        # (partly) overwritten]; versions up to the last aren't in the ring
+        self.state = np.array([0, stations.version, stations.version], dtype=np.int64)
+
+    @property
+    def latest(self):
+        return int(self.state[1])
+
+    def append(self, version, rows, slots):
+        capacity = len(self.versions)
+        written = int(self.state[0])
+        if len(rows) > capacity:
+            # Too big to log: clients behind it refetch
+            self.state[2] = version
+            self.state[1] = version
+            return
+        logical = written + np.arange(len(rows))
+        positions = logical % capacity
+        replaced = positions[logical >= capacity]
+        if len(replaced):
+            self.state[2] = max(int(self.state[2]), int(self.versions[replaced].max()))
+        self.versions[positions] = version
+        self.rows[positions] = rows
+        self.slots[positions] = slots
+        # Entries first, then the count and version readers go by
+        self.state[0] = written + len(rows)
+        self.state[1] = version
+
+    def changes_since(self, version):
+        """(merged {station_id: slots} or None, latest version)"""
+        latest = int(self.state[1])
+        if version == latest:
+            return {}, latest
+        if version > latest or version < self.state[2]:
+            return None, latest
+        written = int(self.state[0])
+        capacity = len(self.versions)
+        # Versions grow along the ring: binary search for the first newer entry
+        low, high = max(0, written - capacity), written
+        while low < high:
+            middle = (low + high) // 2
+            if self.versions[middle % capacity] <= version:
+                low = middle + 1
+            else:
+                high = middle
+        positions = np.arange(low, written) % capacity
+        versions, rows, slots = self.versions[positions], self.rows[positions], self.slots[positions]
+        if version < self.state[2]:
+            return None, latest
+        keep = versions <= latest
+        # Later entries overwrite earlier ones for the same station
+        return dict(zip(self.stations.ids[rows[keep]].tolist(), slots[keep].tolist())), latest
+
+    def share(self):
+        self.versions = shared_copy(self.versions)
+        self.rows = shared_copy(self.rows)
+        self.slots = shared_copy(self.slots)
+        self.state = shared_copy(self.state)
+
+
+class AvailabilityFeed:
+    """Per-city log of available_slots changes for streaming clients.
+
+    Each store update is logged under the city's new version. Clients ask
+    for everything after the version they have and get the merged
+    {station_id: slots} deltas, or None when the log no longer reaches back
+    that far and they need to refetch the full list.
+    """
+
+    def __init__(self, store, history=FEED_HISTORY):
+        self._store = store
+        self._history = history
+        self._logs = {}
+        self._lock = Lock()
+        self._condition = Condition()
+        store.subscribe(self._on_update)
+
+    def _log(self, stations):
+        # A reloaded city starts a new log
+        log = self._logs.get(stations.city)
+        if log is None or log.stations is not stations:
+            with self._lock:
+                log = self._logs.get(stations.city)
+                if log is None or log.stations is not stations:
+                    log = self._logs[stations.city] = FeedLog(stations, self._history)
+        return log
+
+    def _on_update(self, stations, station_ids):
+        rows = np.array([stations.row_by_id[i] for i in station_ids], dtype=np.int64)
+        self._log(stations).append(stations.version, rows, stations.available[rows])
+        with self._condition:
+            self._condition.notify_all()
+
+    def latest(self, city):
+        return self._log(self._store.get(city)).latest
+
+    def changes_since(self, city, version):
+        """(merged changes or None, latest version)"""
+        return self._log(self._store.get(city)).changes_since(version)
+
+    def wait(self, city, version, timeout):
+        """Block until the city moves past `version`; False on timeout.
+
+        Updates in this process wake waiters at once; those logged by other
+        worker processes are noticed within FEED_POLL_SECONDS.
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self.latest(city) <= version:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(min(remaining, FEED_POLL_SECONDS))
+        return True
+
+    def share(self):
+        """Create logs for every loaded city in shared memory (see
+        StationStore.share); call right after it"""
+        for city in self._store.loaded():
+            self._log(self._store.get(city)).share()
@@ -0,0 +1,237 @@
+"""Bulk-import station dumps into the station database.
+
+    python -m backend.data.importer poi.json [more.csv ...] [--db PATH]
+    python -m backend.data.importer --synthetic 1000000 --city Mumbai
+
+JSON files may be an OpenChargeMap POI array (or one object per line) and
+CSV files either OpenChargeMap-style or this app's own columns. Files are
+parsed as a stream and written in batches, so dumps larger than memory
+import fine. Records are upserted on (source, source id): re-running an
+import with a newer dump updates stations in place.
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import re
+import time
+
+import numpy as np
+
+from backend.data.stations import CITY_CENTERS, STATION_DB, StationDatabase, synthetic_stations
+from backend.utils.geo import haversine_many
+
+IMPORT_BATCH = 5_000
+READ_CHUNK = 1 << 20
+# Records further than this from every known city keep their own town name
+CITY_RADIUS_KM = 60.0
+# Connectors at or above this power make a station "Fast"
+FAST_POWER_KW = 22.0
+DEFAULT_COST_PER_HOUR = {"Fast": 150, "Normal": 100}
+
+_CENTER_LATS = np.array([c[0] for c in CITY_CENTERS.values()])
+_CENTER_LONS = np.array([c[1] for c in CITY_CENTERS.values()])
+# First number in free text such as "INR 150 per hour"
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?")
+
+
+def iter_json_records(path):
+    """Objects from a top-level JSON array, or from JSON lines, without
+    loading the whole file"""
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        buffer = ""
+        position = 0
+        started = False
+        eof = False
+        while True:
+            # Skip separators between records
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if not started and position < len(buffer):
+                started = True
+                if buffer[position] == "[":
+                    position += 1
+                    continue
+            if position < len(buffer) and buffer[position] == "]":
+                return
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    if buffer[position:].strip():
+                        raise
+                    return
+                chunk = f.read(READ_CHUNK)
+                eof = not chunk
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+            yield record
+            position = end
+
+
+def iter_csv_records(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        yield from csv.DictReader(f)
+
+
+def _number(value, default=None):
+    if value is None or value == "":
+        return default
+    if isinstance(value, (int, float)):
+        return value if math.isfinite(value) else default
+    text = str(value).replace(",", "").strip()
+    try:
+        number = float(text)
+    except ValueError:
+        match = _NUMBER.search(text)
+        if match is None:
+            return default
+        number = float(match.group())
+    return number if math.isfinite(number) else default
+
+
+def _hourly_cost(usage_cost, station_type):
+    """OpenChargeMap's free-text UsageCost, when it is quoted per hour"""
+    text = str(usage_cost or "").lower()
+    if "hour" in text or "/hr" in text or "per hr" in text:
+        return _number(text, DEFAULT_COST_PER_HOUR[station_type])
+    return DEFAULT_COST_PER_HOUR[station_type]
+
+
+def _city(town, lat, lon):
+    """Nearest known city within CITY_RADIUS_KM, else the record's town"""
+    distances = haversine_many(lat, lon, _CENTER_LATS, _CENTER_LONS)
+    nearest = int(np.argmin(distances))
+    if distances[nearest] <= CITY_RADIUS_KM:
+        return list(CITY_CENTERS)[nearest]
+    return town or "Unknown"
+
+
+def from_openchargemap(record):
+    """(source id, station dict) for an OpenChargeMap POI, or None if unusable"""
+    address = record.get("AddressInfo") or {}
+    lat = _number(address.get("Latitude"))
+    lon = _number(address.get("Longitude"))
+    if lat is None or lon is None:
+        return None
+
+    connections = record.get("Connections") or []
+    power = max((_number(c.get("PowerKW"), 0) for c in connections), default=0)
+    points = _number(record.get("NumberOfPoints")) or sum(int(_number(c.get("Quantity"), 1)) for c in connections) or 1
+    station_type = "Fast" if power >= FAST_POWER_KW else "Normal"
+    street = ", ".join(part for part in (address.get("AddressLine1"), address.get("Town")) if part)
+    return record.get("ID"), {
+        "city": _city(address.get("Town"), lat, lon),
+        "name": address.get("Title") or f"Station {record.get('ID')}",
+        "lat": lat,
+        "lon": lon,
+        # Dumps have no live occupancy; the availability feed fills it in
+        "available_slots": int(points),
+        "total_slots": int(points),
+        "type": station_type,
+        "address": street,
+        "cost_per_hour": _hourly_cost(record.get("UsageCost"), station_type),
+        "supports_swapping": False,
+    }
+
+
+def from_csv_row(row):
+    """(source id, station dict) for a CSV row in this app's columns or
+    OpenChargeMap's flattened export columns"""
+    if "AddressInfo.Latitude" in row or "Latitude" in row:
+        nested = {
+            "ID": row.get("ID"),
+            "NumberOfPoints": row.get("NumberOfPoints"),
+            "UsageCost": row.get("UsageCost"),
+            "AddressInfo": {
+                key: row.get(f"AddressInfo.{key}", row.get(key))
+                for key in ("Title", "AddressLine1", "Town", "Latitude", "Longitude")
+            },
+            "Connections": [{"PowerKW": row.get("PowerKW"), "Quantity": row.get("Quantity")}],
+        }
+        return from_openchargemap(nested)
+
+    lat, lon = _number(row.get("lat")), _number(row.get("lon"))
+    if lat is None or lon is None:
+        return None
+    total = int(_number(row.get("total_slots"), 1))
+    station_type = row.get("type") or "Normal"
+    return row.get("id") or f"{lat:.6f},{lon:.6f}", {
+        "city": row.get("city") or _city(None, lat, lon),
+        "name": row.get("name") or "EV Station",
+        "lat": lat,
+        "lon": lon,
+        "available_slots": int(_number(row.get("available_slots"), total)),
+        "total_slots": total,
+        "type": station_type,
+        "address": row.get("address") or "",
+        "cost_per_hour": _number(row.get("cost_per_hour"), DEFAULT_COST_PER_HOUR.get(station_type, 100)),
+        "supports_swapping": str(row.get("supports_swapping", "")).lower() in ("1", "true", "yes"),
+    }
+
+
+def import_records(database, source, records, batch=IMPORT_BATCH):
+    """Upsert (source id, station) pairs in batches, one transaction per
+    batch; None entries are skipped. Returns the number written."""
+    written = 0
+    pending = []
+    connection = database.connect()
+    try:
+        for record in records:
+            if record is None:
+                continue
+            pending.append(record)
+            if len(pending) >= batch:
+                database.upsert(connection, source, pending)
+                connection.commit()
+                written += len(pending)
+                pending = []
+        if pending:
+            database.upsert(connection, source, pending)
+            connection.commit()
+            written += len(pending)
+    finally:
+        connection.close()
+    return written
+
+
+def import_file(database, path):
+    """Import one dump; the source is named after the file's format"""
+    if path.lower().endswith(".csv"):
+        return import_records(database, "csv", (from_csv_row(row) for row in iter_csv_records(path)))
+    return import_records(database, "openchargemap", (from_openchargemap(r) for r in iter_json_records(path)))
+
+
+def import_synthetic(database, city, n, seed=0):
+    """Write n synthetic stations for a city (load testing)"""
+    stations = synthetic_stations(city, n, seed)
+    return import_records(database, "synthetic", ((s.pop("id"), s) for s in stations))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import station dumps into the station database")
+    parser.add_argument("paths", nargs="*", help="OpenChargeMap JSON / JSON lines or CSV files")
+    parser.add_argument("--db", default=STATION_DB)
+    parser.add_argument("--synthetic", type=int, default=0, help="also generate this many synthetic stations")
+    parser.add_argument("--city", default="Mumbai", help="city for --synthetic")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    database = StationDatabase(args.db)
+    for path in args.paths:
+        start = time.perf_counter()
+        count = import_file(database, path)
+        print(f"{os.path.basename(path)}: {count} stations in {time.perf_counter() - start:.1f}s")
+    if args.synthetic:
+        start = time.perf_counter()
+        count = import_synthetic(database, args.city, args.synthetic, args.seed)
+        print(f"synthetic {args.city}: {count} stations in {time.perf_counter() - start:.1f}s")
+    for city, count in sorted(database.counts().items()):
+        print(f"{city:>12} {count:>10}")
+
+
+if __name__ == "__main__":
+    main()
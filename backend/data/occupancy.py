@@ -0,0 +1,271 @@
+"""Recorded station occupancy.
+
+Stations (or `python -m backend.data.simulator` standing in for them) POST
+batches of (station id, timestamp, available slots) events to
+/api/occupancy. Each city keeps fixed-size rings of per-station means at a
+few resolutions, so memory depends on the station count and ROLLUPS, not on
+the event rate or uptime. The newest event per station also becomes its
+live available_slots in the station store.
+"""
+import multiprocessing
+import time
+from threading import Lock
+
+import numpy as np
+
+from backend.algorithms.lstm_model import SEQUENCE_LENGTH
+from backend.utils.preprocessing import utilization_history
+from backend.utils.shared_memory import shared_copy
+
+# (name, bucket width in seconds, buckets kept): 2 hours, 1 day and 1 week.
+# Each bucket costs 12 bytes per station
+ROLLUPS = (("1m", 60, 120), ("15m", 15 * 60, 96), ("1h", 60 * 60, 168))
+# The forecaster's input comes from the hourly ring
+HISTORY_ROLLUP = "1h"
+# least_queue ranks by mean availability over this window of the 1-minute ring
+RECENT_ROLLUP = "1m"
+RECENT_WINDOW_SECONDS = 15 * 60
+# Events stamped further ahead of the server clock than this are dropped,
+# so one bad clock can't push the rings forward and wipe them
+MAX_CLOCK_SKEW_SECONDS = 5 * 60
+
+
+class Rollup:
+    """Ring of per-station means (and session starts) over fixed-width time buckets.
+
+    Time is shared by every station, so column i of `sums` and `counts`
+    holds bucket `buckets[i]` for all of them and moving the ring forward
+    resets whole columns. Events older than the ring are dropped.
+    """
+
+    def __init__(self, size, width, slots):
+        self.width = width
+        self.slots = slots
+        self.sums = np.zeros((slots, size), dtype=np.float32)
+        self.counts = np.zeros((slots, size), dtype=np.uint32)
+        self.arrivals = np.zeros((slots, size), dtype=np.float32)
+        self.buckets = np.full(slots, -1, dtype=np.int64)
+        # Newest bucket in the ring; an array so share() can move it
+        self.head = np.full(1, -1, dtype=np.int64)
+
+    def bucket(self, timestamps):
+        return np.floor_divide(timestamps, self.width).astype(np.int64)
+
+    def _advance(self, bucket):
+        head = int(self.head[0])
+        if bucket <= head:
+            return
+        new = np.arange(max(head + 1, bucket - self.slots + 1), bucket + 1)
+        columns = new % self.slots
+        # Columns never used are still zero; writing them anyway would make
+        # the whole ring resident on the first event
+        used = columns[self.buckets[columns] >= 0]
+        self.sums[used] = 0
+        self.counts[used] = 0
+        self.arrivals[used] = 0
+        self.buckets[columns] = new
+        self.head[0] = bucket
+
+    def add(self, rows, timestamps, values, arrivals):
+        """Accumulate events; returns the mask of those still inside the ring"""
+        buckets = self.bucket(timestamps)
+        self._advance(int(buckets.max()))
+        kept = buckets > self.head[0] - self.slots
+        columns = buckets[kept] % self.slots
+        np.add.at(self.sums, (columns, rows[kept]), values[kept])
+        np.add.at(self.counts, (columns, rows[kept]), 1)
+        np.add.at(self.arrivals, (columns, rows[kept]), arrivals[kept])
+        return kept
+
+    def window(self, end, length):
+        """Columns of the `length` buckets ending at bucket `end`, and which of them still hold it"""
+        wanted = np.arange(end - length + 1, end + 1)
+        columns = wanted % self.slots
+        return columns, self.buckets[columns] == wanted
+
+    def means(self, rows, end, length):
+        """(len(rows), length) means ending at bucket `end`, NaN where a bucket has no events"""
+        columns, held = self.window(end, min(length, self.slots))
+        cells = np.ix_(columns, rows)
+        counts = np.where(held[:, None], self.counts[cells], 0)
+        means = np.full(counts.shape, np.nan)
+        np.divide(self.sums[cells], counts, out=means, where=counts > 0)
+        if length > self.slots:
+            means = np.vstack((np.full((length - self.slots, len(rows)), np.nan), means))
+        return means.T
+
+    def share(self):
+        self.sums = shared_copy(self.sums)
+        self.counts = shared_copy(self.counts)
+        self.arrivals = shared_copy(self.arrivals)
+        self.buckets = shared_copy(self.buckets)
+        self.head = shared_copy(self.head)
+
+
+class CityOccupancy:
+    """Every rollup for one CityStations, plus each station's last report"""
+
+    def __init__(self, stations):
+        self.stations = stations
+        self._order = np.argsort(stations.ids, kind="stable")
+        self._sorted_ids = stations.ids[self._order]
+        self.rollups = {name: Rollup(len(stations), width, slots) for name, width, slots in ROLLUPS}
+        self.last_seen = np.full(len(stations), -np.inf)
+        self.last_value = np.full(len(stations), np.nan)
+        self._lock = Lock()
+
+    def rows(self, station_ids):
+        """Rows for station ids, -1 for unknown ones"""
+        positions = np.minimum(np.searchsorted(self._sorted_ids, station_ids), len(self._sorted_ids) - 1)
+        found = self._sorted_ids[positions] == station_ids
+        return np.where(found, self._order[positions], -1)
+
+    def ingest(self, station_ids, timestamps, available, now):
+        """Record a batch of events.
+
+        Returns (events kept, {station_id: available_slots}) where the dict
+        has each station's newest event, if it is newer than any before.
+        """
+        rows = self.rows(station_ids)
+        valid = (rows >= 0) & np.isfinite(timestamps) & np.isfinite(available)
+        valid &= timestamps <= now + MAX_CLOCK_SKEW_SECONDS
+        rows, timestamps = rows[valid], timestamps[valid]
+        available = np.clip(available[valid], 0, self.stations.total[rows])
+        if not len(rows):
+            return 0, {}
+
+        with self._lock:
+            # Each station's events in timestamp order, after its last report
+            order = np.lexsort((timestamps, rows))
+            ordered_rows = rows[order]
+            boundary = ordered_rows[1:] != ordered_rows[:-1]
+            first = np.append(True, boundary)
+            previous = np.empty(len(order))
+            previous[1:] = available[order][:-1]
+            previous[first] = self.last_value[ordered_rows[first]]
+            # A drop in available slots is a charging session starting; events
+            # older than the station's last report don't count
+            started = np.fmax(previous - available[order], 0)
+            started[timestamps[order] < self.last_seen[ordered_rows]] = 0
+            arrivals = np.empty(len(order))
+            arrivals[order] = started
+
+            kept = np.zeros(len(rows), dtype=bool)
+            for rollup in self.rollups.values():
+                kept |= rollup.add(rows, timestamps, available, arrivals)
+            last = order[np.append(boundary, True)]
+            last = last[timestamps[last] >= self.last_seen[rows[last]]]
+            self.last_seen[rows[last]] = timestamps[last]
+            self.last_value[rows[last]] = available[last]
+
+        live = dict(zip(self.stations.ids[rows[last]].tolist(), np.rint(available[last]).astype(np.int64).tolist()))
+        return int(kept.sum()), live
+
+    def utilization(self, rows, end_time, length, rollup=HISTORY_ROLLUP):
+        """(len(rows), length) utilization % per bucket up to end_time, NaN without data"""
+        ring = self.rollups[rollup]
+        available = ring.means(rows, int(ring.bucket(end_time)), length)
+        total = self.stations.total[rows].astype(np.float64)[:, None]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(total > 0, (total - available) / total * 100.0, np.nan)
+
+    def arrivals(self, end_time, length, rollup=HISTORY_ROLLUP):
+        """(session starts, buckets with events) per station over the `length`
+        buckets up to end_time"""
+        ring = self.rollups[rollup]
+        columns, held = ring.window(int(ring.bucket(end_time)), min(length, ring.slots))
+        columns = columns[held]
+        return ring.arrivals[columns].sum(axis=0, dtype=np.float64), (ring.counts[columns] > 0).sum(axis=0)
+
+    def recent_available(self, now):
+        """Mean available slots per station over RECENT_WINDOW_SECONDS,
+        the live count for stations that haven't reported in that time"""
+        ring = self.rollups[RECENT_ROLLUP]
+        columns, held = ring.window(int(ring.bucket(now)), max(1, RECENT_WINDOW_SECONDS // ring.width))
+        columns = columns[held]
+        counts = ring.counts[columns].sum(axis=0)
+        sums = ring.sums[columns].sum(axis=0, dtype=np.float64)
+        return np.divide(sums, counts, out=self.stations.available.astype(np.float64), where=counts > 0)
+
+    def share(self):
+        with self._lock:
+            for rollup in self.rollups.values():
+                rollup.share()
+            self.last_seen = shared_copy(self.last_seen)
+            self.last_value = shared_copy(self.last_value)
+            self._lock = multiprocessing.Lock()
+
+
+class OccupancyStore:
+    """Recorded occupancy for the cities of a StationStore.
+
+    A city's rings are created by its first event (or by `share`) and
+    start over when the station store reloads the city.
+    """
+
+    def __init__(self, station_store, clock=time.time):
+        self.station_store = station_store
+        self._clock = clock
+        self._cities = {}
+        self._lock = Lock()
+
+    def get(self, city, create=False):
+        """CityOccupancy for a city's current stations, or None if nothing was recorded"""
+        stations = self.station_store.get(city)
+        occupancy = self._recorded(stations)
+        if occupancy is not None or not create or not len(stations):
+            return occupancy
+        with self._lock:
+            occupancy = self._recorded(stations)
+            if occupancy is None:
+                occupancy = self._cities[city] = CityOccupancy(stations)
+        return occupancy
+
+    def _recorded(self, stations):
+        occupancy = self._cities.get(stations.city)
+        return occupancy if occupancy is not None and occupancy.stations is stations else None
+
+    def ingest(self, city, station_ids, timestamps, available):
+        """Record events (arrays of equal length) and apply the newest value per
+        station to the station store. Returns (events kept, station ids changed)."""
+        occupancy = self.get(city, create=True)
+        if occupancy is None:
+            return 0, []
+        kept, live = occupancy.ingest(
+            np.asarray(station_ids, dtype=np.int64),
+            np.asarray(timestamps, dtype=np.float64),
+            np.asarray(available, dtype=np.float64),
+            self._clock(),
+        )
+        changed = self.station_store.update_available(city, live) if live else []
+        return kept, changed
+
+    def history(self, stations, now, rows):
+        """utilization_history with recorded hourly means wherever there are any"""
+        occupancy = self._recorded(stations)
+        recorded = None
+        if occupancy is not None:
+            recorded = occupancy.utilization(rows, now.timestamp(), SEQUENCE_LENGTH)
+        return utilization_history(stations, now, rows, recorded)
+
+    def recorded_hours(self, stations, now, rows):
+        """How many of the past hours in each station's `history` (all but the
+        live last one) come from recorded occupancy"""
+        occupancy = self._recorded(stations)
+        if occupancy is None:
+            return np.zeros(len(rows), dtype=np.int64)
+        recorded = occupancy.utilization(rows, now.timestamp(), SEQUENCE_LENGTH)
+        return (~np.isnan(recorded[:, :-1])).sum(axis=1)
+
+    def recent_available(self, stations):
+        """Recent mean available slots per station, for ranking by queue"""
+        occupancy = self._recorded(stations)
+        if occupancy is None:
+            return stations.available
+        return occupancy.recent_available(self._clock())
+
+    def share(self):
+        """Create rings for every loaded city and move them into shared
+        memory (see StationStore.share); call right after it"""
+        for city in self.station_store.loaded():
+            self.get(city, create=True).share()
@@ -0,0 +1,98 @@
+import os
+from threading import Lock
+
+from backend.algorithms.contraction import ContractionHierarchy
+from backend.algorithms.road_graph import RoadGraph
+from backend.data.stations import CITY_CENTERS, city_slug
+
+ROAD_GRAPH_DIR = os.environ.get("ROAD_GRAPH_DIR", os.path.join(os.path.dirname(__file__), "road_graphs"))
+USE_HIERARCHY = os.environ.get("ROUTING_HIERARCHY", "0") == "1"
+# Cities in CITY_CENTERS without graph files get a synthetic street grid of
+# this many nodes a side (0.5 km apart, so 120 covers 60 x 60 km); 0 turns
+# the fallback off and such cities have no graph
+SYNTHETIC_ROAD_GRID = int(os.environ.get("SYNTHETIC_ROAD_GRID", 120))
+
+
+class CityRoads:
+    def __init__(self, graph, hierarchy=None):
+        self.graph = graph
+        self.hierarchy = hierarchy
+
+    def prepare(self):
+        """Build every lazily created search structure, e.g. before forking workers"""
+        self.graph.prepare()
+        if self.hierarchy is not None:
+            self.hierarchy.prepare()
+
+
+class RoadGraphStore:
+    """Loads each city's road graph once, from <dir>/<city>.nodes.csv and
+    <dir>/<city>.edges.csv, or a synthetic grid around the city centre when
+    there are no files (like the synthetic stations in backend.data.stations).
+
+    With use_hierarchy, a contraction hierarchy is built on first load and
+    saved next to the csv files as <city>.ch.npz so later starts reuse it.
+    """
+
+    def __init__(self, directory=ROAD_GRAPH_DIR, use_hierarchy=USE_HIERARCHY, synthetic_grid=SYNTHETIC_ROAD_GRID):
+        self.directory = directory
+        self.use_hierarchy = use_hierarchy
+        self.synthetic_grid = synthetic_grid
+        self._cities = {}
+        self._lock = Lock()
+
+    def _path(self, city, suffix):
+        return os.path.join(self.directory, f"{city_slug(city)}.{suffix}")
+
+    def get(self, city):
+        """CityRoads for the city, or None if there is no graph for it"""
+        roads = self._cities.get(city)
+        if roads is not None:
+            return roads
+
+        with self._lock:
+            roads = self._cities.get(city)
+            if roads is None:
+                roads = self._load(city)
+                if roads is not None:
+                    self._cities[city] = roads
+        return roads
+
+    def add(self, city, graph, hierarchy=None):
+        """Register an in-memory graph (synthetic cities, benchmarks)"""
+        with self._lock:
+            self._cities[city] = CityRoads(graph, hierarchy)
+
+    def _load(self, city):
+        nodes_path = self._path(city, "nodes.csv")
+        edges_path = self._path(city, "edges.csv")
+        if not (os.path.exists(nodes_path) and os.path.exists(edges_path)):
+            return self._synthetic(city)
+
+        graph = RoadGraph.from_csv(nodes_path, edges_path)
+        return CityRoads(graph, self._hierarchy(graph, self._path(city, "ch.npz"), os.path.getmtime(edges_path)))
+
+    def _hierarchy(self, graph, ch_path, graph_mtime):
+        """The graph's contraction hierarchy if use_hierarchy, from ch_path
+        unless the graph changed after it was saved"""
+        if not self.use_hierarchy:
+            return None
+        if os.path.exists(ch_path) and os.path.getmtime(ch_path) >= graph_mtime:
+            return ContractionHierarchy.load(ch_path)
+        hierarchy = ContractionHierarchy.build(graph)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            hierarchy.save(ch_path)
+        except OSError:
+            pass
+        return hierarchy
+
+    def _synthetic(self, city):
+        if city not in CITY_CENTERS or self.synthetic_grid <= 0:
+            return None
+        center_lat, center_lon = CITY_CENTERS[city]
+        graph = RoadGraph.grid(
+            center_lat, center_lon, self.synthetic_grid, self.synthetic_grid, seed=list(CITY_CENTERS).index(city)
+        )
+        # Grids are deterministic, so a saved hierarchy for the same size stays valid
+        return CityRoads(graph, self._hierarchy(graph, self._path(city, f"grid{self.synthetic_grid}.ch.npz"), 0))
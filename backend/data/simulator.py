@@ -0,0 +1,69 @@
+"""Stand-in for station telemetry: POSTs occupancy events to /api/occupancy.
+
+    python -m backend.data.simulator --url http://127.0.0.1:8000 --city Mumbai --rate 20000
+
+Every station's available slots follow a random walk starting from the
+backend's current values. Events go out in batches at roughly `--rate`
+per second, and the achieved rate is printed every few seconds.
+"""
+import argparse
+import time
+
+import numpy as np
+import requests
+
+REPORT_SECONDS = 5
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate station occupancy events")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--city", default="Mumbai")
+    parser.add_argument("--rate", type=float, default=1000.0, help="events per second")
+    parser.add_argument("--batch", type=int, default=5000, help="events per request")
+    parser.add_argument("--duration", type=float, default=0, help="seconds to run, 0 for no limit")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    session = requests.Session()
+    stations = session.get(f"{args.url}/api/stations", params={"city": args.city}, timeout=60).json()
+    if not stations:
+        raise SystemExit(f"No stations for {args.city}")
+    ids = np.array([s["id"] for s in stations], dtype=np.int64)
+    total = np.array([s["total_slots"] for s in stations], dtype=np.int64)
+    available = np.array([s["available_slots"] for s in stations], dtype=np.int64)
+    rng = np.random.default_rng(args.seed)
+    batch = max(1, min(args.batch, int(args.rate)))
+
+    start = report_start = time.perf_counter()
+    sent = reported = dropped = 0
+    while not args.duration or time.perf_counter() - start < args.duration:
+        rows = rng.integers(len(ids), size=batch)
+        steps = rng.integers(-1, 2, size=batch)
+        # Duplicate rows in a batch step once; each event carries the new value
+        np.add.at(available, rows, steps)
+        np.clip(available, 0, total, out=available)
+        response = session.post(f"{args.url}/api/occupancy", json={
+            "city": args.city,
+            "station_ids": ids[rows].tolist(),
+            "available_slots": available[rows].tolist(),
+        }, timeout=60)
+        response.raise_for_status()
+        sent += batch
+        dropped += response.json()["dropped"]
+
+        now = time.perf_counter()
+        if now - report_start >= REPORT_SECONDS:
+            print(f"{(sent - reported) / (now - report_start):,.0f} events/s ({sent:,} sent, {dropped:,} dropped)")
+            report_start, reported = now, sent
+        # Pace to the target rate
+        delay = start + sent / args.rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    elapsed = time.perf_counter() - start
+    print(f"{sent:,} events in {elapsed:.1f}s, {sent / elapsed:,.0f} events/s")
+
+
+if __name__ == "__main__":
+    main()
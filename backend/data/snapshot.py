@@ -0,0 +1,101 @@
+import json
+import os
+import pickle
+import shutil
+
+import numpy as np
+
+from backend.data.stations import city_slug
+from backend.data.store import CityStations
+
+STATION_SNAPSHOT_DIR = os.environ.get(
+    "STATION_SNAPSHOT_DIR", os.path.join(os.path.dirname(__file__), "snapshots")
+)
+
+_COLUMNS = ("ids", "total", "type_codes", "lats", "lons", "costs", "available")
+
+
+class StationSnapshots:
+    """On-disk copies of built CityStations, one directory per city.
+
+    Columns are saved as .npy files and memory-mapped on restore (only the
+    live `available` column is copied), the spatial index and tiles are
+    pickled, and the JSON fragments are one line each. A snapshot is used
+    only if it was written for the same `signature` (the data source's
+    identity), so re-importing stations makes old snapshots stale.
+    """
+
+    def __init__(self, directory=STATION_SNAPSHOT_DIR, signature=""):
+        self.directory = directory
+        self.signature = signature
+
+    def _path(self, city):
+        # Cities whose slugs collide share a directory; load() checks the name
+        return os.path.join(self.directory, city_slug(city))
+
+    def load(self, city):
+        """Restored CityStations, or None if there is no usable snapshot"""
+        path = self._path(city)
+        try:
+            with open(os.path.join(path, "meta.json")) as f:
+                meta = json.load(f)
+            if meta["signature"] != self.signature or meta["city"] != city:
+                return None
+            columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in _COLUMNS}
+            with open(os.path.join(path, "structures.pkl"), "rb") as f:
+                index, tiles = pickle.load(f)
+            with open(os.path.join(path, "static.jsonl"), encoding="utf-8") as f:
+                static_json = f.read().split("\n") if meta["count"] else []
+        except (OSError, ValueError, KeyError, pickle.UnpicklingError):
+            return None
+
+        return CityStations(
+            city,
+            columns["ids"],
+            columns["total"],
+            meta["types"],
+            columns["type_codes"],
+            columns["lats"],
+            columns["lons"],
+            columns["costs"],
+            # Live updates write into this column, so it can't stay mapped
+            np.array(columns["available"]),
+            static_json,
+            index=index,
+            tiles=tiles,
+        )
+
+    def save(self, stations):
+        """Write a snapshot; a half-written one is never picked up, and
+        failures (read-only disk) are ignored like any cache miss"""
+        path = self._path(stations.city)
+        staging = f"{path}.tmp-{os.getpid()}"
+        try:
+            shutil.rmtree(staging, ignore_errors=True)
+            os.makedirs(staging)
+            columns = {
+                "ids": stations.ids, "total": stations.total, "type_codes": stations.type_codes,
+                "lats": stations.lats, "lons": stations.lons, "costs": stations.costs,
+                "available": stations.available,
+            }
+            for name, column in columns.items():
+                np.save(os.path.join(staging, f"{name}.npy"), np.ascontiguousarray(column))
+            with open(os.path.join(staging, "structures.pkl"), "wb") as f:
+                pickle.dump((stations.index, stations.tiles), f, protocol=pickle.HIGHEST_PROTOCOL)
+            with open(os.path.join(staging, "static.jsonl"), "w", encoding="utf-8") as f:
+                f.write("\n".join(stations._static_json))
+            # meta.json last: it marks the snapshot complete
+            with open(os.path.join(staging, "meta.json"), "w") as f:
+                json.dump({
+                    "city": stations.city,
+                    "signature": self.signature,
+                    "types": stations.types,
+                    "count": len(stations),
+                }, f)
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(staging, path)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def discard(self, city=None):
+        shutil.rmtree(self.directory if city is None else self._path(city), ignore_errors=True)
@@ -0,0 +1,177 @@
+"""Station data sources.
+
+`get_stations_data(city)` is what the station store loads from. With the
+default STATION_SOURCE=sqlite it reads the SQLite database that
+`python -m backend.data.importer` fills from OpenChargeMap-style dumps, and
+falls back to synthetic stations for cities nothing has been imported for.
+STATION_SOURCE=synthetic skips the database entirely.
+"""
+import os
+import re
+import sqlite3
+from contextlib import closing
+
+import numpy as np
+
+STATION_DB = os.environ.get("STATION_DB", os.path.join(os.path.dirname(__file__), "stations.db"))
+STATION_SOURCE = os.environ.get("STATION_SOURCE", "sqlite")
+SYNTHETIC_STATIONS_PER_CITY = int(os.environ.get("SYNTHETIC_STATIONS_PER_CITY", 200))
+
+CITY_CENTERS = {
+    "Delhi": (28.6139, 77.2090),
+    "Mumbai": (19.0760, 72.8777),
+    "Bangalore": (12.9716, 77.5946),
+    "Chennai": (13.0827, 80.2707),
+    "Hyderabad": (17.3850, 78.4867),
+    "Pune": (18.5204, 73.8567),
+    "Kolkata": (22.5726, 88.3639),
+}
+# Synthetic ids are city_number * SYNTHETIC_ID_BLOCK + i, above any imported id
+SYNTHETIC_ID_BLOCK = 100_000_000
+
+
+def city_slug(city):
+    """File-name-safe form of a city name, for per-city files on disk. City
+    names come from requests, so nothing like "../x" may survive; it is
+    never empty, so it always names something inside the directory."""
+    return re.sub(r"[^a-z0-9]+", "-", city.lower()).strip("-") or "_"
+
+COLUMNS = (
+    "id", "city", "name", "lat", "lon", "available_slots", "total_slots",
+    "type", "address", "cost_per_hour", "supports_swapping",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stations (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    source_id TEXT NOT NULL,
+    city TEXT NOT NULL,
+    name TEXT NOT NULL,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    available_slots INTEGER NOT NULL,
+    total_slots INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    address TEXT NOT NULL,
+    cost_per_hour REAL NOT NULL,
+    supports_swapping INTEGER NOT NULL,
+    UNIQUE (source, source_id)
+);
+CREATE INDEX IF NOT EXISTS stations_city ON stations (city);
+"""
+
+# Re-importing a record updates it in place and keeps its id
+UPSERT = f"""
+INSERT INTO stations (source, source_id, {", ".join(COLUMNS[1:])})
+VALUES ({", ".join("?" * (len(COLUMNS) + 1))})
+ON CONFLICT (source, source_id) DO UPDATE SET
+{", ".join(f"{c} = excluded.{c}" for c in COLUMNS[1:])}
+"""
+
+
+class StationDatabase:
+    """Imported stations in SQLite, indexed by city.
+
+    Reads open a short-lived connection, so one instance can be shared
+    across request threads.
+    """
+
+    def __init__(self, path=STATION_DB):
+        self.path = path
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def connect(self):
+        connection = sqlite3.connect(self.path)
+        connection.executescript(SCHEMA)
+        return connection
+
+    def stations(self, city):
+        """Station dicts for a city, in id order"""
+        if not self.exists():
+            return []
+        with closing(sqlite3.connect(self.path)) as connection:
+            rows = connection.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM stations WHERE city = ? ORDER BY id", (city,)
+            ).fetchall()
+        stations = []
+        for row in rows:
+            station = dict(zip(COLUMNS, row))
+            station["supports_swapping"] = bool(station["supports_swapping"])
+            stations.append(station)
+        return stations
+
+    def upsert(self, connection, source, records):
+        """Insert or update (source_id, station dict) pairs; the caller commits"""
+        connection.executemany(UPSERT, (
+            (source, str(source_id), *(station[c] for c in COLUMNS[1:]))
+            for source_id, station in records
+        ))
+
+    def counts(self):
+        """{city: station count}"""
+        if not self.exists():
+            return {}
+        with closing(sqlite3.connect(self.path)) as connection:
+            return dict(connection.execute("SELECT city, COUNT(*) FROM stations GROUP BY city"))
+
+
+def synthetic_stations(city, n, seed=0, batch=100_000):
+    """Yield n plausible stations scattered around a city centre.
+
+    Deterministic for a given (city, n, seed) and generated in NumPy
+    batches, so millions of stations stream out without building them up
+    front. Unknown cities yield nothing.
+    """
+    if city not in CITY_CENTERS:
+        return
+    city_number = list(CITY_CENTERS).index(city) + 1
+    center_lat, center_lon = CITY_CENTERS[city]
+    rng = np.random.default_rng([seed, city_number])
+    # Normally distributed around the centre, a little wider for big counts
+    spread = 0.08 + 0.1 * np.log10(max(n, 10)) / 6
+
+    for start in range(0, n, batch):
+        size = min(batch, n - start)
+        lats = np.round(center_lat + rng.normal(0, spread, size), 6).tolist()
+        lons = np.round(center_lon + rng.normal(0, spread, size), 6).tolist()
+        fast = (rng.random(size) < 0.45).tolist()
+        total = rng.integers(2, 13, size)
+        available = rng.integers(0, total + 1).tolist()
+        costs = rng.choice([85, 90, 100, 110, 120, 130, 150, 180], size).tolist()
+        swapping = (rng.random(size) < 0.25).tolist()
+        sectors = rng.integers(1, 120, size).tolist()
+        total = total.tolist()
+        for i in range(size):
+            number = start + i + 1
+            yield {
+                "id": city_number * SYNTHETIC_ID_BLOCK + number,
+                "city": city,
+                "name": f"{city} {'Fast' if fast[i] else 'EV'} Point {number}",
+                "lat": lats[i],
+                "lon": lons[i],
+                "available_slots": available[i],
+                "total_slots": total[i],
+                "type": "Fast" if fast[i] else "Normal",
+                "address": f"Sector {sectors[i]}, {city}",
+                "cost_per_hour": costs[i],
+                "supports_swapping": swapping[i],
+            }
+
+
+def source_signature():
+    """Identifies the data get_stations_data serves, for snapshot staleness checks"""
+    database = StationDatabase()
+    imported = os.path.getmtime(database.path) if STATION_SOURCE == "sqlite" and database.exists() else 0
+    return f"{STATION_SOURCE}:{imported}:{SYNTHETIC_STATIONS_PER_CITY}"
+
+
+def get_stations_data(city):
+    """Raw station dicts for a city from the configured source"""
+    if STATION_SOURCE == "sqlite":
+        stations = StationDatabase().stations(city)
+        if stations:
+            return stations
+    return list(synthetic_stations(city, SYNTHETIC_STATIONS_PER_CITY))
@@ -0,0 +1,204 @@
+import json
+import multiprocessing
+from threading import Lock
+
+import numpy as np
+
+from backend.algorithms.spatial_index import StationIndex
+from backend.algorithms.tiles import StationTiles
+from backend.utils.geo import FAST_TYPE_WEIGHT, StationArrays
+from backend.utils.shared_memory import shared_copy
+
+
+class CityStations:
+    """One city's stations in columnar form.
+
+    Numeric fields live in NumPy arrays (shared with `arrays`, the batched
+    scoring view) and the station type is a categorical code. Everything
+    else is kept as a pre-serialized JSON fragment per station, so the
+    station list can be written out without building a dict per station.
+    Build from station dicts with `from_stations`; a snapshot restores the
+    columns (and the prebuilt index and tiles) directly.
+    """
+
+    def __init__(self, city, ids, total, types, type_codes, lats, lons, costs, available, static_json,
+                 index=None, tiles=None):
+        self.city = city
+        self.ids = ids
+        self.total = total
+        self.types = types
+        self.type_codes = type_codes
+        type_weights = np.array([0 if name == "Normal" else FAST_TYPE_WEIGHT for name in types], dtype=np.float64)
+        is_fast = np.array([name == "Fast" for name in types], dtype=bool)
+
+        self.arrays = StationArrays(lats, lons, costs, available, type_weights[type_codes], is_fast[type_codes])
+        self.lats = self.arrays.lats
+        self.lons = self.arrays.lons
+        self.costs = self.arrays.costs
+        self.available = self.arrays.available
+        # Rank of each station's cost among the city's distinct costs
+        self.cost_codes = np.unique(self.costs, return_inverse=True)[1].astype(np.int32)
+        self.index = index if index is not None else StationIndex(self.lats, self.lons)
+        self.tiles = tiles if tiles is not None else StationTiles(self.lats, self.lons, self.total)
+
+        # Live fields are spliced in at serialization time
+        self._static_json = static_json
+        self.row_by_id = {station_id: row for row, station_id in enumerate(self.ids.tolist())}
+        # Bumped on every live update, so derived data can tell it is stale
+        self._version = np.zeros(1, dtype=np.int64)
+
+    @classmethod
+    def from_stations(cls, city, stations):
+        types = sorted({s["type"] for s in stations})
+        type_code = {name: code for code, name in enumerate(types)}
+        return cls(
+            city,
+            np.array([s["id"] for s in stations], dtype=np.int64),
+            np.array([s["total_slots"] for s in stations], dtype=np.int32),
+            types,
+            np.array([type_code[s["type"]] for s in stations], dtype=np.uint8),
+            [s["lat"] for s in stations],
+            [s["lon"] for s in stations],
+            [s["cost_per_hour"] for s in stations],
+            [s["available_slots"] for s in stations],
+            [
+                json.dumps({k: v for k, v in s.items() if k != "available_slots"}, sort_keys=True)[1:-1]
+                for s in stations
+            ],
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def version(self):
+        return int(self._version[0])
+
+    @version.setter
+    def version(self, value):
+        self._version[0] = value
+
+    def share(self):
+        """Move the live columns (available slots and version) into anonymous
+        shared memory. Processes forked afterwards then see each other's
+        availability updates, while everything else stays copy-on-write."""
+        self.arrays.available = self.available = shared_copy(self.available)
+        self._version = shared_copy(self._version)
+
+    def station(self, row):
+        """Materialize one station as a dict"""
+        station = json.loads("{" + self._static_json[row] + "}")
+        station["available_slots"] = int(self.available[row])
+        return station
+
+    def to_json(self, rows=None):
+        """Serialize stations (all, or the given rows in order) as a JSON array"""
+        if rows is None:
+            rows = range(len(self))
+        static = self._static_json
+        available = self.available.astype(np.int64).tolist()
+        return "[" + ",".join(f'{{"available_slots":{available[r]},{static[r]}}}' for r in rows) + "]"
+
+
+class StationStore:
+    """Process-wide cache of CityStations, loaded once per city.
+
+    `loader(city)` returns the raw station dicts; they are converted to
+    columns on first access and dropped afterwards. With `snapshots` (a
+    StationSnapshots), a city is restored from its snapshot when one
+    matches, and built cities are saved for the next start.
+    """
+
+    def __init__(self, loader, snapshots=None):
+        self._loader = loader
+        self._snapshots = snapshots
+        self._cities = {}
+        self._lock = Lock()
+        # Serializes availability writes; a process-shared lock after share()
+        self._update_lock = Lock()
+        self._listeners = []
+
+    def subscribe(self, listener):
+        """Call listener(city_stations, station_ids) after every availability update"""
+        self._listeners.append(listener)
+
+    def update_available(self, city, slots_by_id):
+        """Apply live available_slots values ({station_id: slots}) to a city.
+
+        Values are clipped to 0..total_slots and unknown station ids are
+        ignored. Returns the ids that changed.
+        """
+        stations = self.get(city)
+        changed = []
+        with self._update_lock:
+            for station_id, slots in slots_by_id.items():
+                row = stations.row_by_id.get(station_id)
+                if row is None:
+                    continue
+                slots = min(max(slots, 0), int(stations.total[row]))
+                if stations.available[row] != slots:
+                    stations.available[row] = slots
+                    changed.append(station_id)
+            if changed:
+                stations.version += 1
+                # Still under the lock, so listeners see this update's version
+                # even when other worker processes write to the same city
+                for listener in self._listeners:
+                    listener(stations, changed)
+        return changed
+
+    def get(self, city):
+        stations = self._cities.get(city)
+        if stations is not None:
+            return stations
+
+        with self._lock:
+            stations = self._cities.get(city)
+            if stations is None:
+                stations = self._load(city)
+                # Unknown cities are not cached so arbitrary names can't grow the store
+                if len(stations):
+                    self._cities[city] = stations
+        return stations
+
+    def _load(self, city):
+        if self._snapshots is not None:
+            stations = self._snapshots.load(city)
+            if stations is not None:
+                return stations
+        raw = [s for s in self._loader(city) if s.get("city", city) == city]
+        stations = CityStations.from_stations(city, raw)
+        if self._snapshots is not None and len(stations):
+            self._snapshots.save(stations)
+        return stations
+
+    def share(self):
+        """Put every loaded city's live columns in shared memory (see
+        CityStations.share). Call in a pre-fork server's parent, after
+        loading the cities to share; cities loaded later are per process."""
+        with self._lock:
+            for stations in self._cities.values():
+                stations.share()
+            self._update_lock = multiprocessing.Lock()
+
+    def loaded(self):
+        """Names of the cities currently in memory"""
+        return sorted(self._cities)
+
+    def find(self, station_id):
+        """(CityStations, row) for a station in any loaded city, or (None, None)"""
+        for stations in list(self._cities.values()):
+            row = stations.row_by_id.get(station_id)
+            if row is not None:
+                return stations, row
+        return None, None
+
+    def invalidate(self, city=None):
+        """Drop a city (or every city) so the next access reloads it from the loader"""
+        with self._lock:
+            if city is None:
+                self._cities.clear()
+            else:
+                self._cities.pop(city, None)
+            if self._snapshots is not None:
+                self._snapshots.discard(city)
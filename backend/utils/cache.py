@@ -0,0 +1,110 @@
+import sys
+import time
+from collections import OrderedDict
+from threading import Lock
+
+# Rough per-entry bookkeeping cost (key tuple, OrderedDict node, entry tuple)
+ENTRY_OVERHEAD_BYTES = 200
+# Longer tuples and lists are sized from this many evenly spaced items
+SIZEOF_SAMPLE = 64
+
+
+def sizeof(value):
+    """Rough bytes held by a cached value: array buffers, plus tuples, lists
+    and dicts with everything in them (extrapolated from SIZEOF_SAMPLE items
+    for long tuples and lists)"""
+    nbytes = getattr(value, "nbytes", None)
+    if nbytes is not None:
+        return nbytes
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(sizeof(key) + sizeof(item) for key, item in value.items())
+    elif isinstance(value, (tuple, list)):
+        step = max(1, len(value) // SIZEOF_SAMPLE)
+        sample = value[::step]
+        if sample:
+            size += sum(sizeof(item) for item in sample) * len(value) // len(sample)
+    return size
+
+
+class TTLCache:
+    """Thread-safe LRU cache with a per-entry TTL and a memory cap.
+
+    Entries expire `ttl` seconds after they are written. When the estimated
+    size passes `max_bytes` the least recently used entries are evicted.
+    Hit/miss/eviction counters are kept for sizing.
+    """
+
+    def __init__(self, ttl, max_bytes, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] > self._clock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            if entry[0] <= self._clock():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key, value):
+        size = sizeof(value) + ENTRY_OVERHEAD_BYTES
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (self._clock() + self.ttl, size, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
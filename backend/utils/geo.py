@@ -0,0 +1,133 @@
+from math import radians, cos, sin, sqrt, atan2
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+# Weights of the recommendation score, lower is better
+DISTANCE_WEIGHT = 1.5
+COST_WEIGHT = 0.3
+AVAILABILITY_WEIGHT = 2
+FAST_TYPE_WEIGHT = -1
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km between two points"""
+    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
+    c = 2 * atan2(sqrt(a), sqrt(1 - a))
+    return EARTH_RADIUS_KM * c
+
+
+def haversine_many(lat, lon, lats, lons):
+    """Distances in km from one point to arrays of points"""
+    lat1 = np.radians(lat)
+    lat2 = np.radians(lats)
+    dlat = lat2 - lat1
+    dlon = np.radians(lons) - np.radians(lon)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return EARTH_RADIUS_KM * c
+
+
+def station_score(distance, cost, availability, type_weight):
+    """Recommendation score, works on scalars and arrays alike"""
+    return distance * DISTANCE_WEIGHT + cost * COST_WEIGHT - availability * AVAILABILITY_WEIGHT + type_weight
+
+
+def smallest_k(values, idx, k):
+    """The k entries of idx with the lowest values, lowest first.
+
+    Uses argpartition so only the k winners get sorted; ties keep idx
+    order like a stable sort would.
+    """
+    k = min(k, len(idx))
+    if k <= 0:
+        return idx[:0]
+    if k < len(idx):
+        kth = np.partition(values, k - 1)[k - 1]
+        keep = np.flatnonzero(values <= kth)
+        idx, values = idx[keep], values[keep]
+    return idx[np.lexsort((idx, values))[:k]]
+
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash_cell(lat, lon, precision):
+    """(geohash, cell centre lat, cell centre lon) of the cell containing a point"""
+    bits = 5 * precision
+    lon_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    x = min(int((lon + 180.0) / 360.0 * (1 << lon_bits)), (1 << lon_bits) - 1)
+    y = min(int((lat + 90.0) / 180.0 * (1 << lat_bits)), (1 << lat_bits) - 1)
+
+    # Bits alternate longitude, latitude, most significant first
+    code = 0
+    for i in range(bits):
+        if i % 2 == 0:
+            lon_bits -= 1
+            bit = (x >> lon_bits) & 1
+        else:
+            lat_bits -= 1
+            bit = (y >> lat_bits) & 1
+        code = (code << 1) | bit
+    text = "".join(GEOHASH_ALPHABET[(code >> (5 * i)) & 31] for i in reversed(range(precision)))
+
+    lon_cells = 1 << ((bits + 1) // 2)
+    lat_cells = 1 << (bits // 2)
+    return text, -90.0 + (y + 0.5) * 180.0 / lat_cells, -180.0 + (x + 0.5) * 360.0 / lon_cells
+
+
+class StationArrays:
+    """Station fields as contiguous float64 arrays for batched distance and scoring.
+
+    Every query returns positions into the original station list, so callers
+    can map results back to their dicts.
+    """
+
+    def __init__(self, lats, lons, costs, available, type_weights, is_fast):
+        self.lats = np.ascontiguousarray(lats, dtype=np.float64)
+        self.lons = np.ascontiguousarray(lons, dtype=np.float64)
+        self.costs = np.ascontiguousarray(costs, dtype=np.float64)
+        self.available = np.ascontiguousarray(available, dtype=np.float64)
+        self.type_weights = np.ascontiguousarray(type_weights, dtype=np.float64)
+        self.is_fast = np.ascontiguousarray(is_fast, dtype=bool)
+
+    @classmethod
+    def from_stations(cls, stations):
+        return cls(
+            [s["lat"] for s in stations],
+            [s["lon"] for s in stations],
+            [s["cost_per_hour"] for s in stations],
+            [s["available_slots"] for s in stations],
+            [0 if s["type"] == "Normal" else FAST_TYPE_WEIGHT for s in stations],
+            [s["type"] == "Fast" for s in stations],
+        )
+
+    def __len__(self):
+        return len(self.lats)
+
+    def distances(self, lat, lon, idx=None):
+        if idx is None:
+            return haversine_many(lat, lon, self.lats, self.lons)
+        return haversine_many(lat, lon, self.lats[idx], self.lons[idx])
+
+    def scores(self, lat, lon, idx=None):
+        distance = self.distances(lat, lon, idx)
+        if idx is None:
+            return station_score(distance, self.costs, self.available, self.type_weights)
+        return station_score(distance, self.costs[idx], self.available[idx], self.type_weights[idx])
+
+    def within(self, lat, lon, radius_km):
+        """Indices of stations within radius_km, in station order"""
+        return np.flatnonzero(self.distances(lat, lon) <= radius_km)
+
+    def top_k(self, lat, lon, k, idx=None):
+        """Indices of the k best scoring stations, best first (see smallest_k)"""
+        if idx is None:
+            idx = np.arange(len(self))
+        idx = np.asarray(idx, dtype=np.intp)
+        return smallest_k(self.scores(lat, lon, idx), idx, k)
@@ -0,0 +1,163 @@
+"""Request latency histograms and per-stage spans, exposed at /metrics.
+
+Every request is timed per route and status class, and code inside a
+request can time its stages with `span("score")`. The stage durations of a
+request also go out in its Server-Timing header, so a client can tell time
+on the server from time on the network.
+"""
+import multiprocessing
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+
+import numpy as np
+
+from backend.utils.shared_memory import shared_copy
+
+# Upper bounds in seconds, Prometheus' defaults plus 1 ms and 2.5 ms
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STAGES = ("fetch", "filter", "score", "serialize", "render")
+STATUS_CLASSES = ("1xx", "2xx", "3xx", "4xx", "5xx")
+# Route label of requests no route matched
+UNMATCHED = "unmatched"
+
+# Stage durations of the current request, None outside one
+_spans = ContextVar("spans", default=None)
+
+
+@contextmanager
+def span(stage):
+    """Time a stage of the current request; does nothing outside one"""
+    spans = _spans.get()
+    if spans is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        spans[stage] = spans.get(stage, 0.0) + time.perf_counter() - started
+
+
+def start_spans():
+    """Start collecting spans for the current request; returns a token for finish_spans"""
+    return _spans.set({})
+
+
+def finish_spans(token):
+    """{stage: seconds} collected since start_spans"""
+    spans = _spans.get()
+    _spans.reset(token)
+    return spans
+
+
+class Histograms:
+    """Cumulative-bucket histograms for a set of label tuples.
+
+    Series are added on first use. After `share` the arrays live in shared
+    memory and the series are fixed, so register every series first.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        # Last column counts observations above every bucket
+        self.counts = np.zeros((0, len(self.buckets) + 1), dtype=np.int64)
+        self.sums = np.zeros(0)
+        self._rows = {}
+        self._shared = False
+        self._lock = Lock()
+
+    def _row(self, labels):
+        row = self._rows.get(labels)
+        if row is not None or self._shared:
+            return row
+        row = self._rows[labels] = len(self._rows)
+        if row >= len(self.sums):
+            grown = max(16, 2 * len(self.sums))
+            self.counts = np.vstack((self.counts, np.zeros((grown - len(self.sums), self.counts.shape[1]), np.int64)))
+            self.sums = np.concatenate((self.sums, np.zeros(grown - len(self.sums))))
+        return row
+
+    def register(self, labels):
+        with self._lock:
+            self._row(labels)
+
+    def observe(self, labels, seconds):
+        bucket = bisect_left(self.buckets, seconds)
+        with self._lock:
+            row = self._row(labels)
+            if row is None:
+                return
+            self.counts[row, bucket] += 1
+            self.sums[row] += seconds
+
+    def snapshot(self):
+        """{labels: (cumulative counts per bucket and +Inf, sum)} of series with observations"""
+        with self._lock:
+            counts = self.counts.cumsum(axis=1)
+            sums = self.sums.copy()
+            rows = dict(self._rows)
+        return {labels: (counts[row].tolist(), float(sums[row])) for labels, row in rows.items() if counts[row, -1]}
+
+    def exposition(self, name, help_text, label_names):
+        """Prometheus text format lines"""
+        lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        bounds = [repr(float(b)) for b in self.buckets] + ["+Inf"]
+        for labels, (counts, total) in sorted(self.snapshot().items()):
+            label_text = ",".join(f'{key}="{value}"' for key, value in zip(label_names, labels))
+            for bound, count in zip(bounds, counts):
+                lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} {count}')
+            lines.append(f"{name}_sum{{{label_text}}} {total!r}")
+            lines.append(f"{name}_count{{{label_text}}} {counts[-1]}")
+        return lines
+
+    def share(self):
+        with self._lock:
+            size = len(self._rows)
+            self.counts = shared_copy(self.counts[:size])
+            self.sums = shared_copy(self.sums[:size])
+            self._shared = True
+            self._lock = multiprocessing.Lock()
+
+
+class RequestMetrics:
+    """Latency per (route, status class) and per (route, stage)"""
+
+    def __init__(self):
+        self.requests = Histograms()
+        self.stages = Histograms()
+
+    def observe(self, route, status, seconds, spans):
+        status_class = STATUS_CLASSES[min(max(status // 100, 1), 5) - 1]
+        self.requests.observe((route, status_class), seconds)
+        for stage, stage_seconds in spans.items():
+            self.stages.observe((route, stage), stage_seconds)
+
+    def exposition(self):
+        lines = self.requests.exposition(
+            "http_request_duration_seconds", "Request latency by route and status class.", ("route", "status")
+        )
+        lines += self.stages.exposition(
+            "request_stage_duration_seconds", "Time spent in each stage of a request.", ("route", "stage")
+        )
+        return "\n".join(lines) + "\n"
+
+    def share(self, routes):
+        """Register every series of `routes` (plus UNMATCHED) and move the
+        histograms into shared memory, so every worker reports the same totals"""
+        for route in (*routes, UNMATCHED):
+            for status_class in STATUS_CLASSES:
+                self.requests.register((route, status_class))
+            for stage in STAGES:
+                self.stages.register((route, stage))
+        self.requests.share()
+        self.stages.share()
+
+
+def server_timing(spans, total):
+    """Server-Timing header value for a request's spans and total seconds"""
+    parts = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in spans.items()]
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
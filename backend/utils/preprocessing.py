@@ -0,0 +1,50 @@
+from datetime import timedelta
+
+import numpy as np
+
+from backend.algorithms.lstm_model import SEQUENCE_LENGTH
+
+
+def utilization_now(stations, rows=None):
+    """Current utilization % from live slot counts"""
+    if rows is None:
+        rows = slice(None)
+    total = stations.total[rows].astype(np.float64)
+    busy = total - stations.available[rows]
+    return np.divide(busy, total, out=np.zeros_like(total), where=total > 0) * 100.0
+
+
+def utilization_history(stations, now, rows=None, recorded=None):
+    """(stations, SEQUENCE_LENGTH) hourly utilization ending at the current hour.
+
+    Hours with recorded occupancy (`recorded`, same shape, NaN for hours
+    without any) use it; the rest fall back to a made-up daily profile
+    seeded per station id (see `history_source`). The last hour is pinned
+    to the live slot count.
+    """
+    ids = stations.ids if rows is None else stations.ids[rows]
+    hours = (now.hour - SEQUENCE_LENGTH + 1 + np.arange(SEQUENCE_LENGTH)) % 24
+    phase = (ids % 7)[:, None] * 0.3
+    amplitude = 20.0 + (ids % 11)[:, None] * 2.0
+    profile = (35.0 + amplitude * np.exp(-((hours - 9 - phase) ** 2) / 6)
+               + amplitude * 1.3 * np.exp(-((hours - 18 + phase) ** 2) / 8))
+    history = np.clip(profile, 0, 100)
+    if recorded is not None:
+        history = np.where(np.isnan(recorded), history, recorded)
+    history[:, -1] = utilization_now(stations, rows)
+    return history
+
+
+def history_source(recorded_hours):
+    """Label per station for what its utilization_history is made of, from
+    how many of its SEQUENCE_LENGTH - 1 past hours were recorded: "recorded",
+    "partial", or "synthetic" when all of them are the made-up profile"""
+    recorded_hours = np.asarray(recorded_hours)
+    return np.where(recorded_hours >= SEQUENCE_LENGTH - 1, "recorded",
+                    np.where(recorded_hours > 0, "partial", "synthetic")).tolist()
+
+
+def forecast_timestamps(now, hours):
+    """Labels for the next `hours` full hours, e.g. ["10:00", "11:00", ...]"""
+    start = now.replace(minute=0, second=0, microsecond=0)
+    return [(start + timedelta(hours=h + 1)).strftime("%H:%M") for h in range(hours)]
@@ -0,0 +1,97 @@
+"""Sampling profiler for slow requests, off unless PROFILE_SLOW_REQUESTS_MS is set.
+
+While a request runs, a background thread samples its stack every
+PROFILE_INTERVAL_MS. Requests slower than the threshold have their samples
+written to PROFILE_DIR in the collapsed-stack format ("outer;inner count"
+per line) that flamegraph.pl and speedscope read.
+"""
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+# 0 turns profiling off
+PROFILE_SLOW_REQUESTS_MS = float(os.environ.get("PROFILE_SLOW_REQUESTS_MS", 0))
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", 5))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+# Profiles a process writes at most, so a slow spell can't fill the disk
+PROFILE_MAX_DUMPS = int(os.environ.get("PROFILE_MAX_DUMPS", 200))
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}.{code.co_qualname}:{code.co_firstlineno}"
+
+
+def collapsed_stack(frame):
+    """Outermost-first, semicolon-separated frames of a stack"""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class SlowRequestProfiler:
+    """Samples the stacks of threads between start() and stop()"""
+
+    def __init__(self, threshold_ms=PROFILE_SLOW_REQUESTS_MS, interval_ms=PROFILE_INTERVAL_MS,
+                 directory=PROFILE_DIR, max_dumps=PROFILE_MAX_DUMPS):
+        self.threshold = threshold_ms / 1000.0
+        self.interval = interval_ms / 1000.0
+        self.directory = directory
+        self.max_dumps = max_dumps
+        self.dumps = 0
+        # thread id -> Counter of collapsed stacks
+        self._samples = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def enabled(self):
+        return self.threshold > 0
+
+    def start(self):
+        """Start sampling the calling thread"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._samples[threading.get_ident()] = Counter()
+            # Started on first use, so each forked worker gets its own
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._sample, name="profiler", daemon=True)
+                self._thread.start()
+
+    def stop(self, name, seconds):
+        """Stop sampling the calling thread; returns the path its stacks were
+        written to if it ran past the threshold, else None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            samples = self._samples.pop(threading.get_ident(), None)
+            if not samples or seconds < self.threshold or self.dumps >= self.max_dumps:
+                return None
+            self.dumps += 1
+            dump = self.dumps
+        os.makedirs(self.directory, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", name).strip("_") or "request"
+        path = os.path.join(
+            self.directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{dump}-{slug}-{seconds * 1000:.0f}ms.folded"
+        )
+        with open(path, "w") as f:
+            f.writelines(f"{stack} {count}\n" for stack, count in samples.items())
+        return path
+
+    def _sample(self):
+        me = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, samples in self._samples.items():
+                    frame = frames.get(ident)
+                    if frame is not None and ident != me:
+                        samples[collapsed_stack(frame)] += 1
+            del frames
@@ -0,0 +1,61 @@
+import hashlib
+import os
+from threading import Lock
+
+from backend.utils.cache import TTLCache
+
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", 5 * 60))
+RESPONSE_CACHE_BYTES = int(os.environ.get("RESPONSE_CACHE_BYTES", 128 * 1024 * 1024))
+
+
+class CachedResponse:
+    """A serialized body and its ETag (a hash of the body)"""
+
+    __slots__ = ("body", "etag", "nbytes")
+
+    def __init__(self, body):
+        self.body = body
+        self.etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        self.nbytes = len(body)
+
+
+class ResponseCache:
+    """Serialized responses keyed by (city, station data version, request key).
+
+    The version in the key means an entry can never be served once the
+    city's data has moved on; `invalidate(city)` also drops that city's
+    entries right away so they stop taking up space.
+    """
+
+    def __init__(self, cache=None):
+        self.cache = cache if cache is not None else TTLCache(RESPONSE_CACHE_TTL, RESPONSE_CACHE_BYTES)
+        # city -> keys written for it, for invalidation
+        self._keys = {}
+        self._lock = Lock()
+
+    def get(self, city, version, key, build):
+        """CachedResponse for the key, calling build() (-> str or bytes) on a miss"""
+        full_key = (city, version, key)
+        entry = self.cache.get(full_key)
+        if entry is not None:
+            return entry
+
+        body = build()
+        entry = CachedResponse(body.encode() if isinstance(body, str) else body)
+        self.cache.put(full_key, entry)
+        with self._lock:
+            keys = self._keys.setdefault(city, set())
+            keys.add(full_key)
+            # Entries also leave through TTL and LRU; forget those keys now and then
+            if len(keys) > 2 * len(self.cache) + 100:
+                self._keys[city] = {k for k in keys if k in self.cache}
+        return entry
+
+    def invalidate(self, city):
+        with self._lock:
+            keys = self._keys.pop(city, ())
+        for key in keys:
+            self.cache.pop(key)
+
+    def stats(self):
+        return self.cache.stats()
@@ -0,0 +1,16 @@
+import mmap
+
+import numpy as np
+
+
+def shared_copy(array):
+    """Copy of an array in anonymous shared memory.
+
+    The mapping is MAP_SHARED, so processes forked after this call all
+    read and write the same data instead of private copy-on-write pages.
+    """
+    array = np.ascontiguousarray(array)
+    buffer = mmap.mmap(-1, max(array.nbytes, 1))
+    shared = np.frombuffer(buffer, dtype=array.dtype, count=array.size).reshape(array.shape)
+    shared[...] = array
+    return shared
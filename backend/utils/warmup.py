@@ -0,0 +1,62 @@
+import time
+from threading import Event, Lock, Thread
+
+
+class Lazy:
+    """A component built on first use, or ahead of time by `start()`.
+
+    `get()` returns the value, building it inline (once, under a lock) if
+    the background warm-up hasn't finished yet. A failed build is kept and
+    re-raised, and shows up in `status()` for the readiness check.
+    """
+
+    def __init__(self, name, build):
+        self.name = name
+        self._build = build
+        self._value = None
+        self._error = None
+        self._lock = Lock()
+        self._done = Event()
+        self._started = False
+        self.seconds = None
+
+    def start(self):
+        """Build in a daemon thread; returns immediately"""
+        self._started = True
+        Thread(target=self._run, name=f"warmup-{self.name}", daemon=True).start()
+        return self
+
+    def _run(self):
+        try:
+            self.get()
+        except Exception:
+            pass  # kept in self._error for status()
+
+    def get(self):
+        if not self._done.is_set():
+            with self._lock:
+                if not self._done.is_set():
+                    self._started = True
+                    start = time.perf_counter()
+                    try:
+                        self._value = self._build()
+                    except Exception as e:
+                        self._error = e
+                    self.seconds = time.perf_counter() - start
+                    self._done.set()
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+    @property
+    def ready(self):
+        return self._done.is_set() and self._error is None
+
+    def wait(self, timeout=None):
+        """True once the build has finished (successfully or not)"""
+        return self._done.wait(timeout)
+
+    def status(self):
+        if self._done.is_set():
+            return "failed" if self._error is not None else "ready"
+        return "loading" if self._started else "pending"
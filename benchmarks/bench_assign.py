@@ -0,0 +1,63 @@
+"""Fleet assignment: solve time and cost against sending every vehicle to
+its own best station.
+
+Vehicles are scattered around the centre of a synthetic city, more tightly
+than the stations, so nearby slots run out. "greedy" lets each vehicle in
+turn take its cheapest station with a slot left (what per-vehicle
+recommendations amount to once capacity is respected).
+
+Run from the repo root: python -m benchmarks.bench_assign
+"""
+import time
+
+import numpy as np
+
+from backend.algorithms.assignment import assign_fleet
+from backend.data.store import CityStations
+from benchmarks.bench_tiles import CENTER_LAT, CENTER_LON, make_stations
+
+STATIONS = 2_000
+FLEETS = [100, 1_000, 3_000, 5_000]
+
+
+def greedy_cost(stations, lats, lons, battery, types, waits):
+    """Total cost when vehicles pick one at a time, each taking its best
+    station with a slot left. Uses up stations.available."""
+    total, assigned = 0.0, 0
+    for i in range(len(lats)):
+        one = assign_fleet(stations, lats[i:i + 1], lons[i:i + 1], battery[i:i + 1], types[i:i + 1], waits)
+        row = one["row"][0]
+        if row >= 0:
+            total += one["cost"][0]
+            assigned += 1
+            stations.available[row] -= 1
+    return total, assigned
+
+
+def main():
+    stations = CityStations.from_stations("Mumbai", make_stations(STATIONS))
+    waits = np.zeros(len(stations))
+    rng = np.random.default_rng(0)
+    print(f"{'vehicles':>9} {'solve ms':>9} {'assigned':>9} {'cost/veh':>9} {'greedy assigned':>16} {'greedy cost/veh':>16}")
+    for n in FLEETS:
+        lats = CENTER_LAT + rng.normal(0, 0.05, n)
+        lons = CENTER_LON + rng.normal(0, 0.05, n)
+        battery = rng.uniform(10, 60, n)
+        types = rng.choice(["Auto", "Bus"], n).tolist()
+        available = stations.available.copy()
+
+        start = time.perf_counter()
+        result = assign_fleet(stations, lats, lons, battery, types, waits)
+        elapsed = (time.perf_counter() - start) * 1000
+        assigned = result["row"] >= 0
+
+        greedy_total, greedy_assigned = greedy_cost(stations, lats, lons, battery, types, waits)
+        stations.available[:] = available
+        print(
+            f"{n:>9} {elapsed:>9.1f} {assigned.sum():>9} {result['cost'][assigned].mean():>9.1f} "
+            f"{greedy_assigned:>16} {greedy_total / max(greedy_assigned, 1):>16.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
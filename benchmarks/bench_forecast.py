@@ -0,0 +1,46 @@
+"""Forecast latency: one station per call vs a whole city in one forward pass.
+
+Run from the repo root: python -m benchmarks.bench_forecast
+Uses the saved model when there is one, otherwise an untrained network of
+the same shape (latency does not depend on the weights).
+"""
+import time
+
+import numpy as np
+
+from backend.algorithms.lstm_model import LSTMForecaster, build_model, synthetic_utilization
+
+CITY_SIZES = [100, 1_000, 10_000]
+SINGLE_CALLS = 50
+
+
+def load():
+    try:
+        return LSTMForecaster.load()
+    except (OSError, ValueError):
+        return LSTMForecaster(build_model(), 0.0, 0.01, "untrained")
+
+
+def main():
+    forecaster = load()
+    print(f"model: {forecaster.version}")
+    histories = synthetic_utilization(max(CITY_SIZES), 24)
+    forecaster.predict(histories[:1])  # warm-up
+
+    start = time.perf_counter()
+    for i in range(SINGLE_CALLS):
+        forecaster.predict(histories[i:i + 1])
+    single = (time.perf_counter() - start) / SINGLE_CALLS
+    print(f"single station: {single * 1000:.2f} ms")
+
+    print(f"{'stations':>9} {'city batch ms':>14} {'per station ms':>15} {'vs one-by-one':>14}")
+    for n in CITY_SIZES:
+        forecaster.predict(histories[:n])
+        start = time.perf_counter()
+        forecaster.predict(histories[:n])
+        batch = time.perf_counter() - start
+        print(f"{n:>9} {batch * 1000:>14.2f} {batch / n * 1000:>15.4f} {single * n / batch:>13.0f}x")
+
+
+if __name__ == "__main__":
+    main()
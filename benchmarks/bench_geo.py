@@ -0,0 +1,63 @@
+"""Scalar vs vectorized haversine and scoring.
+
+Run from the repo root: python -m benchmarks.bench_geo
+"""
+import time
+
+import numpy as np
+
+from backend.utils.geo import StationArrays, haversine, station_score
+
+SIZES = [1_000, 100_000, 1_000_000]
+USER_LAT, USER_LON = 19.0760, 72.8777
+
+
+def make_stations(n, seed=0):
+    rng = np.random.default_rng(seed)
+    lats = USER_LAT + rng.uniform(-0.5, 0.5, n)
+    lons = USER_LON + rng.uniform(-0.5, 0.5, n)
+    costs = rng.choice([85, 100, 120, 150, 180], n)
+    available = rng.integers(0, 12, n)
+    is_fast = rng.random(n) < 0.5
+    return StationArrays(lats, lons, costs, available, np.where(is_fast, -1, 0), is_fast)
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def scalar_pass(arrays):
+    # Same work as the old per-dict path: distance, score and 10 km filter
+    lats, lons = arrays.lats.tolist(), arrays.lons.tolist()
+    costs, available, weights = arrays.costs.tolist(), arrays.available.tolist(), arrays.type_weights.tolist()
+    scores = []
+    nearby = []
+    for i in range(len(lats)):
+        distance = haversine(USER_LAT, USER_LON, lats[i], lons[i])
+        scores.append(station_score(distance, costs[i], available[i], weights[i]))
+        if distance <= 10:
+            nearby.append(i)
+    return sorted(range(len(scores)), key=scores.__getitem__)[:10], nearby
+
+
+def vectorized_pass(arrays):
+    return arrays.top_k(USER_LAT, USER_LON, 10), arrays.within(USER_LAT, USER_LON, 10)
+
+
+def main():
+    print(f"{'stations':>10} {'scalar ms':>12} {'numpy ms':>12} {'speedup':>9}")
+    for n in SIZES:
+        arrays = make_stations(n)
+        repeat = 3 if n >= 1_000_000 else 5
+        scalar = best_of(lambda: scalar_pass(arrays), repeat)
+        vectorized = best_of(lambda: vectorized_pass(arrays), repeat)
+        print(f"{n:>10} {scalar * 1000:>12.2f} {vectorized * 1000:>12.2f} {scalar / vectorized:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
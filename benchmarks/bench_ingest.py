@@ -0,0 +1,68 @@
+"""Occupancy ingestion throughput: events/s into the rollup rings.
+
+"store" calls OccupancyStore.ingest directly (rings, plus the newest value
+per station applied to the station store); "endpoint" POSTs the same
+batches as JSON to /api/occupancy through Flask's test client.
+
+Run from the repo root: python -m benchmarks.bench_ingest
+"""
+import json
+import time
+
+import numpy as np
+
+from backend.data.occupancy import OccupancyStore
+from backend.data.store import StationStore
+from benchmarks.bench_tiles import make_stations
+
+SIZES = [1_000, 100_000]
+BATCHES = [1_000, 10_000]
+EVENTS = 200_000
+
+
+def batches(ids, batch, seed=0):
+    rng = np.random.default_rng(seed)
+    now = time.time()
+    for _ in range(EVENTS // batch):
+        yield (
+            rng.choice(ids, batch),
+            now - rng.uniform(0, 60, batch),
+            rng.integers(0, 13, batch),
+        )
+
+
+def main():
+    import main as backend
+
+    print(f"{'stations':>10} {'batch':>7} {'store ev/s':>12} {'endpoint ev/s':>14}")
+    for n in SIZES:
+        stations = make_stations(n)
+        for batch in BATCHES:
+            store = StationStore(lambda city: stations)
+            occupancy = OccupancyStore(store)
+            ids = store.get("Mumbai").ids
+            start = time.perf_counter()
+            for station_ids, timestamps, available in batches(ids, batch):
+                occupancy.ingest("Mumbai", station_ids, timestamps, available)
+            direct = EVENTS / (time.perf_counter() - start)
+
+            backend.station_store = backend.occupancy.station_store = StationStore(lambda city: stations)
+            client = backend.app.test_client()
+            bodies = [
+                json.dumps({
+                    "city": "Mumbai",
+                    "station_ids": station_ids.tolist(),
+                    "timestamps": timestamps.tolist(),
+                    "available_slots": available.tolist(),
+                })
+                for station_ids, timestamps, available in batches(ids, batch)
+            ]
+            start = time.perf_counter()
+            for body in bodies:
+                client.post("/api/occupancy", data=body, content_type="application/json")
+            endpoint = EVENTS / (time.perf_counter() - start)
+            print(f"{n:>10} {batch:>7} {direct:>12,.0f} {endpoint:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""A* vs contraction hierarchy queries on synthetic grid cities.
+
+Run from the repo root: python -m benchmarks.bench_routing [grid side ...]
+"""
+import random
+import sys
+import time
+
+from backend.algorithms.astar import astar
+from backend.algorithms.contraction import ContractionHierarchy
+from backend.algorithms.road_graph import RoadGraph
+
+DEFAULT_SIDES = [50, 150]
+QUERIES = 200
+
+
+def mean_ms(fn, pairs):
+    start = time.perf_counter()
+    for source, target in pairs:
+        fn(source, target)
+    return (time.perf_counter() - start) / len(pairs) * 1000
+
+
+def main(sides):
+    print(f"{'nodes':>8} {'edges':>8} {'astar ms':>10} {'ch build s':>11} {'ch ms':>8}")
+    for side in sides:
+        graph = RoadGraph.grid(19.0760, 72.8777, side, side)
+        rng = random.Random(0)
+        pairs = [(rng.randrange(graph.size), rng.randrange(graph.size)) for _ in range(QUERIES)]
+
+        astar_ms = mean_ms(lambda s, t: astar(graph, s, t), pairs)
+        start = time.perf_counter()
+        hierarchy = ContractionHierarchy.build(graph)
+        build_s = time.perf_counter() - start
+        hierarchy.query(*pairs[0])  # first query builds the adjacency lists
+        ch_ms = mean_ms(hierarchy.query, pairs)
+        print(f"{graph.size:>8} {graph.edge_count:>8} {astar_ms:>10.2f} {build_s:>11.1f} {ch_ms:>8.3f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIDES)
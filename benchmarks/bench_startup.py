@@ -0,0 +1,68 @@
+"""Backend cold start: import time, first-request latency and time to ready.
+
+Each run is a fresh interpreter. "cold" starts with an empty snapshot
+directory, so stations are generated and indexed from scratch; "snapshot"
+starts again on the directory the cold run left behind.
+
+Run from the repo root: python -m benchmarks.bench_startup
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+SIZES = [10_000, 500_000]
+
+CHILD = """
+import json, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+main.warm_up()
+client = main.app.test_client()
+client.get('/api/stations?city=Mumbai')
+stations = time.perf_counter()
+client.get('/api/predict?city=Mumbai&hours=1')
+predict = time.perf_counter()
+while client.get('/api/ready').status_code != 200:
+    time.sleep(0.01)
+ready = time.perf_counter()
+print(json.dumps({
+    "import": imported - start,
+    "first /api/stations": stations - imported,
+    "first /api/predict": predict - stations,
+    "ready": ready - start,
+}))
+"""
+
+
+def run(stations, snapshot_dir):
+    env = dict(
+        os.environ,
+        STATION_SOURCE="synthetic",
+        SYNTHETIC_STATIONS_PER_CITY=str(stations),
+        STATION_SNAPSHOT_DIR=snapshot_dir,
+        WARMUP_CITIES="Mumbai",
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=root, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    print(f"{'stations':>10} {'start':>9} {'import s':>9} {'stations s':>11} {'predict s':>10} {'ready s':>8}")
+    for n in SIZES:
+        with tempfile.TemporaryDirectory() as snapshot_dir:
+            for label in ("cold", "snapshot"):
+                t = run(n, snapshot_dir)
+                print(
+                    f"{n:>10} {label:>9} {t['import']:>9.2f} {t['first /api/stations']:>11.2f} "
+                    f"{t['first /api/predict']:>10.2f} {t['ready']:>8.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
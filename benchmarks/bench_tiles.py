@@ -0,0 +1,70 @@
+"""Full-city station JSON vs one viewport of tiles, as the city grows.
+
+A viewport is the 3 x 3 block of tiles around the city centre at a city-wide
+zoom (11) and a street-level zoom (15). Times are serialization only.
+
+Run from the repo root: python -m benchmarks.bench_tiles
+"""
+import json
+import time
+
+import numpy as np
+
+from backend.algorithms.tiles import mercator, pack_columns, station_columns
+from backend.data.store import CityStations
+
+SIZES = [1_000, 100_000, 1_000_000]
+CENTER_LAT, CENTER_LON = 19.0760, 72.8777
+ZOOMS = [11, 15]
+
+
+def make_stations(n, seed=0):
+    rng = np.random.default_rng(seed)
+    lats = CENTER_LAT + rng.normal(0, 0.15, n)
+    lons = CENTER_LON + rng.normal(0, 0.15, n)
+    types = rng.choice(["Fast", "Normal"], n)
+    costs = rng.choice([85, 100, 120, 150, 180], n)
+    available = rng.integers(0, 12, n)
+    return [
+        {
+            "id": i, "name": f"Station {i}", "lat": float(lats[i]), "lon": float(lons[i]),
+            "available_slots": int(available[i]), "total_slots": 12, "type": str(types[i]),
+            "address": f"{i} Sample Road, Mumbai", "cost_per_hour": int(costs[i]),
+            "supports_swapping": bool(i % 3 == 0), "city": "Mumbai",
+        }
+        for i in range(n)
+    ]
+
+
+def viewport(stations, z, encoding):
+    """(bytes, seconds) to serialize the 9 tiles around the centre"""
+    x, y = mercator(CENTER_LAT, CENTER_LON)
+    cx, cy = int(x * (1 << z)), int(y * (1 << z))
+    size = 0
+    start = time.perf_counter()
+    for tx in range(cx - 1, cx + 2):
+        for ty in range(cy - 1, cy + 2):
+            kind, tile = stations.tiles.tile(stations, z, tx, ty)
+            columns = station_columns(stations, tile) if kind == "stations" else tile
+            if encoding == "binary":
+                size += len(pack_columns(kind, columns))
+            else:
+                size += len(json.dumps({k: v.tolist() for k, v in columns.items()}, separators=(",", ":")))
+    return size, time.perf_counter() - start
+
+
+def main():
+    print(f"{'stations':>10} {'view':>12} {'KB':>10} {'ms':>9}")
+    for n in SIZES:
+        stations = CityStations.from_stations("Mumbai", make_stations(n))
+        start = time.perf_counter()
+        size = len(stations.to_json())
+        print(f"{n:>10} {'full json':>12} {size / 1024:>10.1f} {(time.perf_counter() - start) * 1000:>9.2f}")
+        for z in ZOOMS:
+            for encoding in ("json", "binary"):
+                size, seconds = viewport(stations, z, encoding)
+                print(f"{n:>10} {f'z{z} {encoding}':>12} {size / 1024:>10.1f} {seconds * 1000:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Closed-loop load test against a running backend.
+
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --duration 20
+    python -m benchmarks.load_test --serve "gunicorn main:app" --duration 20
+
+Client processes each run a few threads with their own keep-alive session,
+looping over a mix of read endpoints with random locations in the city.
+Reports requests/s and p50/p99 latency per endpoint. With --serve the
+command is started first (from the repo root) and stopped afterwards.
+"""
+import argparse
+import os
+import signal
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+from backend.algorithms.tiles import mercator
+from backend.data.stations import CITY_CENTERS
+
+TILE_ZOOM = 13
+
+
+def endpoint_mix(city, rng):
+    """(name, path, params) requests picked uniformly"""
+    center_lat, center_lon = CITY_CENTERS[city]
+    lat = center_lat + rng.normal(0, 0.1)
+    lon = center_lon + rng.normal(0, 0.1)
+    x, y = mercator(lat, lon)
+    tile = f"{TILE_ZOOM}/{int(x * (1 << TILE_ZOOM))}/{int(y * (1 << TILE_ZOOM))}"
+    return [
+        ("stations", "/api/stations", {"city": city}),
+        ("recommendations", "/api/recommendations", {"city": city, "lat": lat, "lon": lon}),
+        ("tiles", f"/api/stations/tiles/{tile}", {"city": city, "format": "binary"}),
+        ("predict", "/api/predict", {"city": city, "hours": 6}),
+    ]
+
+
+def client_thread(url, city, deadline, seed, names):
+    rng = np.random.default_rng(seed)
+    session = requests.Session()
+    latencies = {}
+    errors = {}
+    while time.perf_counter() < deadline:
+        mix = [entry for entry in endpoint_mix(city, rng) if entry[0] in names]
+        name, path, params = mix[rng.integers(len(mix))]
+        start = time.perf_counter()
+        try:
+            ok = session.get(url + path, params=params, timeout=30).status_code < 400
+        except requests.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - start
+        if ok:
+            latencies.setdefault(name, []).append(elapsed)
+        else:
+            errors[name] = errors.get(name, 0) + 1
+    return latencies, errors
+
+
+def client_process(url, city, duration, threads, seed, names):
+    deadline = time.perf_counter() + duration
+    with ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(
+            lambda i: client_thread(url, city, deadline, seed * 1000 + i, names), range(threads)
+        ))
+    latencies, errors = {}, {}
+    for thread_latencies, thread_errors in results:
+        for name, values in thread_latencies.items():
+            latencies.setdefault(name, []).extend(values)
+        for name, count in thread_errors.items():
+            errors[name] = errors.get(name, 0) + count
+    return latencies, errors
+
+
+def wait_ready(url, timeout=300):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(url + "/api/ready", timeout=5).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{url} did not become ready within {timeout}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test a running backend")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--serve", help="command that starts the server, e.g. 'gunicorn main:app'")
+    parser.add_argument("--city", default="Mumbai")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--processes", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--threads", type=int, default=4, help="client threads per process")
+    parser.add_argument("--endpoints", default="stations,recommendations,tiles,predict")
+    args = parser.parse_args()
+    names = set(args.endpoints.split(","))
+
+    server = None
+    if args.serve:
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        server = subprocess.Popen(args.serve, shell=True, cwd=root, start_new_session=True)
+    try:
+        wait_ready(args.url)
+        with ProcessPoolExecutor(args.processes) as pool:
+            futures = [
+                pool.submit(client_process, args.url, args.city, args.duration, args.threads, seed, names)
+                for seed in range(args.processes)
+            ]
+            results = [f.result() for f in futures]
+    finally:
+        if server is not None:
+            os.killpg(server.pid, signal.SIGTERM)
+            server.wait()
+
+    latencies, errors = {}, {}
+    for process_latencies, process_errors in results:
+        for name, values in process_latencies.items():
+            latencies.setdefault(name, []).extend(values)
+        for name, count in process_errors.items():
+            errors[name] = errors.get(name, 0) + count
+
+    clients = args.processes * args.threads
+    print(f"{clients} clients for {args.duration:.0f}s against {args.url}")
+    print(f"{'endpoint':>16} {'requests':>9} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    total = 0
+    for name in sorted(set(latencies) | set(errors)):
+        values = np.array(latencies.get(name, [np.nan])) * 1000
+        count = len(latencies.get(name, []))
+        total += count
+        print(
+            f"{name:>16} {count:>9} {count / args.duration:>9.1f} {np.percentile(values, 50):>9.1f} "
+            f"{np.percentile(values, 99):>9.1f} {errors.get(name, 0):>7}"
+        )
+    print(f"{'total':>16} {total:>9} {total / args.duration:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,468 @@
+"""Benchmark suite: latency, throughput and memory of the algorithms and every
+API endpoint, with JSON baselines and regression checks.
+
+Each station count runs in a fresh interpreter on synthetic stations
+(STATION_SOURCE=synthetic, fixed seeds, empty snapshot directory) and
+synthetic grid road graphs, so it needs no database or network and starts
+from the same state every time. Functions are called directly; endpoints go
+through the Flask test client. Every case reports the median and p95
+latency, calls per second and the peak memory allocated by one call.
+
+Run from the repo root:
+    python -m benchmarks.suite run --output baseline.json
+    python -m benchmarks.suite run --sizes 100,10000 --compare baseline.json
+    python -m benchmarks.suite compare baseline.json current.json
+    python -m benchmarks.suite check
+
+Comparisons exit with status 1 when a case allocates more, or got slower
+(beyond the baseline's p95 too, to ride out noise), by more than
+--threshold. `check` is a quick smoke test instead: one request per
+endpoint, plus inputs the API must reject, each checked for its status code
+and the keys of its JSON payload; it exits with status 1 on any mismatch.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+SIZES = [100, 10_000, 1_000_000]
+CITY = "Mumbai"
+CENTER_LAT, CENTER_LON = 19.0760, 72.8777
+# Each case runs at least MIN_RUNS times and for at least MIN_SECONDS, up to MAX_RUNS
+MIN_RUNS = 5
+MIN_SECONDS = 1.0
+MAX_RUNS = 2000
+# (grid side, runs per case, runs of routes with charging stops): 900 and
+# 90,000 intersections 500 m apart. Routing cases time a fixed number of
+# runs over fixed trips; metro route matrices and charging stops take
+# seconds, so those run fewer times, the latter without a warm-up call
+ROAD_GRAPHS = {"small": (30, 20, MIN_RUNS), "metro": (300, 3, 1)}
+# Relative slowdown (or extra memory) reported as a regression
+DEFAULT_THRESHOLD = 0.25
+# Differences below these are noise, whatever the ratio
+MIN_REGRESSION_MS = 0.05
+MIN_REGRESSION_KB = 256
+FLEET_SIZE = 200
+OCCUPANCY_BATCH = 1000
+# Stations per city for `check`, and how long it waits for /api/ready
+CHECK_STATIONS = 1000
+CHECK_READY_SECONDS = 120
+STATION_KEYS = ("id", "name", "lat", "lon", "available_slots", "total_slots", "type", "cost_per_hour")
+
+
+def measure(fn, min_runs=MIN_RUNS, min_seconds=MIN_SECONDS, warm_up=True):
+    """Latency, throughput and peak allocation of fn(), after one untimed
+    call that builds whatever it creates lazily"""
+    if warm_up:
+        fn()
+    times = []
+    started = time.perf_counter()
+    while len(times) < MAX_RUNS and (len(times) < min_runs or time.perf_counter() - started < min_seconds):
+        call_started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - call_started)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    times = np.array(times) * 1000
+    return {
+        "runs": len(times),
+        "median_ms": round(float(np.median(times)), 4),
+        "p95_ms": round(float(np.percentile(times, 95)), 4),
+        "per_second": round(len(times) / float(times.sum() / 1000), 1),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def query_points(count=1000, seed=0):
+    """Endless cycle of locations around the city, so cached endpoints keep missing"""
+    rng = np.random.default_rng(seed)
+    points = np.column_stack((rng.normal(CENTER_LAT, 0.08, count), rng.normal(CENTER_LON, 0.08, count)))
+    return itertools.cycle([(round(lat, 6), round(lon, 6)) for lat, lon in points.tolist()])
+
+
+def endpoint(client, method, path, **kwargs):
+    """fn() making one request; a failing request stops the suite rather
+    than timing an error page"""
+    def call():
+        response = client.open(path() if callable(path) else path, method=method, **kwargs)
+        if response.status_code != 200:
+            raise RuntimeError(f"{method} {response.request.path} returned {response.status_code}")
+        response.get_data()
+    return call
+
+
+def run_size(n):
+    """Every case for n stations; runs in the child interpreter"""
+    import main
+    from backend.algorithms.assignment import assign_fleet
+    from backend.algorithms.ranking import rank_stations
+    from backend.algorithms.road_graph import RoadGraph
+    from backend.algorithms.routing import plan_route, route_matrix
+    from backend.algorithms.tiles import mercator
+    from backend.data.stations import get_stations_data
+    from backend.data.store import CityStations
+
+    cases = {}
+    # The first load also pays for imports; the case below is a load without them
+    started = time.perf_counter()
+    stations = main.station_store.get(CITY)
+    load_seconds = time.perf_counter() - started
+    raw = get_stations_data(CITY)
+    cases["load: CityStations.from_stations"] = measure(lambda: CityStations.from_stations(CITY, raw), 1, 0, False)
+    del raw
+    client = main.app.test_client()
+    rng = np.random.default_rng(0)
+    points = query_points()
+    arrays, index = stations.arrays, stations.index
+
+    # Functions
+    cases["geo: StationArrays.scores"] = measure(lambda: arrays.scores(CENTER_LAT, CENTER_LON))
+    cases["geo: StationArrays.top_k(10)"] = measure(lambda: arrays.top_k(CENTER_LAT, CENTER_LON, 10))
+    cases["index: nearest(k=10)"] = measure(lambda: index.nearest(*next(points), k=10))
+    cases["index: within(2 km)"] = measure(lambda: index.within(*next(points), 2.0))
+    waits = main.wait_estimator.waits(stations)
+    available = main.occupancy.recent_available(stations)
+    cases["recommend"] = measure(lambda: main.recommend(stations, *next(points), waits, available))
+    cases["rank_stations(k=10)"] = measure(lambda: rank_stations(stations, *next(points), 10, waits=waits))
+    cases["queueing: wait estimates"] = measure(lambda: main.wait_estimator._estimate(stations, time.time()))
+    cases["serialize: CityStations.to_json"] = measure(stations.to_json)
+    x, y = mercator(CENTER_LAT, CENTER_LON)
+    cases["tiles: zoom 11 centre tile"] = measure(
+        lambda: stations.tiles.tile(stations, 11, int(x * 2048), int(y * 2048))
+    )
+    fleet = rng.normal((CENTER_LAT, CENTER_LON), 0.05, (FLEET_SIZE, 2))
+    battery = rng.uniform(10, 60, FLEET_SIZE)
+    cases[f"assign_fleet({FLEET_SIZE} vehicles)"] = measure(
+        lambda: assign_fleet(stations, fleet[:, 0], fleet[:, 1], battery, ["Car"] * FLEET_SIZE, waits), 3
+    )
+    ids = stations.ids
+    cases[f"occupancy: ingest {OCCUPANCY_BATCH} events"] = measure(
+        lambda: main.occupancy.ingest(
+            CITY, rng.choice(ids, OCCUPANCY_BATCH), np.full(OCCUPANCY_BATCH, time.time()),
+            rng.integers(0, 12, OCCUPANCY_BATCH)
+        )
+    )
+
+    # Endpoints
+    cases["GET /api/stations"] = measure(endpoint(client, "GET", f"/api/stations?city={CITY}"))
+    cases["GET /api/recommendations"] = measure(endpoint(
+        client, "GET", lambda: "/api/recommendations?city={}&lat={}&lon={}".format(CITY, *next(points))
+    ))
+    cases["GET /api/rank"] = measure(endpoint(
+        client, "GET", lambda: "/api/rank?city={}&lat={}&lon={}&k=10&radius=5".format(CITY, *next(points))
+    ))
+    tiles = itertools.cycle([(int(x * 2048) + dx, int(y * 2048) + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)])
+    cases["GET /api/stations/tiles (binary)"] = measure(endpoint(
+        client, "GET", lambda: "/api/stations/tiles/11/{}/{}?city={}&format=binary".format(*next(tiles), CITY)
+    ))
+    station_id = int(ids[0])
+    cases["GET /api/predict/<id>"] = measure(endpoint(client, "GET", f"/api/predict/{station_id}?city={CITY}"))
+    cases["GET /api/occupancy/<id>"] = measure(endpoint(client, "GET", f"/api/occupancy/{station_id}?city={CITY}"))
+    events = {
+        "city": CITY,
+        "station_ids": rng.choice(ids, OCCUPANCY_BATCH).tolist(),
+        "available_slots": rng.integers(0, 12, OCCUPANCY_BATCH).tolist(),
+    }
+    cases["POST /api/occupancy"] = measure(endpoint(client, "POST", "/api/occupancy", json=events))
+    vehicles = [
+        {"id": i, "lat": float(lat), "lon": float(lon), "battery_level": float(b)}
+        for i, ((lat, lon), b) in enumerate(zip(fleet, battery))
+    ]
+    cases["POST /api/assign"] = measure(
+        endpoint(client, "POST", "/api/assign", json={"city": CITY, "vehicles": vehicles}), 3
+    )
+
+    for name, (side, runs, charging_runs) in ROAD_GRAPHS.items():
+        main.road_store.add(CITY, RoadGraph.grid(CENTER_LAT, CENTER_LON, side, side))
+        roads = main.road_store.get(CITY)
+        # Every case replays the same trips from the start, so runs and
+        # machines time the same routes
+        extent = side * 0.5 / 111.0 / 2
+        offsets = np.random.default_rng(side).uniform(-extent, extent, ((runs + 2) * 10, 4))
+        trip_list = (offsets + (CENTER_LAT, CENTER_LON, CENTER_LAT, CENTER_LON)).tolist()
+
+        def route_body(trip, battery_level=None):
+            body = dict(zip(("start_lat", "start_lon", "end_lat", "end_lon"), trip), city=CITY)
+            if battery_level is not None:
+                body["battery_level"] = battery_level
+            return body
+
+        trips = itertools.cycle(trip_list)
+        cases[f"routing: plan_route [{name}]"] = measure(lambda: plan_route(roads, *next(trips)), runs, 0)
+        trips = itertools.cycle(trip_list)
+        cases[f"routing: route_matrix 10x10 [{name}]"] = measure(
+            lambda: route_matrix(roads, *np.hsplit(np.array([next(trips) for _ in range(10)]), 2)), runs, 0
+        )
+        trips = itertools.cycle(trip_list)
+        cases[f"POST /api/route [{name}]"] = measure(
+            lambda: endpoint(client, "POST", "/api/route", json=route_body(next(trips)))(), runs, 0
+        )
+        trips = itertools.cycle(trip_list)
+        cases[f"POST /api/route with charging stops [{name}]"] = measure(
+            lambda: endpoint(client, "POST", "/api/route", json=route_body(next(trips), 100))(),
+            charging_runs, 0, charging_runs > 1
+        )
+
+    cases["GET /metrics"] = measure(endpoint(client, "GET", "/metrics"))
+    return {
+        "stations": len(stations),
+        "load_seconds": round(load_seconds, 3),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "cases": cases,
+    }
+
+
+def check_endpoints():
+    """Failed checks, as strings, out of one request per endpoint and per
+    rejected input; runs in the child interpreter.
+
+    A check is (method, path, JSON body, status, shape): shape is a tuple of
+    keys the JSON object must have, a list holding one such tuple for a
+    non-empty array of objects, or None to check the status only.
+    """
+    import main
+    from backend.algorithms.road_graph import RoadGraph
+    from backend.algorithms.tiles import MAX_TILE_ZOOM, mercator
+
+    client = main.app.test_client()
+    main.warm_up()
+    deadline = time.monotonic() + CHECK_READY_SECONDS
+    while client.get("/api/ready").status_code != 200 and time.monotonic() < deadline:
+        time.sleep(0.1)
+    stations = main.station_store.get(CITY)
+    main.road_store.add(CITY, RoadGraph.grid(CENTER_LAT, CENTER_LON, 30, 30))
+    station_id = int(stations.ids[0])
+    x, y = mercator(CENTER_LAT, CENTER_LON)
+    tile = f"/api/stations/tiles/11/{int(x * 2048)}/{int(y * 2048)}?city={CITY}"
+    here = f"city={CITY}&lat={CENTER_LAT}&lon={CENTER_LON}"
+    trip = {"city": CITY, "start_lat": CENTER_LAT, "start_lon": CENTER_LON,
+            "end_lat": CENTER_LAT + 0.02, "end_lon": CENTER_LON + 0.02}
+    vehicle = {"id": 1, "lat": CENTER_LAT, "lon": CENTER_LON, "battery_level": 30}
+    error = ("error",)
+
+    checks = [
+        ("GET", "/api/ready", None, 200, ("ready", "components", "cities")),
+        ("GET", "/metrics", None, 200, None),
+        ("GET", f"/api/stations?city={CITY}", None, 200, [STATION_KEYS]),
+        ("GET", f"/api/recommendations?{here}", None, 200, ("nearest", "cheapest", "fastest", "least_queue")),
+        ("GET", f"/api/rank?{here}&k=5", None, 200, ("weights", "top", "pareto_size", "pareto")),
+        ("GET", tile, None, 200, ("kind", "count", "types", "lat", "lon", "available_slots", "total_slots")),
+        ("GET", f"{tile}&format=binary", None, 200, None),
+        ("POST", "/api/stations/availability", {"city": CITY, "updates": {str(station_id): 1}}, 200,
+         ("changed", "version")),
+        ("POST", "/api/occupancy", {"city": CITY, "station_ids": [station_id], "available_slots": [1]}, 200,
+         ("accepted", "dropped", "changed", "version")),
+        ("GET", f"/api/occupancy/{station_id}?city={CITY}", None, 200, ("resolution", "timestamps", "utilization")),
+        ("GET", f"/api/predict/{station_id}?city={CITY}", None, 200, ("timestamps", "utilization", "source", "recorded_hours")),
+        ("GET", f"/api/predict?city={CITY}", None, 200, ("model_version", "station_ids", "timestamps", "utilization", "sources")),
+        ("GET", "/api/predict/cache", None, 200, ("entries", "bytes", "hits", "misses")),
+        ("POST", "/api/route", trip, 200, ("distance", "time", "energy_cost", "path")),
+        ("POST", "/api/route", dict(trip, battery_level=100), 200,
+         ("distance", "time", "energy_cost", "path", "charging_stops", "arrival_battery")),
+        ("POST", "/api/route/matrix", {"city": CITY, "origins": [[CENTER_LAT, CENTER_LON]], "station_ids": [station_id]},
+         200, ("station_ids", "distance", "time", "energy_cost")),
+        ("POST", "/api/assign", {"city": CITY, "vehicles": [vehicle]}, 200,
+         ("objective", "assigned", "unassigned", "total_cost", "assignments")),
+        # Rejected input
+        ("POST", "/api/route", {"city": CITY, "start_lat": CENTER_LAT}, 400, error),
+        ("POST", "/api/route", dict(trip, battery_level=150), 400, error),
+        ("POST", "/api/route", dict(trip, city="Atlantis"), 404, error),
+        ("POST", "/api/route/matrix", {"city": CITY, "origins": [], "station_ids": [-1]}, 400, error),
+        ("POST", "/api/route/matrix", {"city": CITY, "origins": [[CENTER_LAT]]}, 400, error),
+        ("POST", "/api/route/matrix", {"city": CITY, "origins": [], "station_ids": [[1]]}, 400, error),
+        ("POST", "/api/assign", {"city": CITY, "vehicles": [{"id": 1}]}, 400, error),
+        ("POST", "/api/assign", {"city": CITY, "vehicles": [dict(vehicle, lat="nan")]}, 400, error),
+        ("POST", "/api/assign", {"city": CITY, "vehicles": [dict(vehicle, battery_level=-1)]}, 400, error),
+        ("POST", "/api/stations/availability", {"city": CITY, "updates": {"x": 1}}, 400, error),
+        ("POST", "/api/occupancy", {"city": CITY, "station_ids": [station_id], "available_slots": []}, 400, error),
+        ("POST", "/api/occupancy", {"city": CITY, "station_ids": ["x"], "available_slots": [1]}, 400, error),
+        ("GET", f"/api/recommendations?{here}&cell=13", None, 400, error),
+        ("GET", f"/api/recommendations?lat={CENTER_LAT}&lon={CENTER_LON}", None, 400, error),
+        ("GET", f"/api/recommendations?city={CITY}&lat=inf&lon={CENTER_LON}", None, 400, error),
+        ("GET", f"/api/rank?{here}&cost_weight=nan", None, 400, error),
+        ("GET", f"/api/rank?{here}&wait_weight=-1", None, 400, error),
+        ("GET", f"/api/rank?city={CITY}&lat=nan&lon={CENTER_LON}", None, 400, error),
+        ("GET", f"/api/stations/tiles/{MAX_TILE_ZOOM + 1}/0/0?city={CITY}", None, 400, error),
+        ("GET", "/api/stations/stream?city=Atlantis", None, 404, error),
+    ]
+
+    failures = []
+    for method, path, body, status, shape in checks:
+        name = f"{method} {path}" if body is None else f"{method} {path} {json.dumps(body)}"
+        response = client.open(path, method=method, json=body)
+        if response.status_code != status:
+            failures.append(f"{name}: status {response.status_code}, expected {status}")
+            continue
+        if shape is None:
+            continue
+        payload = response.get_json(silent=True)
+        objects = payload if isinstance(shape, list) else [payload]
+        keys = shape[0] if isinstance(shape, list) else shape
+        if not isinstance(objects, list) or not objects:
+            failures.append(f"{name}: expected a non-empty JSON array")
+        elif not all(isinstance(item, dict) and set(keys) <= set(item) for item in objects):
+            failures.append(f"{name}: payload lacks some of {', '.join(keys)}")
+
+    # A stream never ends: check its headers and first event, then close it
+    response = client.get(f"/api/stations/stream?city={CITY}", buffered=False)
+    first = next(response.iter_encoded(), b"")
+    response.close()
+    if response.status_code != 200 or response.mimetype != "text/event-stream" \
+            or not first.startswith(b"event: version"):
+        failures.append(f"GET /api/stations/stream: status {response.status_code}, first event {first!r}")
+    return {"checks": len(checks) + 1, "failures": failures}
+
+
+def child_env(n, snapshot_dir):
+    """Environment of a child interpreter for n synthetic stations per city"""
+    return dict(
+        os.environ,
+        STATION_SOURCE="synthetic",
+        SYNTHETIC_STATIONS_PER_CITY=str(n),
+        STATION_SNAPSHOT_DIR=snapshot_dir,
+        ROAD_GRAPH_DIR=snapshot_dir,
+        ROUTING_HIERARCHY="0",
+        PROFILE_SLOW_REQUESTS_MS="0",
+        PYTHONHASHSEED="0",
+    )
+
+
+def run_child(n, *args):
+    """Last line of a child interpreter's output, parsed as JSON"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.suite", "child", str(n), *args],
+            cwd=root, env=child_env(n, snapshot_dir), stdout=subprocess.PIPE, text=True, check=True
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run(sizes):
+    """Results for every size, each measured in a fresh interpreter"""
+    results = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "sizes": {},
+    }
+    for n in sizes:
+        print(f"Running {n} stations...", file=sys.stderr)
+        results["sizes"][str(n)] = run_child(n)
+    return results
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """Rows of (size, case, baseline ms, current ms, change, status); status is
+    "regression", "regression (memory)", "improved", "ok", "new" or "missing"
+    """
+    rows = []
+    # Sizes this run skipped aren't missing cases
+    for size in sorted(current["sizes"], key=int):
+        before = baseline["sizes"].get(size, {}).get("cases", {})
+        after = current["sizes"].get(size, {}).get("cases", {})
+        for case in list(before) + [c for c in after if c not in before]:
+            old, new = before.get(case), after.get(case)
+            if old is None or new is None:
+                rows.append((size, case, old and old["median_ms"], new and new["median_ms"], None,
+                             "new" if old is None else "missing"))
+                continue
+            change = new["median_ms"] / max(old["median_ms"], 1e-9) - 1
+            # Slower past the threshold and past the baseline's own spread
+            slower = (change > threshold and new["median_ms"] > old["p95_ms"]
+                      and new["median_ms"] - old["median_ms"] > MIN_REGRESSION_MS)
+            grew = (new["peak_kb"] > old["peak_kb"] * (1 + threshold)
+                    and new["peak_kb"] - old["peak_kb"] > MIN_REGRESSION_KB)
+            faster = change < -threshold and old["median_ms"] - new["median_ms"] > MIN_REGRESSION_MS
+            if slower:
+                status = "regression"
+            elif grew:
+                status = "regression (memory)"
+            else:
+                status = "improved" if faster else "ok"
+            rows.append((size, case, old["median_ms"], new["median_ms"], change, status))
+    return rows
+
+
+def print_results(results):
+    for size, result in results["sizes"].items():
+        print(f"\n{int(size):,} stations: loaded in {result['load_seconds']} s, peak RSS {result['max_rss_mb']} MB")
+        print(f"{'case':<48} {'median ms':>10} {'p95 ms':>10} {'per s':>10} {'peak KB':>10}")
+        for case, m in result["cases"].items():
+            print(f"{case:<48} {m['median_ms']:>10.3f} {m['p95_ms']:>10.3f} {m['per_second']:>10.1f} {m['peak_kb']:>10.1f}")
+
+
+def print_comparison(rows):
+    """Prints the rows; returns whether any is a regression"""
+    print(f"\n{'stations':>9} {'case':<48} {'before ms':>10} {'after ms':>10} {'change':>8}  status")
+    for size, case, old, new, change, status in rows:
+        old_text = "-" if old is None else f"{old:.3f}"
+        new_text = "-" if new is None else f"{new:.3f}"
+        change_text = "-" if change is None else f"{change:+.0%}"
+        print(f"{int(size):>9,} {case:<48} {old_text:>10} {new_text:>10} {change_text:>8}  {status}")
+    return any(row[-1].startswith("regression") for row in rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the algorithms and API endpoints")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="measure, optionally against a baseline")
+    run_parser.add_argument("--sizes", default=",".join(map(str, SIZES)), help="comma-separated station counts")
+    run_parser.add_argument("--output", help="write the results to this JSON file")
+    run_parser.add_argument("--compare", help="baseline JSON file to compare against")
+    run_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    commands.add_parser("check", help="smoke-test every endpoint's status codes and payload shapes")
+    child_parser = commands.add_parser("child")
+    child_parser.add_argument("stations", type=int)
+    child_parser.add_argument("--check", action="store_true")
+    args = parser.parse_args()
+
+    if args.command == "child":
+        print(json.dumps(check_endpoints() if args.check else run_size(args.stations)))
+        return 0
+
+    if args.command == "check":
+        result = run_child(CHECK_STATIONS, "--check")
+        for failure in result["failures"]:
+            print(f"FAIL {failure}")
+        print(f"{result['checks'] - len(result['failures'])} of {result['checks']} checks passed")
+        return 1 if result["failures"] else 0
+
+    if args.command == "compare":
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        return 1 if print_comparison(compare(baseline, current, args.threshold)) else 0
+
+    results = run([int(n) for n in args.sizes.split(",")])
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        return 1 if print_comparison(compare(baseline, results, args.threshold)) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from backend.utils.cache import TTLCache
+
+# Calls kept for the timing panel
+TIMING_HISTORY = 200
+# Cached GET responses live this long, keeping reruns off the network
+RESPONSE_TTL_SECONDS = 15
+RESPONSE_CACHE_BYTES = 64 * 1024 * 1024
+# After that, bodies are kept this long to revalidate with If-None-Match
+REVALIDATE_TTL_SECONDS = 30 * 60
+
+
+def parse_server_timing(header):
+    """{metric: ms} from a Server-Timing header"""
+    timings = {}
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "dur" and name:
+                try:
+                    timings[name] = float(value)
+                except ValueError:
+                    pass
+    return timings
+
+
+class BackendError(Exception):
+    """Backend answered with a non-200 status"""
+
+    def __init__(self, status_code, path):
+        super().__init__(f"{path} returned {status_code}")
+        self.status_code = status_code
+
+
+class BackendClient:
+    """Keep-alive, pooled HTTP client for the Flask backend.
+
+    One instance is shared by every Streamlit session. Identical GETs that
+    are in flight at the same time share a single request, GETs made with
+    cache=True are reused for RESPONSE_TTL_SECONDS and then revalidated by
+    ETag (a 304 reuses the body), `submit` runs calls concurrently, and
+    every call's latency is recorded in `timings`, with the backend's own
+    share and stages from its Server-Timing header.
+    """
+
+    def __init__(self, base_url, pool_size=16, timeout=10):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.timings = deque(maxlen=TIMING_HISTORY)
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="backend")
+        self._in_flight = {}
+        self._lock = Lock()
+        self._responses = TTLCache(RESPONSE_TTL_SECONDS, RESPONSE_CACHE_BYTES)
+        # key -> (ETag, result) of the last full response
+        self._validators = TTLCache(REVALIDATE_TTL_SECONDS, RESPONSE_CACHE_BYTES)
+
+    def get(self, name, path, params=None, cache=False, with_version=False):
+        """Parsed JSON body, or (X-Station-Version, body) with with_version"""
+        key = (path, tuple(sorted((params or {}).items())), with_version)
+        if cache:
+            cached = self._responses.get(key)
+            if cached is not None:
+                self.timings.append({
+                    "name": name, "path": path, "status": "cached", "ms": 0.0, "server_ms": None, "stages": {},
+                    "started": time.perf_counter()
+                })
+                return cached
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+        if not leader:
+            return future.result()
+
+        try:
+            result = self._send(name, "GET", path, with_version, key if cache else None, params=params)
+            if cache:
+                self._responses.put(key, result)
+            future.set_result(result)
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+        return future.result()
+
+    def post(self, name, path, payload):
+        return self._send(name, "POST", path, False, None, json=payload)
+
+    def submit(self, fn, *args, **kwargs):
+        """Run a call on the client's pool; returns a Future"""
+        return self._executor.submit(fn, *args, **kwargs)
+
+    def _send(self, name, method, path, with_version, validator_key, **kwargs):
+        started = time.perf_counter()
+        status = None
+        server = {}
+        previous = self._validators.get(validator_key) if validator_key is not None else None
+        headers = {"If-None-Match": previous[0]} if previous is not None else None
+        try:
+            response = self.session.request(
+                method, f"{self.base_url}{path}", headers=headers, timeout=self.timeout, **kwargs
+            )
+            status = response.status_code
+            server = parse_server_timing(response.headers.get("Server-Timing"))
+            if status == 304 and previous is not None:
+                return previous[1]
+            if status != 200:
+                raise BackendError(status, path)
+            if with_version:
+                result = int(response.headers.get("X-Station-Version", 0)), response.json()
+            else:
+                result = response.json()
+            etag = response.headers.get("ETag")
+            if validator_key is not None and etag:
+                self._validators.put(validator_key, (etag, result))
+            return result
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.timings.append({
+                "name": name, "path": path, "status": status, "ms": elapsed_ms,
+                "server_ms": server.pop("total", None), "stages": server, "started": started
+            })
+
+    def timings_since(self, started):
+        """Calls that began at or after a perf_counter() timestamp"""
+        return [t for t in list(self.timings) if t["started"] >= started]
@@ -0,0 +1,83 @@
+import json
+import threading
+
+import requests
+
+# Wait before reconnecting after the stream drops
+RECONNECT_SECONDS = 3
+
+
+class LiveStations:
+    """One city's station list, kept current from the backend's SSE stream.
+
+    A full list is fetched once; after that a background thread applies
+    available_slots deltas in place, so traffic depends on how often
+    stations change rather than on how many there are.
+    """
+
+    def __init__(self, backend_url, city):
+        self.backend_url = backend_url
+        self.city = city
+        self.version = None
+        self.stations = []
+        self._by_id = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._refetch()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def snapshot(self):
+        """(version, stations) as of now"""
+        with self._lock:
+            return self.version, list(self.stations)
+
+    def _refetch(self):
+        response = requests.get(f"{self.backend_url}/api/stations", params={"city": self.city}, timeout=10)
+        response.raise_for_status()
+        stations = response.json()
+        with self._lock:
+            self.stations = stations
+            self._by_id = {s["id"]: s for s in stations}
+            self.version = int(response.headers.get("X-Station-Version", 0))
+
+    def _apply(self, version, changes):
+        with self._lock:
+            for station_id, slots in changes.items():
+                station = self._by_id.get(int(station_id))
+                if station is not None:
+                    station["available_slots"] = slots
+            self.version = version
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._listen()
+            except requests.exceptions.RequestException:
+                self._stop.wait(RECONNECT_SECONDS)
+
+    def _listen(self):
+        params = {"city": self.city, "since": self.version}
+        with requests.get(f"{self.backend_url}/api/stations/stream", params=params, stream=True, timeout=(10, 60)) as response:
+            response.raise_for_status()
+            event, data = None, []
+            for line in response.iter_lines(decode_unicode=True):
+                if self._stop.is_set():
+                    return
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:"):
+                    data.append(line[5:].strip())
+                elif not line and data:
+                    payload = json.loads("\n".join(data))
+                    if event == "delta":
+                        self._apply(payload["version"], payload["changes"])
+                    elif event == "reset":
+                        self._refetch()
+                    event, data = None, []
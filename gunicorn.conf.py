@@ -0,0 +1,37 @@
+"""Production server: gunicorn main:app (run from the repo root).
+
+The app is imported once in the parent and main.preload() builds the
+WARMUP_CITIES stations, spatial indexes, tiles and road graphs there before
+any worker is forked, so workers share one copy of that data (copy-on-write,
+with live availability in shared memory). Each worker then loads its own
+forecaster in the background, since TensorFlow can't be shared across fork.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+# Threads per worker keep slow requests and SSE streams from blocking a whole
+# process. An open stream holds its thread, so main.py caps them at
+# MAX_OPEN_STREAMS per worker (same default as there) and every worker keeps
+# at least 16 threads beyond that for API requests
+worker_class = "gthread"
+max_open_streams = int(os.environ.get("MAX_OPEN_STREAMS", 16))
+threads = max(int(os.environ.get("WORKER_THREADS", 32)), max_open_streams + 16)
+preload_app = True
+# Above the SSE keepalive interval, so idle streams aren't taken for hung workers
+timeout = 60
+accesslog = os.environ.get("ACCESS_LOG")
+
+
+def when_ready(server):
+    # Runs in the parent after the app is imported, before workers fork
+    import main
+
+    main.preload()
+
+
+def post_fork(server, worker):
+    import main
+
+    main.warm_up()
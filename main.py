@@ -1,136 +1,862 @@
-from flask import Flask, jsonify, request
-from flask_cors import CORS
-from backend.data.stations import get_stations_data
-
-
-app = Flask(__name__)
-CORS(app)
-
-@app.route('/api/stations', methods=['GET'])
-def get_stations():
-    city = request.args.get('city', 'Mumbai')
-    return jsonify(get_stations_data(city))
-    '''city = request.args.get('city', 'Delhi')
-
-    city_stations = {
-        "Delhi": [
-            {"id": 1, "name": "CP Fast Charger", "lat": 28.6139, "lon": 77.2090,
-             "available_slots": 4, "total_slots": 10, "type": "Fast", "address": "Connaught Place",
-             "cost_per_hour": 150, "supports_swapping": True},
-            {"id": 2, "name": "Lajpat EV Hub", "lat": 28.5678, "lon": 77.2345,
-             "available_slots": 2, "total_slots": 6, "type": "Normal", "address": "Lajpat Nagar",
-             "cost_per_hour": 100, "supports_swapping": False}
-        ],
-        "Mumbai": [
-            {"id": 3, "name": "Bandra EV Point", "lat": 19.0590, "lon": 72.8295,
-             "available_slots": 5, "total_slots": 12, "type": "Fast", "address": "Bandra West",
-             "cost_per_hour": 180, "supports_swapping": True},
-            {"id": 4, "name": "Dadar EcoCharge", "lat": 19.0180, "lon": 72.8436,
-             "available_slots": 1, "total_slots": 8, "type": "Normal", "address": "Dadar East",
-             "cost_per_hour": 90, "supports_swapping": False}
-        ],
-        "Bangalore": [
-            {"id": 5, "name": "Koramangala PlugIn", "lat": 12.9352, "lon": 77.6141,
-             "available_slots": 3, "total_slots": 9, "type": "Fast", "address": "Koramangala",
-             "cost_per_hour": 120, "supports_swapping": True},
-            {"id": 6, "name": "Indiranagar EV Zone", "lat": 12.9718, "lon": 77.6408,
-             "available_slots": 0, "total_slots": 7, "type": "Normal", "address": "Indiranagar",
-             "cost_per_hour": 85, "supports_swapping": False}
-        ],
-        "Chennai": [
-            {"id": 7, "name": "T-Nagar ChargeBay", "lat": 13.0423, "lon": 80.2337,
-             "available_slots": 6, "total_slots": 10, "type": "Fast", "address": "T Nagar",
-             "cost_per_hour": 130, "supports_swapping": True},
-            {"id": 8, "name": "Velachery EcoStation", "lat": 12.9792, "lon": 80.2200,
-             "available_slots": 3, "total_slots": 5, "type": "Normal", "address": "Velachery",
-             "cost_per_hour": 95, "supports_swapping": False}
-        ],
-        "Hyderabad": [
-            {"id": 9, "name": "Gachibowli EV Hub", "lat": 17.4435, "lon": 78.3772,
-             "available_slots": 7, "total_slots": 10, "type": "Fast", "address": "Gachibowli",
-             "cost_per_hour": 140, "supports_swapping": True},
-            {"id": 10, "name": "Madhapur ChargePoint", "lat": 17.4483, "lon": 78.3915,
-             "available_slots": 2, "total_slots": 6, "type": "Normal", "address": "Madhapur",
-             "cost_per_hour": 110, "supports_swapping": False}
-        ],
-        "Pune": [
-            {"id": 11, "name": "Kothrud SparkPoint", "lat": 18.5074, "lon": 73.8077,
-             "available_slots": 3, "total_slots": 8, "type": "Fast", "address": "Kothrud",
-             "cost_per_hour": 125, "supports_swapping": True},
-            {"id": 12, "name": "Viman Nagar EcoCharge", "lat": 18.5679, "lon": 73.9143,
-             "available_slots": 1, "total_slots": 5, "type": "Normal", "address": "Viman Nagar",
-             "cost_per_hour": 100, "supports_swapping": False}
-        ],
-        "Kolkata": [
-            {"id": 13, "name": "Salt Lake EV Bay", "lat": 22.5769, "lon": 88.4339,
-             "available_slots": 4, "total_slots": 9, "type": "Fast", "address": "Salt Lake",
-             "cost_per_hour": 115, "supports_swapping": True},
-            {"id": 14, "name": "Howrah EV Stop", "lat": 22.5892, "lon": 88.3100,
-             "available_slots": 2, "total_slots": 6, "type": "Normal", "address": "Howrah",
-             "cost_per_hour": 90, "supports_swapping": False}
-        ]
-    }
-
-    return jsonify(city_stations.get(city, []))'''
-
-
-@app.route('/api/route', methods=['POST'])
-def get_route():
-    data = request.json
-    return jsonify({
-        "distance": 10.5,
-        "time": 20.2,
-        "energy_cost": 2.3
-    })
-
-
-@app.route('/api/predict/<int:station_id>', methods=['GET'])
-def predict_utilization(station_id):
-    return jsonify({
-        "timestamps": ["10:00", "11:00", "12:00", "13:00", "14:00"],
-        "utilization": [20, 35, 60, 50, 40]
-    })
-from math import radians, cos, sin, sqrt, atan2
-
-def haversine(lat1, lon1, lat2, lon2):
-    R = 6371.0
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
-    c = 2 * atan2(sqrt(a), sqrt(1 - a))
-    return R * c
-
-@app.route('/api/recommendations', methods=['GET'])
-def get_recommendations():
-    city = request.args.get('city')
-    lat = float(request.args.get('lat'))
-    lon = float(request.args.get('lon'))
-
-    stations = get_stations().get_json()
-
-    # Filter for selected city only
-    stations = [s for s in stations if s.get("city", city) == city]
-
-    def score(station):
-        distance = haversine(lat, lon, station["lat"], station["lon"])
-        cost = station["cost_per_hour"]
-        availability = station["available_slots"]
-        type_weight = 0 if station["type"] == "Normal" else -1
-        return distance * 1.5 + cost * 0.3 - availability * 2 + type_weight
-
-    best_by_distance = min(stations, key=lambda s: haversine(lat, lon, s["lat"], s["lon"]))
-    best_by_cost = min(stations, key=lambda s: s["cost_per_hour"])
-    best_by_availability = max(stations, key=lambda s: s["available_slots"])
-    best_fast = next((s for s in sorted(stations, key=lambda s: score(s)) if s["type"] == "Fast"), best_by_distance)
-
-    return jsonify({
-        "nearest": best_by_distance,
-        "cheapest": best_by_cost,
-        "fastest": best_fast,
-        "least_queue": best_by_availability
-    })
-
-
-if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8000)
+import gc
+import json
+import os
+import time
+from datetime import datetime
+from threading import BoundedSemaphore
+
+import numpy as np
+from flask import Flask, Response, g, jsonify, request, stream_with_context
+from flask_cors import CORS
+
+try:
+    import msgpack
+except ImportError:  # optional: only needed for ?format=msgpack tiles
+    msgpack = None
+
+from backend.data.stations import get_stations_data, source_signature
+from backend.data.snapshot import StationSnapshots
+from backend.data.feed import AvailabilityFeed
+from backend.data.occupancy import ROLLUPS, OccupancyStore
+from backend.data.roads import RoadGraphStore
+from backend.data.store import StationStore
+from backend.algorithms.assignment import assign_fleet
+from backend.algorithms.astar import SearchBudgetExceeded
+from backend.algorithms.ev_routing import plan_ev_route
+from backend.algorithms.forecasting import ForecastService
+from backend.algorithms.lstm_model import load_forecaster
+from backend.algorithms.queueing import WaitEstimator
+from backend.algorithms.ranking import DEFAULT_WEIGHTS, rank_stations
+from backend.algorithms.routing import plan_route, route_matrix
+from backend.algorithms.tiles import MAX_TILE_ZOOM, pack_columns, station_columns
+from backend.utils.geo import DISTANCE_WEIGHT, geohash_cell, station_score
+from backend.utils.metrics import UNMATCHED, RequestMetrics, finish_spans, server_timing, span, start_spans
+from backend.utils.preprocessing import forecast_timestamps, history_source
+from backend.utils.profiler import SlowRequestProfiler
+from backend.utils.response_cache import ResponseCache
+from backend.utils.warmup import Lazy
+
+
+app = Flask(__name__)
+CORS(app)
+
+# Built cities are snapshotted to disk, so restarts restore them instead of rebuilding
+station_store = StationStore(get_stations_data, StationSnapshots(signature=source_signature()))
+availability_feed = AvailabilityFeed(station_store)
+# Idle streams send a comment this often so proxies keep the connection open
+STREAM_KEEPALIVE_SECONDS = 15
+# Open streams per process. Each holds a server thread for as long as it is
+# open, so gunicorn.conf.py keeps WORKER_THREADS well above this; streams
+# beyond it get a 503 and clients retry after STREAM_RETRY_SECONDS
+MAX_OPEN_STREAMS = int(os.environ.get("MAX_OPEN_STREAMS", 16))
+STREAM_RETRY_SECONDS = 5
+open_streams = BoundedSemaphore(MAX_OPEN_STREAMS)
+road_store = RoadGraphStore()
+# Occupancy events from /api/occupancy, kept as per-station rolling means
+occupancy = OccupancyStore(station_store)
+# Loaded once, in the background by warm_up() or on first use; the LSTM if a
+# trained model is saved, else a seasonal-naive fallback. Its input is the
+# recorded hourly occupancy where there is any
+forecasts = Lazy("forecaster", lambda: ForecastService(load_forecaster(), history=occupancy.history))
+# Expected wait per station (M/M/c), with queue parameters cached per city
+wait_estimator = WaitEstimator(occupancy)
+# Cities loaded by warm_up() before the first request asks for them
+WARMUP_CITIES = [c for c in os.environ.get("WARMUP_CITIES", "Mumbai").split(",") if c]
+city_warmup = Lazy("stations", lambda: [station_store.get(city) for city in WARMUP_CITIES])
+WARMUPS = (forecasts, city_warmup)
+
+
+def refresh_forecasts(stations, ids):
+    # New occupancy changes the model input, so recompute those stations' cached
+    # forecasts; in the background, as this runs under the store's update lock
+    if forecasts.ready:
+        forecasts.get().refresh_later(stations, ids)
+
+
+station_store.subscribe(refresh_forecasts)
+
+# Serialized /api/stations and /api/recommendations bodies per city and data version
+response_cache = ResponseCache()
+station_store.subscribe(lambda stations, ids: response_cache.invalidate(stations.city))
+
+# Latency per route and stage, served at /metrics
+request_metrics = RequestMetrics()
+# Stacks of requests slower than PROFILE_SLOW_REQUESTS_MS, if set
+profiler = SlowRequestProfiler()
+
+
+@app.before_request
+def start_request_timing():
+    g.started = time.perf_counter()
+    g.spans = start_spans()
+    profiler.start()
+
+
+@app.after_request
+def record_request_timing(response):
+    # Streamed responses (the SSE feed) are timed to their first byte
+    elapsed = time.perf_counter() - g.started
+    spans = finish_spans(g.spans)
+    route = request.url_rule.rule if request.url_rule is not None else UNMATCHED
+    request_metrics.observe(route, response.status_code, elapsed, spans)
+    response.headers['Server-Timing'] = server_timing(spans, elapsed)
+    profiler.stop(f"{request.method} {route}", elapsed)
+    return response
+
+
+def warm_up():
+    """Start loading the forecaster and WARMUP_CITIES in background threads"""
+    for component in WARMUPS:
+        component.start()
+
+
+def preload():
+    """Load WARMUP_CITIES (stations and road graphs) synchronously and move
+    their live availability, availability feed, occupancy rings and the
+    request metrics into shared memory.
+
+    For a pre-fork server's parent (gunicorn.conf.py): workers forked
+    afterwards share these structures instead of building their own copies.
+    Starts no threads, since threads don't survive fork.
+    """
+    city_warmup.get()
+    for city in WARMUP_CITIES:
+        roads = road_store.get(city)
+        if roads is not None:
+            roads.prepare()
+    station_store.share()
+    availability_feed.share()
+    occupancy.share()
+    request_metrics.share([rule.rule for rule in app.url_map.iter_rules()])
+    # Objects that exist now are never scanned by the collector again, so it
+    # doesn't write to (and thereby copy) the shared pages in every worker
+    gc.freeze()
+
+
+@app.route('/api/ready', methods=['GET'])
+def readiness():
+    """200 once every warm-up component has loaded, 503 until then"""
+    components = {
+        c.name: {"status": c.status(), "seconds": None if c.seconds is None else round(c.seconds, 3)}
+        for c in WARMUPS
+    }
+    ready = all(c.ready for c in WARMUPS)
+    return jsonify({"ready": ready, "components": components, "cities": station_store.loaded()}), 200 if ready else 503
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Latency histograms in the Prometheus text format"""
+    return Response(request_metrics.exposition(), mimetype='text/plain; version=0.0.4')
+
+
+def valid_location(lat, lon):
+    # NaN fails every comparison, so this also rejects it
+    return -90 <= lat <= 90 and -180 <= lon <= 180
+
+
+def number_list(values, integers=False):
+    """Whether a JSON value is a list of numbers (of int64 integers with `integers`)"""
+    if not isinstance(values, list):
+        return False
+    if integers:
+        return all(type(v) is int and -2 ** 63 <= v < 2 ** 63 for v in values)
+    return all(type(v) in (int, float) for v in values)
+
+
+def cached_json(city, version, key, build):
+    """JSON response from the response cache, built by build() on a miss.
+
+    Carries an ETag, so a client whose If-None-Match still matches gets a
+    304, and X-Station-Version.
+    """
+    entry = response_cache.get(city, version, key, build)
+    response = Response(entry.body, mimetype='application/json')
+    response.set_etag(entry.etag)
+    response.cache_control.no_cache = True
+    response.headers['X-Station-Version'] = str(version)
+    return response.make_conditional(request)
+
+
+@app.route('/api/stations', methods=['GET'])
+def get_stations():
+    city = request.args.get('city', 'Mumbai')
+    with span("fetch"):
+        stations = station_store.get(city)
+
+    def build():
+        with span("serialize"):
+            return stations.to_json()
+
+    # Read the version first: deltas carry absolute values, so replaying one
+    # the body already includes is harmless
+    return cached_json(city, stations.version, "stations", build)
+    '''city = request.args.get('city', 'Delhi')
+
+    city_stations = {
+        "Delhi": [
+            {"id": 1, "name": "CP Fast Charger", "lat": 28.6139, "lon": 77.2090,
+             "available_slots": 4, "total_slots": 10, "type": "Fast", "address": "Connaught Place",
+             "cost_per_hour": 150, "supports_swapping": True},
+            {"id": 2, "name": "Lajpat EV Hub", "lat": 28.5678, "lon": 77.2345,
+             "available_slots": 2, "total_slots": 6, "type": "Normal", "address": "Lajpat Nagar",
+             "cost_per_hour": 100, "supports_swapping": False}
+        ],
+        "Mumbai": [
+            {"id": 3, "name": "Bandra EV Point", "lat": 19.0590, "lon": 72.8295,
+             "available_slots": 5, "total_slots": 12, "type": "Fast", "address": "Bandra West",
+             "cost_per_hour": 180, "supports_swapping": True},
+            {"id": 4, "name": "Dadar EcoCharge", "lat": 19.0180, "lon": 72.8436,
+             "available_slots": 1, "total_slots": 8, "type": "Normal", "address": "Dadar East",
+             "cost_per_hour": 90, "supports_swapping": False}
+        ],
+        "Bangalore": [
+            {"id": 5, "name": "Koramangala PlugIn", "lat": 12.9352, "lon": 77.6141,
+             "available_slots": 3, "total_slots": 9, "type": "Fast", "address": "Koramangala",
+             "cost_per_hour": 120, "supports_swapping": True},
+            {"id": 6, "name": "Indiranagar EV Zone", "lat": 12.9718, "lon": 77.6408,
+             "available_slots": 0, "total_slots": 7, "type": "Normal", "address": "Indiranagar",
+             "cost_per_hour": 85, "supports_swapping": False}
+        ],
+        "Chennai": [
+            {"id": 7, "name": "T-Nagar ChargeBay", "lat": 13.0423, "lon": 80.2337,
+             "available_slots": 6, "total_slots": 10, "type": "Fast", "address": "T Nagar",
+             "cost_per_hour": 130, "supports_swapping": True},
+            {"id": 8, "name": "Velachery EcoStation", "lat": 12.9792, "lon": 80.2200,
+             "available_slots": 3, "total_slots": 5, "type": "Normal", "address": "Velachery",
+             "cost_per_hour": 95, "supports_swapping": False}
+        ],
+        "Hyderabad": [
+            {"id": 9, "name": "Gachibowli EV Hub", "lat": 17.4435, "lon": 78.3772,
+             "available_slots": 7, "total_slots": 10, "type": "Fast", "address": "Gachibowli",
+             "cost_per_hour": 140, "supports_swapping": True},
+            {"id": 10, "name": "Madhapur ChargePoint", "lat": 17.4483, "lon": 78.3915,
+             "available_slots": 2, "total_slots": 6, "type": "Normal", "address": "Madhapur",
+             "cost_per_hour": 110, "supports_swapping": False}
+        ],
+        "Pune": [
+            {"id": 11, "name": "Kothrud SparkPoint", "lat": 18.5074, "lon": 73.8077,
+             "available_slots": 3, "total_slots": 8, "type": "Fast", "address": "Kothrud",
+             "cost_per_hour": 125, "supports_swapping": True},
+            {"id": 12, "name": "Viman Nagar EcoCharge", "lat": 18.5679, "lon": 73.9143,
+             "available_slots": 1, "total_slots": 5, "type": "Normal", "address": "Viman Nagar",
+             "cost_per_hour": 100, "supports_swapping": False}
+        ],
+        "Kolkata": [
+            {"id": 13, "name": "Salt Lake EV Bay", "lat": 22.5769, "lon": 88.4339,
+             "available_slots": 4, "total_slots": 9, "type": "Fast", "address": "Salt Lake",
+             "cost_per_hour": 115, "supports_swapping": True},
+            {"id": 14, "name": "Howrah EV Stop", "lat": 22.5892, "lon": 88.3100,
+             "available_slots": 2, "total_slots": 6, "type": "Normal", "address": "Howrah",
+             "cost_per_hour": 90, "supports_swapping": False}
+        ]
+    }
+
+    return jsonify(city_stations.get(city, []))'''
+
+
+@app.route('/api/stations/availability', methods=['POST'])
+def update_availability():
+    """Live available_slots as {station_id: slots} in `updates`; counts are
+    clipped to 0..total_slots and unknown stations ignored"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Expected a JSON object"}), 400
+    city = data.get('city', 'Mumbai')
+    updates = data.get('updates', {})
+    if not isinstance(city, str) or not isinstance(updates, dict):
+        return jsonify({"error": "city must be a name and updates an object"}), 400
+    try:
+        updates = {int(station_id): int(slots) for station_id, slots in updates.items()}
+    except (TypeError, ValueError, OverflowError):
+        return jsonify({"error": "updates must map station ids to whole numbers of slots"}), 400
+    changed = station_store.update_available(city, updates)
+    return jsonify({"changed": changed, "version": station_store.get(city).version})
+
+
+# Largest event batch accepted by one /api/occupancy request
+MAX_OCCUPANCY_BATCH = 100_000
+
+
+@app.route('/api/occupancy', methods=['POST'])
+def ingest_occupancy():
+    """Batched occupancy events for one city, as parallel lists:
+    `station_ids`, `available_slots` and optional `timestamps` (unix
+    seconds, default now). Unknown stations and events too old for every
+    rollup are dropped."""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Expected a JSON object"}), 400
+    city = data.get('city', 'Mumbai')
+    station_ids = data.get('station_ids', [])
+    available = data.get('available_slots', [])
+    timestamps = data.get('timestamps')
+    if timestamps is None and isinstance(station_ids, list):
+        timestamps = [time.time()] * len(station_ids)
+    if not isinstance(city, str) or not (
+            number_list(station_ids, integers=True) and number_list(available) and number_list(timestamps)):
+        return jsonify({"error": "station_ids must list integers, available_slots and timestamps numbers"}), 400
+    if not len(station_ids) == len(available) == len(timestamps):
+        return jsonify({"error": "station_ids, available_slots and timestamps must have the same length"}), 400
+    if len(station_ids) > MAX_OCCUPANCY_BATCH:
+        return jsonify({"error": f"At most {MAX_OCCUPANCY_BATCH} events per request"}), 400
+
+    accepted, changed = occupancy.ingest(city, station_ids, timestamps, available)
+    return jsonify({
+        "accepted": accepted,
+        "dropped": len(station_ids) - accepted,
+        "changed": len(changed),
+        "version": station_store.get(city).version
+    })
+
+
+# Rollup name -> bucket width in seconds
+OCCUPANCY_RESOLUTIONS = {name: width for name, width, _ in ROLLUPS}
+
+
+@app.route('/api/occupancy/<int:station_id>', methods=['GET'])
+def get_occupancy(station_id):
+    """Recorded utilization for one station at one rollup resolution, oldest
+    first; buckets without events are null"""
+    city = request.args.get('city', 'Mumbai')
+    resolution = request.args.get('resolution', '1h')
+    if resolution not in OCCUPANCY_RESOLUTIONS:
+        return jsonify({"error": f"resolution must be one of {', '.join(OCCUPANCY_RESOLUTIONS)}"}), 400
+    stations = station_store.get(city)
+    row = stations.row_by_id.get(station_id)
+    if row is None:
+        return jsonify({"error": f"Unknown station {station_id}"}), 404
+
+    ring_width = OCCUPANCY_RESOLUTIONS[resolution]
+    points = max(1, min(request.args.get('points', 24, type=int), 1000))
+    now = time.time()
+    end = int(now // ring_width)
+    city_occupancy = occupancy.get(city)
+    if city_occupancy is None:
+        utilization = [None] * points
+    else:
+        values = city_occupancy.utilization(np.array([row]), now, points, resolution)[0]
+        utilization = [None if np.isnan(v) else round(v, 1) for v in values.tolist()]
+    return jsonify({
+        "resolution": resolution,
+        "timestamps": [(end - points + 1 + i) * ring_width for i in range(points)],
+        "utilization": utilization
+    })
+
+
+@app.route('/api/stations/stream', methods=['GET'])
+def stream_availability():
+    """Server-sent events with available_slots deltas for one city.
+
+    Pass `since` (the X-Station-Version of a full fetch) to receive only what
+    changed after it. A `reset` event means the client must refetch.
+    """
+    city = request.args.get('city', 'Mumbai')
+    since = request.args.get('since', type=int)
+    # Unknown cities aren't cached by the store, so each poll would reload them
+    if not len(station_store.get(city)):
+        return jsonify({"error": f"No stations found for {city}"}), 404
+    if not open_streams.acquire(blocking=False):
+        return jsonify({"error": "Too many open streams"}), 503, {'Retry-After': str(STREAM_RETRY_SECONDS)}
+
+    def events():
+        version = since if since is not None else availability_feed.latest(city)
+        yield f"event: version\ndata: {json.dumps({'version': version})}\n\n"
+        while True:
+            changes, latest = availability_feed.changes_since(city, version)
+            if changes is None:
+                yield f"event: reset\ndata: {json.dumps({'version': latest})}\n\n"
+                version = latest
+            elif changes:
+                yield f"event: delta\ndata: {json.dumps({'version': latest, 'changes': changes})}\n\n"
+                version = latest
+            elif not availability_feed.wait(city, version, STREAM_KEEPALIVE_SECONDS):
+                yield ": keepalive\n\n"
+
+    response = Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # Runs when the server closes the response, whether or not it was streamed
+    response.call_on_close(open_streams.release)
+    return response
+
+
+TILE_FORMATS = ('json', 'msgpack', 'binary')
+
+
+@app.route('/api/stations/tiles/<int:z>/<int:x>/<int:y>', methods=['GET'])
+def get_station_tile(z, x, y):
+    """One slippy-map tile of a city's stations.
+
+    Crowded low-zoom tiles come back as up to 64 aggregated clusters,
+    otherwise as compact per-station columns (no names or addresses).
+    `format` picks JSON, MessagePack or packed little-endian records
+    (backend.algorithms.tiles.STATION_RECORD / CLUSTER_RECORD).
+    """
+    city = request.args.get('city', 'Mumbai')
+    encoding = request.args.get('format', 'json')
+    if z > MAX_TILE_ZOOM or x >= 1 << z or y >= 1 << z:
+        return jsonify({"error": "Invalid tile"}), 400
+    if encoding not in TILE_FORMATS:
+        return jsonify({"error": f"format must be one of {', '.join(TILE_FORMATS)}"}), 400
+    if encoding == 'msgpack' and msgpack is None:
+        return jsonify({"error": "msgpack is not installed on the server"}), 400
+
+    with span("fetch"):
+        stations = station_store.get(city)
+    with span("render"):
+        kind, tile = stations.tiles.tile(stations, z, x, y)
+        columns = station_columns(stations, tile) if kind == "stations" else tile
+    headers = {'X-Station-Version': str(stations.version), 'X-Tile-Kind': kind}
+    if encoding == 'binary':
+        headers['X-Station-Types'] = ",".join(stations.types)
+        return Response(pack_columns(kind, columns), mimetype='application/octet-stream', headers=headers)
+
+    body = {"kind": kind, "count": len(columns["lat"]), "types": stations.types}
+    for name, column in columns.items():
+        body[name] = (np.round(column, 6) if column.dtype.kind == "f" else column).tolist()
+    if encoding == 'msgpack':
+        return Response(msgpack.packb(body), mimetype='application/msgpack', headers=headers)
+    return Response(json.dumps(body, separators=(",", ":")), mimetype='application/json', headers=headers)
+
+
+@app.route('/api/route', methods=['POST'])
+def get_route():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Expected a JSON object"}), 400
+    city = data.get('city', 'Mumbai')
+    station_cities = data.get('station_cities', [city])
+    if not isinstance(city, str) or not isinstance(station_cities, list) \
+            or not all(isinstance(c, str) for c in station_cities):
+        return jsonify({"error": "city must be a name and station_cities a list of names"}), 400
+    try:
+        start_lat, start_lon, end_lat, end_lon = (
+            float(data[key]) for key in ('start_lat', 'start_lon', 'end_lat', 'end_lon')
+        )
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"error": "start_lat, start_lon, end_lat and end_lon are required numbers"}), 400
+    if not (valid_location(start_lat, start_lon) and valid_location(end_lat, end_lon)):
+        return jsonify({"error": "Coordinates out of range"}), 400
+    battery_level = data.get('battery_level')
+    if battery_level is not None:
+        try:
+            battery_level = float(battery_level)
+        except (TypeError, ValueError):
+            battery_level = float("nan")
+        if not 0 <= battery_level <= 100:
+            return jsonify({"error": "battery_level must be a number from 0 to 100"}), 400
+
+    roads = road_store.get(city)
+    if roads is None:
+        return jsonify({"error": f"No road graph for {city}"}), 404
+
+    start = (start_lat, start_lon)
+    end = (end_lat, end_lon)
+
+    # With a battery level, plan charging stops along the way. The graph may
+    # cover a region (e.g. Mumbai-Pune), so chargers can come from several cities
+    if battery_level is not None:
+        stations = [station_store.get(c) for c in station_cities]
+        try:
+            route = plan_ev_route(
+                roads, stations, start, end,
+                battery_level, data.get('vehicle_type', 'Car')
+            )
+        except SearchBudgetExceeded:
+            return jsonify({"error": "Planning charging stops took too long for this trip"}), 503
+        if route is None:
+            return jsonify({"error": "No feasible route with the current battery level"}), 404
+        return jsonify(route)
+
+    route = plan_route(roads, *start, *end)
+    if route is None:
+        return jsonify({"error": "No route between these points"}), 404
+    return jsonify(route)
+
+
+# Largest origins x stations matrix served in one request
+MAX_MATRIX_CELLS = 250_000
+
+
+@app.route('/api/route/matrix', methods=['POST'])
+def get_route_matrix():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Expected a JSON object"}), 400
+    city = data.get('city', 'Mumbai')
+    if not isinstance(city, str):
+        return jsonify({"error": "city must be a name"}), 400
+    origins = data.get('origins', [])
+    try:
+        if not isinstance(origins, list):
+            raise TypeError
+        origins = [(float(lat), float(lon)) for lat, lon in origins]
+    except (TypeError, ValueError):
+        return jsonify({"error": "origins must be a list of [lat, lon] pairs"}), 400
+    if not all(valid_location(lat, lon) for lat, lon in origins):
+        return jsonify({"error": "Coordinates out of range"}), 400
+    station_ids = data.get('station_ids')
+    if station_ids is not None and not (
+            isinstance(station_ids, list) and all(type(i) is int for i in station_ids)):
+        return jsonify({"error": "station_ids must be a list of integers"}), 400
+
+    roads = road_store.get(city)
+    if roads is None:
+        return jsonify({"error": f"No road graph for {city}"}), 404
+
+    stations = station_store.get(city)
+    if station_ids is None:
+        rows = np.arange(len(stations))
+    else:
+        missing = [i for i in station_ids if i not in stations.row_by_id]
+        if missing:
+            return jsonify({"error": f"Unknown station ids: {missing}"}), 400
+        rows = np.array([stations.row_by_id[i] for i in station_ids], dtype=np.intp)
+
+    if len(origins) * len(rows) > MAX_MATRIX_CELLS:
+        return jsonify({"error": f"Matrix larger than {MAX_MATRIX_CELLS} cells"}), 400
+
+    destinations = np.column_stack((stations.lats[rows], stations.lons[rows]))
+    distance, minutes, energy = route_matrix(roads, origins, destinations)
+
+    def cells(matrix):
+        # JSON has no infinity, unreachable pairs become null
+        return [[v if v != float("inf") else None for v in row] for row in matrix.tolist()]
+
+    return jsonify({
+        "station_ids": stations.ids[rows].tolist(),
+        "distance": cells(distance),
+        "time": cells(minutes),
+        "energy_cost": cells(energy)
+    })
+
+
+# Largest fleet assigned in one request
+MAX_FLEET_SIZE = 5000
+ASSIGN_OBJECTIVES = ('time', 'distance')
+
+
+@app.route('/api/assign', methods=['POST'])
+def assign_vehicles():
+    """Charging stations for a batch of fleet vehicles at once.
+
+    `vehicles` is a list of {id, lat, lon, battery_level, vehicle_type}.
+    No station gets more vehicles than it has available slots, and the
+    total cost is minimised: minutes travelling, waiting and charging
+    (`objective` "time") or km driven ("distance"). Vehicles that can't
+    reach a free slot get a null station.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Expected a JSON object"}), 400
+    city = data.get('city', 'Mumbai')
+    vehicles = data.get('vehicles', [])
+    objective = data.get('objective', 'time')
+    if not isinstance(city, str) or not isinstance(vehicles, list):
+        return jsonify({"error": "city must be a name and vehicles a list"}), 400
+    if objective not in ASSIGN_OBJECTIVES:
+        return jsonify({"error": f"objective must be one of {', '.join(ASSIGN_OBJECTIVES)}"}), 400
+    if len(vehicles) > MAX_FLEET_SIZE:
+        return jsonify({"error": f"At most {MAX_FLEET_SIZE} vehicles per request"}), 400
+    try:
+        lats = [float(v['lat']) for v in vehicles]
+        lons = [float(v['lon']) for v in vehicles]
+        battery = [float(v['battery_level']) for v in vehicles]
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"error": "Every vehicle needs lat, lon and battery_level"}), 400
+    if not all(valid_location(lat, lon) for lat, lon in zip(lats, lons)):
+        return jsonify({"error": "Vehicle coordinates out of range"}), 400
+    if not all(0 <= level <= 100 for level in battery):
+        return jsonify({"error": "battery_level must be a number from 0 to 100"}), 400
+
+    with span("fetch"):
+        stations = station_store.get(city)
+        roads = road_store.get(city)
+    if not len(stations):
+        return jsonify({"error": f"No stations found for {city}"}), 404
+
+    started = time.perf_counter()
+    with span("score"):
+        result = assign_fleet(
+            stations, lats, lons, battery, [v.get('vehicle_type', 'Car') for v in vehicles],
+            wait_estimator.waits(stations), roads, objective
+        )
+    assignments = []
+    for i, vehicle in enumerate(vehicles):
+        row = int(result["row"][i])
+        entry = {"vehicle_id": vehicle.get('id', i), "station_id": None}
+        if row >= 0:
+            entry.update({
+                "station_id": int(stations.ids[row]),
+                "lat": float(stations.lats[row]),
+                "lon": float(stations.lons[row]),
+                "distance": round(float(result["km"][i]), 3),
+                "travel_minutes": round(float(result["minutes"][i]), 1),
+                "wait_minutes": round(float(result["wait"][i]), 1),
+                "charge_minutes": round(float(result["charge"][i]), 1),
+            })
+        assignments.append(entry)
+
+    assigned = result["row"] >= 0
+    return jsonify({
+        "objective": objective,
+        "assigned": int(assigned.sum()),
+        "unassigned": int((~assigned).sum()),
+        "total_cost": round(float(result["cost"][assigned].sum()), 1),
+        "travel": result["travel"],
+        "candidates": result["candidates"],
+        "solve_ms": round((time.perf_counter() - started) * 1000, 1),
+        "assignments": assignments
+    })
+
+
+def forecast_hours():
+    horizon = forecasts.get().horizon
+    hours = request.args.get('hours', horizon, type=int)
+    return max(1, min(hours, horizon))
+
+
+@app.route('/api/predict/<int:station_id>', methods=['GET'])
+def predict_utilization(station_id):
+    city = request.args.get('city')
+    if city is not None:
+        stations = station_store.get(city)
+        row = stations.row_by_id.get(station_id)
+    else:
+        stations, row = station_store.find(station_id)
+    if row is None:
+        return jsonify({"error": f"Unknown station {station_id}"}), 404
+
+    hours = forecast_hours()
+    now = datetime.now()
+    utilization = forecasts.get().predict(stations, np.array([row]), hours, now)[0]
+    # Without recorded occupancy the model input is a made-up profile, so say so
+    recorded_hours = int(occupancy.recorded_hours(stations, now, np.array([row]))[0])
+    return jsonify({
+        "timestamps": forecast_timestamps(now, hours),
+        "utilization": np.round(utilization, 1).tolist(),
+        "source": history_source([recorded_hours])[0],
+        "recorded_hours": recorded_hours
+    })
+
+
+@app.route('/api/predict/cache', methods=['GET'])
+def forecast_cache_stats():
+    return jsonify(forecasts.get().stats())
+
+
+@app.route('/api/predict', methods=['GET'])
+def predict_city_utilization():
+    city = request.args.get('city', 'Mumbai')
+    with span("fetch"):
+        stations = station_store.get(city)
+    hours = forecast_hours()
+    now = datetime.now()
+    # Cache misses for the whole city go through the model in a single batch
+    with span("score"):
+        utilization = forecasts.get().predict(stations, np.arange(len(stations)), hours, now)
+        sources = history_source(occupancy.recorded_hours(stations, now, np.arange(len(stations))))
+    return jsonify({
+        "timestamps": forecast_timestamps(now, hours),
+        "model_version": forecasts.get().forecaster.version,
+        "station_ids": stations.ids.tolist(),
+        "utilization": np.round(utilization, 1).tolist(),
+        "sources": sources
+    })
+
+
+# Slack for float error between the tree's chord distances and haversine
+RADIUS_SLACK_KM = 1e-6
+# Half the earth's circumference, a radius query this large returns every station
+MAX_RADIUS_KM = 20015.1
+
+
+def recommend(stations, lat, lon, waits=None, available=None):
+    """Row of the nearest, cheapest, fastest and least-queued station.
+
+    least_queue is the shortest expected wait (`waits`), ties going to the
+    most `available` slots (default: live slots). Without waits it is just
+    the most available slots.
+    """
+    index = stations.index
+    arrays = stations.arrays
+
+    def lowest(candidates, values):
+        # Ties go to the earliest station, same as min() over the full list
+        return candidates[np.lexsort((candidates, values))[0]]
+
+    # Nearest: the tree gives the closest point, then a tiny radius around it
+    # settles exact ties on haversine distance
+    _, nearest_km = index.nearest(lat, lon, k=1)
+    candidates = index.within(lat, lon, nearest_km[0] + RADIUS_SLACK_KM)
+    best_by_distance = lowest(candidates, arrays.distances(lat, lon, candidates))
+
+    best_by_cost = int(np.argmin(arrays.costs))
+    available = arrays.available if available is None else available
+    if waits is None:
+        best_by_queue = int(np.argmax(available))
+    else:
+        best_by_queue = int(np.lexsort((-available, waits))[0])
+
+    # Fastest: best score among Fast stations. A Fast station at distance d
+    # scores at least d * DISTANCE_WEIGHT + score_floor, so grow the search
+    # radius until nothing outside it can beat the best candidate inside
+    best_fast = best_by_distance
+    if arrays.is_fast.any():
+        fast = arrays.is_fast
+        score_floor = station_score(0.0, arrays.costs[fast], arrays.available[fast], arrays.type_weights[fast]).min()
+        radius = max(nearest_km[0], 1.0)
+        while True:
+            candidates = index.within(lat, lon, radius + RADIUS_SLACK_KM)
+            candidates = candidates[arrays.is_fast[candidates]]
+            if len(candidates):
+                scores = arrays.scores(lat, lon, candidates)
+                best = lowest(candidates, scores)
+                if scores.min() <= radius * DISTANCE_WEIGHT + score_floor or radius >= MAX_RADIUS_KM:
+                    best_fast = best
+                    break
+            radius *= 2
+
+    return {
+        "nearest": best_by_distance,
+        "cheapest": best_by_cost,
+        "fastest": best_fast,
+        "least_queue": best_by_queue
+    }
+
+
+# Geohash length recommendations are snapped to when the request has no
+# `cell`; 0 keeps exact coordinates. 7 is a cell of about 150 m
+RECOMMENDATION_CELL_PRECISION = int(os.environ.get("RECOMMENDATION_CELL_PRECISION", 0))
+
+
+@app.route('/api/recommendations', methods=['GET'])
+def get_recommendations():
+    """Picks for a location. With `cell` (a geohash length, 1-12; 0 turns
+    it off) the location is snapped to its geohash cell centre, so everyone
+    in the cell shares one cached answer."""
+    city = request.args.get('city')
+    lat = request.args.get('lat', type=float)
+    lon = request.args.get('lon', type=float)
+    if not city:
+        return jsonify({"error": "city is required"}), 400
+    if lat is None or lon is None:
+        return jsonify({"error": "lat and lon are required"}), 400
+    if not valid_location(lat, lon):
+        return jsonify({"error": "Coordinates out of range"}), 400
+    precision = request.args.get('cell', RECOMMENDATION_CELL_PRECISION, type=int)
+    if not 0 <= precision <= 12:
+        return jsonify({"error": "cell must be a geohash length from 0 to 12 (0 keeps the exact location)"}), 400
+
+    with span("fetch"):
+        stations = station_store.get(city)
+    if not len(stations):
+        return jsonify({"error": f"No stations found for {city}"}), 404
+
+    key = ("recommendations", lat, lon)
+    if precision:
+        cell, lat, lon = geohash_cell(lat, lon, precision)
+        key = ("recommendations", cell)
+
+    def build():
+        # least_queue goes by expected wait, then recent recorded occupancy
+        with span("score"):
+            waits = wait_estimator.waits(stations)
+            picks = recommend(stations, lat, lon, waits, occupancy.recent_available(stations))
+        with span("serialize"):
+            return app.json.dumps({
+                name: dict(stations.station(row), estimated_wait_minutes=round(float(waits[row]), 1))
+                for name, row in picks.items()
+            })
+
+    return cached_json(city, stations.version, key, build)
+
+
+# Largest k for /api/rank, and most Pareto-optimal stations it lists
+MAX_RANK_K = 100
+MAX_PARETO_STATIONS = 200
+
+
+@app.route('/api/rank', methods=['GET'])
+def rank():
+    """Top `k` stations by a weighted score, plus the Pareto-optimal
+    stations (nearest first) over distance, cost, availability and speed.
+
+    Weights come from `distance_weight`, `cost_weight`,
+    `availability_weight`, `speed_weight` and `wait_weight`; the defaults
+    give the recommendation score. `radius` (km) first narrows the
+    stations to those nearby, and `cell` snaps the location as for
+    /api/recommendations.
+    """
+    city = request.args.get('city', 'Mumbai')
+    lat = request.args.get('lat', type=float)
+    lon = request.args.get('lon', type=float)
+    if lat is None or lon is None:
+        return jsonify({"error": "lat and lon are required"}), 400
+    if not valid_location(lat, lon):
+        return jsonify({"error": "Coordinates out of range"}), 400
+    k = request.args.get('k', 10, type=int)
+    if not 1 <= k <= MAX_RANK_K:
+        return jsonify({"error": f"k must be from 1 to {MAX_RANK_K}"}), 400
+    radius = request.args.get('radius', type=float)
+    if radius is not None and not 0 < radius < float("inf"):
+        return jsonify({"error": "radius must be a positive number of km"}), 400
+    weights = {
+        name: request.args.get(f'{name}_weight', default, type=float)
+        for name, default in DEFAULT_WEIGHTS.items()
+    }
+    # NaN fails both comparisons
+    if not all(0 <= weight < float("inf") for weight in weights.values()):
+        return jsonify({"error": "Weights must be finite and not negative"}), 400
+    precision = request.args.get('cell', RECOMMENDATION_CELL_PRECISION, type=int)
+    if not 0 <= precision <= 12:
+        return jsonify({"error": "cell must be a geohash length from 0 to 12 (0 keeps the exact location)"}), 400
+
+    with span("fetch"):
+        stations = station_store.get(city)
+    if not len(stations):
+        return jsonify({"error": f"No stations found for {city}"}), 404
+
+    location = (lat, lon)
+    if precision:
+        cell, lat, lon = geohash_cell(lat, lon, precision)
+        location = (cell,)
+    key = ("rank", *location, k, radius, *weights.values())
+
+    def build():
+        with span("filter"):
+            rows = None if radius is None else stations.index.within(lat, lon, radius)
+        with span("score"):
+            waits = wait_estimator.waits(stations)
+            top, scores, front = rank_stations(stations, lat, lon, k, weights, waits, rows)
+
+        def entries(rows):
+            distances = stations.arrays.distances(lat, lon, rows).tolist()
+            return [
+                dict(
+                    stations.station(row),
+                    distance=round(distance, 3),
+                    estimated_wait_minutes=round(float(waits[row]), 1)
+                )
+                for row, distance in zip(rows.tolist(), distances)
+            ]
+
+        with span("serialize"):
+            ranked = entries(top)
+            for entry, score in zip(ranked, scores.tolist()):
+                entry["score"] = round(score, 3)
+            return app.json.dumps({
+                "weights": weights,
+                "top": ranked,
+                "pareto_size": len(front),
+                "pareto": entries(front[:MAX_PARETO_STATIONS])
+            })
+
+    return cached_json(city, stations.version, key, build)
+
+
+if __name__ == '__main__':
+    warm_up()
+    app.run(host='0.0.0.0', port=8000)